@@ -4,10 +4,11 @@ Base settings file for FastApi application.
 
 import logging.config
 import os
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
-from app.loggers.safe_logger import SafeJsonFormatter
+from app.loggers.queue_handler import create_queue_handler
 
 
 class Settings(BaseSettings):
@@ -19,16 +20,40 @@ class Settings(BaseSettings):
     )
     TEST: bool = False
     LOG_LEVEL: str = "INFO"
+    LOG_QUEUE_MAX_SIZE: int = 10_000  # Records waiting to be written
+    LOG_QUEUE_FULL_POLICY: Literal["drop", "block"] = "drop"
+    LOG_BATCH_SIZE: int = 100  # Records written at once
+    ACCESS_LOG_SAMPLE_RATE: float = 1.0  # Ratio of successful requests logged
+    ACCESS_LOG_ROUTE_SAMPLE_RATES: dict[str, float] = {}  # By route template
+    ACCESS_LOG_SLOW_REQUEST_SECONDS: float = 1  # Always logged, 0 to disable
+    ACCESS_LOG_EXCLUDED_ROUTES: list[str] = ["/health"]  # Never logged
     ORIGINS: list[str] = []
     # Redis
     REDIS_URL: str = "redis://"
+    REDIS_CONNECTIONS_POOL_SIZE: int = 100
     # Database
     DATABASE_URL: str = "psql://postgres:"
     DATABASE_POOL_CLASS: str = "AsyncAdaptedQueuePool"
     DATABASE_POOL_SIZE: int = 10
+    DATABASE_SLOW_QUERY_SECONDS: float = 1  # Slower queries are logged, 0 to disable
+    # Event loop monitor
+    EVENT_LOOP_MONITOR_INTERVAL_SECONDS: float = 0.5  # 0 to disable
+    EVENT_LOOP_MONITOR_DEBUG: bool = False  # Log the stack of calls blocking the loop
+    EVENT_LOOP_MONITOR_BLOCKING_THRESHOLD_SECONDS: float = 0.1
     # Register
     PRE_REGISTRATION_TOKEN_TTL_SECONDS: int = 60 * 10  # 10 minutes
 
+    # User cache ------
+    USER_CACHE_LOCAL_MAX_SIZE: int = 10_000  # Users kept in memory, 0 to disable
+    USER_CACHE_LOCAL_TTL_SECONDS: int = 5  # Staleness allowed across processes
+    USER_CACHE_TTL_SECONDS: int = 60 * 10  # 10 minutes
+    USER_CACHE_NEGATIVE_TTL_SECONDS: int = 30
+
+    # Password hashing ------
+    PASSWORD_HASHER_POOL_SIZE: int = os.cpu_count() or 1
+    PASSWORD_HASHER_MAX_QUEUE_SIZE: int = 64  # Jobs waiting for a worker
+    PASSWORD_HASHER_BCRYPT_ROUNDS: int = 12
+
     # Email -----------------
     SMTP_USERNAME: str = ""
     SMTP_PASSWORD: str = ""
@@ -47,6 +72,8 @@ class Settings(BaseSettings):
     JWT_ISSUER: str = "safe-auth-service"
     JWT_PRIVATE_KEY: str = ""
     JWT_PUBLIC_KEY: str = ""
+    JWT_CACHE_MAX_SIZE: int = 10_000  # Verified tokens kept in memory, 0 to disable
+    JWT_CACHE_MAX_TTL_SECONDS: int = 60 * 5  # 5 minutes
 
     # Google Auth
     GOOGLE_AUTHORIZATION_URL: str = "https://accounts.google.com/o/oauth2/v2/auth"
@@ -54,12 +81,40 @@ class Settings(BaseSettings):
     GOOGLE_CLIENT_SECRET: str = ""
     GOOGLE_REDIRECT_URI: str = "http://localhost:8000/api/v1/google/callback"
     GOOGLE_TOKEN_URL: str = "https://accounts.google.com/o/oauth2/token"
+    GOOGLE_USERINFO_URL: str = "https://www.googleapis.com/oauth2/v1/userinfo"
+
+    # HTTP clients ---------------
+    HTTP_CLIENT_KEEPALIVE_TIMEOUT_SECONDS: float = 30  # Below upstreams idle timeout
+    HTTP_CLIENT_DNS_CACHE_TTL_SECONDS: int = 60
+    HTTP_CLIENT_WARMUP_CONNECTIONS: int = 2  # Opened on startup, 0 to disable
+    HTTP_CLIENT_WARMUP_TIMEOUT_SECONDS: float = 1  # Startup delay by slow upstreams
+    HTTP_REQUEST_DEADLINE_SECONDS: float = 15  # Upstream requests budget, 0 to disable
 
     # Apisix ---------------
     APISIX_BASE_URL: str = ""
     APISIX_API_KEY: str = ""
     APISIX_CONNECTIONS_POOL_SIZE: int = 100
     APISIX_REQUEST_TIMEOUT: int = 10
+    APISIX_PAGE_SIZE: int = 500  # Between 10 and 500, for paginated listings
+    APISIX_MAX_RETRIES: int = (
+        2  # Idempotent requests, on 429, 5xx and connection errors
+    )
+    APISIX_RETRY_BACKOFF_SECONDS: float = 0.1  # Doubled on every retry, with jitter
+    APISIX_RETRY_MAX_BACKOFF_SECONDS: float = 1
+    APISIX_CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5  # Consecutive, 0 to disable
+    APISIX_CIRCUIT_BREAKER_RECOVERY_SECONDS: float = 30  # Open before probing again
+    APISIX_JWT_CONFIG_UPDATE_CONCURRENCY: int = 10  # Consumers updated in parallel
+    APISIX_JWT_CONFIG_UPDATE_MAX_RETRIES: int = 5  # On 429, 5xx and connection errors
+    APISIX_JWT_CONFIG_UPDATE_BACKOFF_SECONDS: float = 0.5  # Doubled on every retry
+    APISIX_JWT_CONFIG_UPDATE_MAX_BACKOFF_SECONDS: float = 30
+    APISIX_OUTBOX_ENABLED: bool = False  # Provision consumers after the request
+    APISIX_OUTBOX_BATCH_SIZE: int = 100  # Events read at once
+    APISIX_OUTBOX_CONCURRENCY: int = 10  # Users provisioned in parallel
+    APISIX_OUTBOX_POLL_INTERVAL_SECONDS: float = 1
+    APISIX_OUTBOX_RETRY_BACKOFF_SECONDS: float = 1  # Doubled on every failed attempt
+    APISIX_OUTBOX_RETRY_MAX_BACKOFF_SECONDS: float = 300
+    APISIX_OUTBOX_MAX_ATTEMPTS: int = 10  # Before marking the event as failed
+    APISIX_RECONCILIATION_CONCURRENCY: int = 10  # Drifted resources fixed in parallel
 
     # Apisix Consumer Groups (Payment Plans) ---------------
     APISIX_FREEMIUM_CONSUMER_GROUP_REQUESTS_PER_SECOND_MAX: int = 10
@@ -87,6 +142,17 @@ class Settings(BaseSettings):
     EVENTS_SERVICE_CONNECTIONS_POOL_SIZE: int = 100
     EVENTS_SERVICE_WEBHOOKS_CREATION_LIMIT: int = 5
     EVENTS_SERVICE_REQUEST_TIMEOUT: int = 10
+    EVENTS_SERVICE_CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = (
+        5  # Consecutive, 0 to disable
+    )
+    EVENTS_SERVICE_CIRCUIT_BREAKER_RECOVERY_SECONDS: float = 30
+    EVENTS_SERVICE_HEDGED_REQUESTS: bool = True  # Duplicate slow GET requests
+    EVENTS_SERVICE_HEDGE_PERCENTILE: int = 95  # Of the latency, delay of duplicates
+    EVENTS_SERVICE_HEDGE_MIN_DELAY_SECONDS: float = 0.01
+    EVENTS_SERVICE_WEBHOOK_CACHE_LOCAL_MAX_SIZE: int = 10_000  # 0 to disable
+    EVENTS_SERVICE_WEBHOOK_CACHE_LOCAL_TTL_SECONDS: int = 5
+    EVENTS_SERVICE_WEBHOOK_CACHE_TTL_SECONDS: int = 60
+    EVENTS_SERVICE_WEBHOOK_CACHE_STALE_TTL_SECONDS: int = 60 * 10  # 10 minutes
 
 
 settings = Settings()
@@ -94,12 +160,14 @@ settings = Settings()
 LOGGING_CONFIG = {
     "version": 1,
     "disable_existing_loggers": False,
-    "formatters": {"json": {"()": SafeJsonFormatter}},  # Custom formatter class
     "handlers": {
+        # Records are written as JSON by a listener thread, not blocking the event loop
         "console": {
+            "()": create_queue_handler,
             "level": settings.LOG_LEVEL,
-            "class": "logging.StreamHandler",
-            "formatter": "json",
+            "max_size": settings.LOG_QUEUE_MAX_SIZE,
+            "full_policy": settings.LOG_QUEUE_FULL_POLICY,
+            "batch_size": settings.LOG_BATCH_SIZE,
         }
     },
     "loggers": {
@@ -1,6 +1,11 @@
 from abc import ABC, abstractmethod
+from typing import AsyncIterator, Callable
 
-from ...models.api_gateway import Consumer, ConsumerGroup
+from ...models.api_gateway import (
+    Consumer,
+    ConsumerGroup,
+    ConsumersJwtConfigUpdateSummary,
+)
 
 
 class ApiGatewayClient(ABC):
@@ -18,6 +23,24 @@ class ApiGatewayClient(ABC):
         """
         pass
 
+    @abstractmethod
+    def iter_consumer_groups(
+        self, page_size: int | None = None
+    ) -> AsyncIterator[ConsumerGroup]:
+        """
+        Iterates over all consumer groups, requesting them page by page.
+
+        Args:
+            page_size: Consumer groups requested on every page. Configured in settings by default.
+
+        Returns:
+            An async iterator of Consumer group instances.
+
+        Raises:
+            ApiGatewayRequestError: If there is an error while fetching a page of consumer groups (e.g., HTTP error, invalid response).
+        """
+        pass
+
     @abstractmethod
     async def get_consumer_group(self, consumer_group_name: str) -> ConsumerGroup:
         """
@@ -57,6 +80,34 @@ class ApiGatewayClient(ABC):
         """
         pass
 
+    @abstractmethod
+    async def add_consumer_group_with_rate_limit(
+        self,
+        name: str,
+        requests_number: int,
+        time_window: int,
+        description: str | None = None,
+        labels: dict[str, str] | None = None,
+    ) -> bool:
+        """
+        Adds a new consumer group with a rate limit in a single request, so the group is
+        never exposed without its rate limit.
+
+        Args:
+            name: The name of the consumer group to be added.
+            requests_number: The maximum number of requests allowed within the time window.
+            time_window: The time window (in seconds) within which the requests are counted.
+            description: A description for the new consumer group.
+            labels: A dictionary of labels to be associated with the consumer group.
+
+        Returns:
+            `True` if the consumer group was successfully added, otherwise `False`.
+
+        Raises:
+            ApiGatewayRequestError: If there is an error while adding the consumer group (e.g., HTTP error, invalid response).
+        """
+        pass
+
     @abstractmethod
     async def update_consumer_group(
         self, name: str, new_description: str, new_labels: dict[str, str]
@@ -126,6 +177,22 @@ class ApiGatewayClient(ABC):
         """
         pass
 
+    @abstractmethod
+    def iter_consumers(self, page_size: int | None = None) -> AsyncIterator[Consumer]:
+        """
+        Iterates over all consumers, requesting them page by page.
+
+        Args:
+            page_size: Consumers requested on every page. Configured in settings by default.
+
+        Returns:
+            An async iterator of Consumer instances.
+
+        Raises:
+            ApiGatewayRequestError: If there is an error while fetching a page of consumers (e.g., HTTP error, invalid response).
+        """
+        pass
+
     @abstractmethod
     async def get_consumer(self, consumer_name: str) -> Consumer:
         """
@@ -185,15 +252,32 @@ class ApiGatewayClient(ABC):
         pass
 
     @abstractmethod
-    async def update_consumers_jwt_config(self) -> None:
+    async def update_consumers_jwt_config(
+        self,
+        dry_run: bool = False,
+        resume_after: str | None = None,
+        max_concurrency: int | None = None,
+        progress_callback: (
+            Callable[[ConsumersJwtConfigUpdateSummary], None] | None
+        ) = None,
+    ) -> ConsumersJwtConfigUpdateSummary:
         """
         Updates the JWT configuration for all consumers. For each consumer, this method will fetch its details
         and update its JWT authentication configuration with the current PUBLIC KEY configuration for JWT token validation (if changed).
+        Consumers are requested page by page and processed in the Api Gateway order, updating up to
+        `max_concurrency` at the same time.
+
+        Args:
+            dry_run: If `True`, only count the consumers that would be updated.
+            resume_after: Skip consumers up to this name (included), as returned in `last_consumer_name`
+                by a previous update.
+            max_concurrency: Maximum number of consumers updated at the same time. Configured in settings by default.
+            progress_callback: Called with the current summary after every consumer is processed.
 
         Returns:
-            None
+            Summary of the update. Consumers that could not be updated are listed in `failed`.
 
         Raises:
-            ApiGatewayRequestError: If there is an error while fetching or updating any consumer (e.g., HTTP error, invalid response).
+            ApiGatewayRequestError: If there is an error while fetching the consumers (e.g., HTTP error, invalid response).
         """
         pass
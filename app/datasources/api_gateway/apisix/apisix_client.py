@@ -1,17 +1,28 @@
+import asyncio
 import logging
+import random
+import time
 from functools import cache
-from typing import Any, Callable
+from typing import Any, AsyncIterator, Callable
 
 import aiohttp
-from safe_eth.util.http import build_full_url
 
 from ....config import settings
-from ....models.api_gateway import Consumer, ConsumerGroup
+from ....models.api_gateway import (
+    Consumer,
+    ConsumerGroup,
+    ConsumersJwtConfigUpdateSummary,
+)
+from ...http_client.circuit_breaker import CircuitBreaker, CircuitBreakerOpen
+from ...http_client.instrumented_http_client import InstrumentedHttpClient
 from ..api_gateway_client import ApiGatewayClient
-from ..exceptions import ApiGatewayRequestError
+from ..exceptions import ApiGatewayRequestError, ApiGatewayUnavailable
 
 logger = logging.getLogger(__name__)
 
+# Requests that can be sent again with the same result
+IDEMPOTENT_METHODS = frozenset({"GET", "PUT", "DELETE"})
+
 
 @cache
 def get_apisix_client() -> "ApisixClient":
@@ -26,16 +37,75 @@ def get_apisix_client() -> "ApisixClient":
         api_key=settings.APISIX_API_KEY,
         connections_pool_size=settings.APISIX_CONNECTIONS_POOL_SIZE,
         request_timeout=settings.APISIX_REQUEST_TIMEOUT,
+        max_retries=settings.APISIX_MAX_RETRIES,
+        retry_backoff_seconds=settings.APISIX_RETRY_BACKOFF_SECONDS,
+        retry_max_backoff_seconds=settings.APISIX_RETRY_MAX_BACKOFF_SECONDS,
+        circuit_breaker=(
+            CircuitBreaker(
+                "apisix",
+                failure_threshold=settings.APISIX_CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+                recovery_seconds=settings.APISIX_CIRCUIT_BREAKER_RECOVERY_SECONDS,
+            )
+            if settings.APISIX_CIRCUIT_BREAKER_FAILURE_THRESHOLD
+            else None
+        ),
     )
 
 
-class ApisixClient(ApiGatewayClient):
+class AdaptiveBackoff:
+    """
+    Backoff shared by concurrent requests. When Apisix is throttling or failing, every
+    request waits, and the delay doubles on consecutive errors and halves on success.
+    """
+
+    def __init__(self, initial_delay: float, max_delay: float):
+        """
+
+        Args:
+            initial_delay: Seconds to wait after the first error.
+            max_delay: Maximum seconds to wait.
+        """
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.delay = 0.0
+        self.resume_at = 0.0
+
+    async def wait(self) -> None:
+        if (remaining := self.resume_at - time.monotonic()) > 0:
+            await asyncio.sleep(remaining)
+
+    def on_error(self) -> None:
+        self.delay = min(max(self.delay * 2, self.initial_delay), self.max_delay)
+        # Jitter prevents every waiting request from retrying at the same time
+        self.resume_at = max(
+            self.resume_at, time.monotonic() + self.delay * random.uniform(0.5, 1)
+        )
+
+    def on_success(self) -> None:
+        self.delay = self.delay / 2 if self.delay > self.initial_delay else 0.0
+
+
+def is_retryable_error(error: ApiGatewayRequestError) -> bool:
+    return (
+        error.status_code is None
+        or error.status_code == 429
+        or error.status_code >= 500
+    )
+
+
+class ApisixClient(ApiGatewayClient, InstrumentedHttpClient):
+    resource_collections = frozenset({"consumers", "consumer_groups"})
+
     def __init__(
         self,
         base_url: str,
         api_key: str | None = None,
         connections_pool_size: int = 100,
-        request_timeout: int = 10,
+        request_timeout: float = 10,
+        max_retries: int = 0,
+        retry_backoff_seconds: float = 0.1,
+        retry_max_backoff_seconds: float = 1,
+        circuit_breaker: CircuitBreaker | None = None,
     ):
         """
 
@@ -43,33 +113,92 @@ class ApisixClient(ApiGatewayClient):
             base_url: The base URL for the Apisix API.
             api_key: The API key for authenticating requests.
             request_timeout: The timeout (in seconds) for HTTP requests.
+            max_retries: Retries of idempotent requests failing with a connection error,
+                429 or 5xx. Timed out requests are not retried.
+            retry_backoff_seconds: Maximum seconds to wait before the first retry,
+                doubled on every retry. The actual wait is random, up to this maximum.
+            retry_max_backoff_seconds: Maximum seconds to wait before any retry.
+            circuit_breaker: Breaker failing requests fast while Apisix is failing.
         """
-        self.base_url = base_url
+        super().__init__(
+            "apisix",
+            base_url,
+            connections_pool_size=connections_pool_size,
+            request_timeout=request_timeout,
+            circuit_breaker=circuit_breaker,
+        )
         self.api_key = api_key
-        self.async_session = aiohttp.ClientSession(
-            connector=aiohttp.TCPConnector(limit=connections_pool_size)
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.retry_max_backoff_seconds = retry_max_backoff_seconds
+
+    def _is_retryable_request_error(self, error: ApiGatewayRequestError) -> bool:
+        # A timed out request already waited the whole timeout, retrying it would
+        # multiply the time the caller is blocked
+        return is_retryable_error(error) and not isinstance(
+            error.__cause__, asyncio.TimeoutError
         )
-        self.request_timeout = request_timeout
 
     async def _do_request(
-        self, url: str, request_func: Callable, payload: dict[str, Any] | None = None
+        self, url: str, method: str, payload: dict[str, Any] | None = None
     ) -> aiohttp.ClientResponse:
         """
         A generic method to perform HTTP requests (GET, PUT, PATCH, DELETE).
+        Idempotent requests are retried with exponential backoff and full jitter.
 
         Args:
             url: The URL to send the request to.
-            request_func: The function to execute (e.g., async_session.get, async_session.put, async_session.patch, async_session.delete).
+            method: The HTTP method (e.g., GET, PUT, PATCH, DELETE).
             payload: The data to be sent in the request body.
 
         Returns:
             The response object from the HTTP request.
 
         Raises:
+            ApiGatewayUnavailable: If the circuit breaker is open.
             ApiGatewayRequestError: If there is an error with the request.
         """
-        full_url = build_full_url(self.base_url, url)
+        max_retries = self.max_retries if method in IDEMPOTENT_METHODS else 0
+        attempt = 0
+        while True:
+            try:
+                return await self._do_single_request(url, method, payload)
+            except ApiGatewayUnavailable:
+                raise
+            except ApiGatewayRequestError as e:
+                if attempt >= max_retries or not self._is_retryable_request_error(e):
+                    raise
+                delay = random.uniform(
+                    0,
+                    min(
+                        self.retry_backoff_seconds * 2**attempt,
+                        self.retry_max_backoff_seconds,
+                    ),
+                )
+                logger.warning(
+                    "Retrying %s %s in %.3f seconds: %s", method, url, delay, e
+                )
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def _do_single_request(
+        self, url: str, method: str, payload: dict[str, Any] | None = None
+    ) -> aiohttp.ClientResponse:
+        """
+        Sends a single HTTP request, without retries.
+
+        Args:
+            url: The URL to send the request to.
+            method: The HTTP method (e.g., GET, PUT, PATCH, DELETE).
+            payload: The data to be sent in the request body.
+
+        Returns:
+            The response object from the HTTP request.
 
+        Raises:
+            ApiGatewayUnavailable: If the circuit breaker is open.
+            ApiGatewayRequestError: If there is an error with the request.
+        """
         headers = {}
         if self.api_key:
             headers["X-API-KEY"] = self.api_key
@@ -77,21 +206,24 @@ class ApisixClient(ApiGatewayClient):
             headers["Content-Type"] = "application/json"
 
         try:
-            response = await request_func(
-                full_url,
-                json=payload if payload else None,
-                headers=headers,
-                timeout=aiohttp.ClientTimeout(total=self.request_timeout),
+            response = await self._send_request(
+                method, url, json=payload if payload else None, headers=headers
             )
 
+        except CircuitBreakerOpen as e:
+            raise ApiGatewayUnavailable(
+                f"Error performing request to {url}: {e}", e.retry_after_seconds
+            ) from e
         except (ValueError, IOError) as e:
             raise ApiGatewayRequestError(
                 f"Error performing request to {url} with payload {payload}"
             ) from e
 
         if not response.ok:
+            response.release()
             raise ApiGatewayRequestError(
-                f"Error performing request to {url} with payload {payload}: {response.status} {response.reason}"
+                f"Error performing request to {url} with payload {payload}: {response.status} {response.reason}",
+                status_code=response.status,
             )
 
         return response
@@ -109,7 +241,7 @@ class ApisixClient(ApiGatewayClient):
         Raises:
             ApiGatewayRequestError: If there is an error with the request.
         """
-        return await self._do_request(url, self.async_session.get)
+        return await self._do_request(url, "GET")
 
     async def _put_request(
         self, url: str, payload: dict[str, Any]
@@ -127,7 +259,7 @@ class ApisixClient(ApiGatewayClient):
         Raises:
             ApiGatewayRequestError: If there is an error with the request.
         """
-        return await self._do_request(url, self.async_session.put, payload)
+        return await self._do_request(url, "PUT", payload)
 
     async def _patch_request(
         self, url: str, payload: dict[str, Any]
@@ -145,7 +277,7 @@ class ApisixClient(ApiGatewayClient):
         Raises:
             ApiGatewayRequestError: If there is an error with the request.
         """
-        return await self._do_request(url, self.async_session.patch, payload)
+        return await self._do_request(url, "PATCH", payload)
 
     async def _delete_request(self, url: str) -> aiohttp.ClientResponse:
         """
@@ -160,7 +292,7 @@ class ApisixClient(ApiGatewayClient):
         Raises:
             ApiGatewayRequestError: If there is an error with the request.
         """
-        return await self._do_request(url, self.async_session.delete)
+        return await self._do_request(url, "DELETE")
 
     def _parse_consumer_group_reponse(
         self, consumer_group_data: dict[str, Any]
@@ -182,6 +314,46 @@ class ApisixClient(ApiGatewayClient):
             plugins=consumer_group_data_value.get("plugins"),
         )
 
+    async def _iter_pages(
+        self, url: str, page_size: int | None
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        Requests a list endpoint page by page.
+
+        Pages are not a snapshot: elements created or deleted while iterating can move
+        to another page, so they could be returned twice or not returned.
+
+        Args:
+            url: The URL of the list endpoint.
+            page_size: Elements requested on every page. Configured in settings by default.
+
+        Returns:
+            An async iterator of the raw elements of the list.
+
+        Raises:
+            ApiGatewayRequestError: If there is an error with the request.
+        """
+        page_size = page_size or settings.APISIX_PAGE_SIZE
+        page = 1
+        while True:
+            response = await self._get_request(
+                f"{url}?page={page}&page_size={page_size}"
+            )
+            page_elements = (await response.json()).get("list") or []
+            for element in page_elements:
+                yield element
+            if len(page_elements) < page_size:
+                return
+            page += 1
+
+    async def iter_consumer_groups(
+        self, page_size: int | None = None
+    ) -> AsyncIterator[ConsumerGroup]:
+        async for consumer_group_data in self._iter_pages(
+            "/apisix/admin/consumer_groups/", page_size
+        ):
+            yield self._parse_consumer_group_reponse(consumer_group_data)
+
     async def get_consumer_groups(self) -> list[ConsumerGroup]:
         url = "/apisix/admin/consumer_groups/"
         response = await self._get_request(url)
@@ -198,15 +370,13 @@ class ApisixClient(ApiGatewayClient):
 
         return self._parse_consumer_group_reponse(consumer_group_data)
 
-    async def add_consumer_group(
+    def _get_consumer_group_data(
         self,
-        name: str,
-        description: str | None = None,
-        labels: dict[str, str] | None = None,
-    ) -> bool:
-        url = f"/apisix/admin/consumer_groups/{name}"
-
-        data: dict[str, Any] = {"plugins": {}}
+        plugins: dict[str, Any],
+        description: str | None,
+        labels: dict[str, str] | None,
+    ) -> dict[str, Any]:
+        data: dict[str, Any] = {"plugins": plugins}
 
         if labels:
             data["labels"] = labels
@@ -214,6 +384,47 @@ class ApisixClient(ApiGatewayClient):
         if description:
             data["desc"] = description
 
+        return data
+
+    def _get_rate_limit_plugins(
+        self, requests_number: int, time_window: int
+    ) -> dict[str, Any]:
+        return {
+            "limit-count": {
+                "count": requests_number,
+                "time_window": time_window,
+                "rejected_code": 429,
+                "rejected_msg": "Too many requests",
+                "key_type": "var",
+                "key": "consumer_group_id",
+            }
+        }
+
+    async def add_consumer_group(
+        self,
+        name: str,
+        description: str | None = None,
+        labels: dict[str, str] | None = None,
+    ) -> bool:
+        url = f"/apisix/admin/consumer_groups/{name}"
+        data = self._get_consumer_group_data({}, description, labels)
+        response = await self._put_request(url, data)
+        return response.ok
+
+    async def add_consumer_group_with_rate_limit(
+        self,
+        name: str,
+        requests_number: int,
+        time_window: int,
+        description: str | None = None,
+        labels: dict[str, str] | None = None,
+    ) -> bool:
+        url = f"/apisix/admin/consumer_groups/{name}"
+        data = self._get_consumer_group_data(
+            self._get_rate_limit_plugins(requests_number, time_window),
+            description,
+            labels,
+        )
         response = await self._put_request(url, data)
         return response.ok
 
@@ -239,18 +450,7 @@ class ApisixClient(ApiGatewayClient):
     ) -> bool:
         url = f"/apisix/admin/consumer_groups/{consumer_group_name}"
 
-        data = {
-            "plugins": {
-                "limit-count": {
-                    "count": requests_number,
-                    "time_window": time_window,
-                    "rejected_code": 429,
-                    "rejected_msg": "Too many requests",
-                    "key_type": "var",
-                    "key": "consumer_group_id",
-                }
-            }
-        }
+        data = {"plugins": self._get_rate_limit_plugins(requests_number, time_window)}
         response = await self._patch_request(url, data)
         return response.ok
 
@@ -282,6 +482,14 @@ class ApisixClient(ApiGatewayClient):
             for consumer_data in consumers_list.get("list", [])
         ]
 
+    async def iter_consumers(
+        self, page_size: int | None = None
+    ) -> AsyncIterator[Consumer]:
+        async for consumer_data in self._iter_pages(
+            "/apisix/admin/consumers/", page_size
+        ):
+            yield self._parse_consumer_reponse(consumer_data)
+
     async def get_consumer(self, consumer_name: str) -> Consumer:
         url = f"/apisix/admin/consumers/{consumer_name}"
         response = await self._get_request(url)
@@ -289,16 +497,14 @@ class ApisixClient(ApiGatewayClient):
 
         return self._parse_consumer_reponse(consumer_data)
 
-    async def upsert_consumer(
+    def _get_consumer_payload(
         self,
         consumer_name: str,
         description: str | None = None,
         labels: dict[str, str] | None = None,
         consumer_group_name: str | None = None,
-    ) -> bool:
-        url = "/apisix/admin/consumers/"
-
-        data = {
+    ) -> dict[str, Any]:
+        data: dict[str, Any] = {
             "username": consumer_name,
             "plugins": {
                 "jwt-auth": {
@@ -318,6 +524,19 @@ class ApisixClient(ApiGatewayClient):
         if consumer_group_name:
             data["group_id"] = consumer_group_name
 
+        return data
+
+    async def upsert_consumer(
+        self,
+        consumer_name: str,
+        description: str | None = None,
+        labels: dict[str, str] | None = None,
+        consumer_group_name: str | None = None,
+    ) -> bool:
+        url = "/apisix/admin/consumers/"
+        data = self._get_consumer_payload(
+            consumer_name, description, labels, consumer_group_name
+        )
         response = await self._put_request(url, data)
         return response.ok
 
@@ -326,13 +545,144 @@ class ApisixClient(ApiGatewayClient):
         response = await self._delete_request(url)
         return response.ok
 
-    async def update_consumers_jwt_config(self) -> None:
-        consumers = await self.get_consumers()
+    def _is_consumer_jwt_config_updated(self, consumer: Consumer) -> bool:
+        jwt_auth = (consumer.plugins or {}).get("jwt-auth") or {}
+        return (
+            jwt_auth.get("key") == consumer.name
+            and jwt_auth.get("algorithm") == settings.JWT_ALGORITHM
+            and jwt_auth.get("public_key") == settings.JWT_PUBLIC_KEY
+        )
 
-        for consumer in consumers:
-            await self.upsert_consumer(
-                consumer.name,
-                consumer.description,
-                consumer.labels,
-                consumer.consumer_group_name,
-            )
+    async def _update_consumer_jwt_config(
+        self, consumer: Consumer, backoff: AdaptiveBackoff, max_retries: int
+    ) -> None:
+        """
+        Sends the consumer with the current JWT config. Requests are sent without the
+        client retries, so `backoff` is the only retry policy and slows down every
+        worker when Apisix is overloaded.
+
+        Raises:
+            ApiGatewayRequestError: If the consumer could not be updated after `max_retries`
+        """
+        data = self._get_consumer_payload(
+            consumer.name,
+            consumer.description,
+            consumer.labels,
+            consumer.consumer_group_name,
+        )
+        for attempt in range(max_retries + 1):
+            await backoff.wait()
+            try:
+                await self._do_single_request("/apisix/admin/consumers/", "PUT", data)
+            except ApiGatewayRequestError as e:
+                if attempt == max_retries or not is_retryable_error(e):
+                    raise
+                logger.warning(
+                    "Retrying JWT config update of consumer %s: %s", consumer.name, e
+                )
+                backoff.on_error()
+            else:
+                backoff.on_success()
+                return
+
+    async def update_consumers_jwt_config(
+        self,
+        dry_run: bool = False,
+        resume_after: str | None = None,
+        max_concurrency: int | None = None,
+        progress_callback: (
+            Callable[[ConsumersJwtConfigUpdateSummary], None] | None
+        ) = None,
+    ) -> ConsumersJwtConfigUpdateSummary:
+        max_concurrency = (
+            max_concurrency or settings.APISIX_JWT_CONFIG_UPDATE_CONCURRENCY
+        )
+        summary = ConsumersJwtConfigUpdateSummary(
+            dry_run=dry_run, last_consumer_name=resume_after
+        )
+        backoff = AdaptiveBackoff(
+            settings.APISIX_JWT_CONFIG_UPDATE_BACKOFF_SECONDS,
+            settings.APISIX_JWT_CONFIG_UPDATE_MAX_BACKOFF_SECONDS,
+        )
+        # Consumers in iteration order that were not processed yet, with their result.
+        # Resume point only moves forward over consumers processed without errors,
+        # and it stops after the first error.
+        not_processed: dict[int, list[Any]] = {}
+        resume_point_stopped = False
+
+        def update_resume_point(index: int, success: bool) -> None:
+            nonlocal resume_point_stopped
+            if resume_point_stopped:
+                return
+            not_processed[index][1] = success
+            for pending_index, (consumer_name, result) in list(not_processed.items()):
+                if result is None:
+                    break
+                if result is False:
+                    resume_point_stopped = True
+                    not_processed.clear()
+                    break
+                summary.last_consumer_name = consumer_name
+                del not_processed[pending_index]
+
+        async def process(index: int, consumer: Consumer) -> None:
+            success = True
+            if self._is_consumer_jwt_config_updated(consumer):
+                summary.up_to_date += 1
+            elif dry_run:
+                summary.updated += 1
+            else:
+                try:
+                    await self._update_consumer_jwt_config(
+                        consumer, backoff, settings.APISIX_JWT_CONFIG_UPDATE_MAX_RETRIES
+                    )
+                except ApiGatewayRequestError as e:
+                    logger.error(
+                        "Cannot update JWT config of consumer %s: %s", consumer.name, e
+                    )
+                    summary.failed.append(consumer.name)
+                    success = False
+                else:
+                    summary.updated += 1
+
+            summary.total += 1
+            update_resume_point(index, success)
+            if progress_callback:
+                progress_callback(summary)
+
+        # Consumers are streamed to the workers, so at most `max_concurrency` are
+        # updated at once and only a few pages are kept in memory
+        queue: asyncio.Queue[tuple[int, Consumer] | None] = asyncio.Queue(
+            maxsize=max_concurrency
+        )
+
+        async def producer() -> None:
+            index = 0
+            async for consumer in self.iter_consumers():
+                # Consumers are sorted by name, so the resume point works even if the
+                # consumer it refers to was deleted
+                if resume_after is not None and consumer.name <= resume_after:
+                    continue
+                if not resume_point_stopped:
+                    not_processed[index] = [consumer.name, None]
+                await queue.put((index, consumer))
+                index += 1
+            for _ in range(max_concurrency):
+                await queue.put(None)
+
+        async def worker() -> None:
+            while (element := await queue.get()) is not None:
+                await process(*element)
+
+        tasks = [
+            asyncio.ensure_future(producer()),
+            *(asyncio.ensure_future(worker()) for _ in range(max_concurrency)),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            # If a task fails, the others would wait forever on the queue
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return summary
@@ -1,2 +1,26 @@
 class ApiGatewayRequestError(Exception):
-    pass
+    def __init__(self, message: str, status_code: int | None = None):
+        """
+
+        Args:
+            message:
+            status_code: HTTP status code of the response, `None` if no response was received.
+        """
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ApiGatewayUnavailable(ApiGatewayRequestError):
+    """
+    Requests to the API gateway fail fast without being sent, as it's failing.
+    """
+
+    def __init__(self, message: str, retry_after_seconds: float):
+        """
+
+        Args:
+            message:
+            retry_after_seconds: Seconds until requests are sent again.
+        """
+        super().__init__(message)
+        self.retry_after_seconds = retry_after_seconds
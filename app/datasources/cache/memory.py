@@ -0,0 +1,81 @@
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, TypeVar
+
+from prometheus_client import Counter
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+in_process_cache_requests_total = Counter(
+    "in_process_cache_requests_total",
+    "In-process cache lookups",
+    ["cache", "result"],
+)
+
+
+class TTLLRUCache(Generic[K, V]):
+    """
+    Bounded in-process LRU cache where every entry has its own expiration time.
+    It is not thread safe, it is designed to be used from the event loop.
+    """
+
+    def __init__(self, name: str, max_size: int):
+        """
+
+        Args:
+            name: Name of the cache, used as metric label.
+            max_size: Maximum number of entries. When reached, the least recently used
+                entry is evicted. If `0`, nothing will be cached.
+        """
+        self.name = name
+        self.max_size = max_size
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._hits = in_process_cache_requests_total.labels(name, "hit")
+        self._misses = in_process_cache_requests_total.labels(name, "miss")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> V | None:
+        """
+        Args:
+            key:
+
+        Returns:
+            Cached value if present and not expired, `None` otherwise
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self._hits.inc()
+                return value
+            del self._entries[key]
+        self._misses.inc()
+        return None
+
+    def set(self, key: K, value: V, ttl_seconds: float) -> None:
+        """
+        Stores a value, evicting the least recently used entry if the cache is full.
+
+        Args:
+            key:
+            value:
+            ttl_seconds: Seconds until the entry expires. Entries with a non-positive
+                ttl are not stored.
+        """
+        if self.max_size <= 0 or ttl_seconds <= 0:
+            return None
+
+        self._entries[key] = (time.monotonic() + ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: K) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
@@ -1,10 +1,21 @@
 from functools import cache
 
-from redis import Redis
+from redis.asyncio import BlockingConnectionPool, Redis
 
 from ...config import settings
 
 
 @cache
 def get_redis() -> Redis:
-    return Redis.from_url(settings.REDIS_URL)
+    """
+    Creates and returns an asyncio Redis client. Connections are taken from a
+    pool shared by the whole application.
+
+    Returns:
+        An instance of asyncio Redis client.
+    """
+    connection_pool = BlockingConnectionPool.from_url(
+        settings.REDIS_URL,
+        max_connections=settings.REDIS_CONNECTIONS_POOL_SIZE,
+    )
+    return Redis(connection_pool=connection_pool)
@@ -0,0 +1,346 @@
+import asyncio
+import json
+import logging
+import uuid
+from typing import Awaitable, Callable, Generic, TypeVar, overload
+
+from pydantic import BaseModel
+
+from prometheus_client import Counter
+from redis.exceptions import RedisError
+
+from .memory import TTLLRUCache
+from .redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+M = TypeVar("M", bound=BaseModel)
+
+redis_cache_requests_total = Counter(
+    "redis_cache_requests_total",
+    "Redis cache lookups",
+    ["cache", "result"],
+)
+
+# Value stored in Redis for keys known not to exist in the source of truth
+MISSING_VALUE = b""
+# Prefix of the values stored in Redis for invalidated keys (tombstones). Every
+# invalidation stores a different value, so values loaded before it are not stored
+INVALIDATED_PREFIX = b"\x00"
+
+# Stores ARGV[3] with expiration ARGV[4] in KEYS, only if the first key still holds
+# the value read before loading it: ARGV[2], or no value if ARGV[1] is "0". Other keys
+# are not written over tombstones of another invalidation. Returns the keys written
+_FILL_SCRIPT = """
+local function is_read_value(value)
+    if ARGV[1] == "0" then
+        return value == false
+    end
+    return value == ARGV[2]
+end
+local written = {}
+if not is_read_value(redis.call("GET", KEYS[1])) then
+    return written
+end
+for i, key in ipairs(KEYS) do
+    local value = redis.call("GET", key)
+    if i == 1 or is_read_value(value) or not value or value:sub(1, 1) ~= "\\0" then
+        redis.call("SET", key, ARGV[3], "EX", ARGV[4])
+        table.insert(written, i)
+    end
+end
+return written
+"""
+
+
+class TwoTierCache(Generic[M]):
+    """
+    Cache for pydantic models with an in-process LRU in front of Redis.
+
+    - The in-process tier only keeps found values for a short time, as it cannot be
+      invalidated from other processes.
+    - The Redis tier is shared by every process, and it can also store that a key
+      does not exist (negative caching). Invalidated keys are kept as tombstones for
+      `tombstone_ttl_seconds`.
+
+    Values loaded by `get_or_load` are only stored if the key was not written or
+    invalidated since it was read, so a lookup racing with an update cannot store the
+    value previous to it. `set` and `set_missing` are explicit writes.
+
+    With `stale_ttl_seconds`, values are kept in Redis for that extra time after they
+    expire, and `get_or_load` serves them while they are refreshed in the background
+    (stale-while-revalidate).
+
+    Redis errors are logged and handled as cache misses, so the source of truth is used.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        model_class: type[M],
+        local_max_size: int,
+        local_ttl_seconds: int,
+        ttl_seconds: int,
+        negative_ttl_seconds: int,
+        stale_ttl_seconds: int = 0,
+        tombstone_ttl_seconds: int = 60,
+    ):
+        """
+
+        Args:
+            name: Name of the cache, used as Redis key prefix and metric label.
+            model_class: Model of the cached values.
+            local_max_size: Maximum number of entries of the in-process tier.
+            local_ttl_seconds: Seconds an entry is kept in the in-process tier.
+            ttl_seconds: Seconds an entry is fresh in Redis.
+            negative_ttl_seconds: Seconds a missing key is remembered in Redis.
+            stale_ttl_seconds: Seconds an expired entry can still be served by `get_or_load`
+                while it's refreshed.
+            tombstone_ttl_seconds: Seconds an invalidated key is remembered in Redis,
+                must be longer than loading a value.
+        """
+        self.name = name
+        self.model_class = model_class
+        self.local_ttl_seconds = local_ttl_seconds
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.stale_ttl_seconds = stale_ttl_seconds
+        self.tombstone_ttl_seconds = tombstone_ttl_seconds
+        self.local_cache: TTLLRUCache[str, dict] = TTLLRUCache(name, local_max_size)
+        # Keys being refreshed in the background, and their tasks
+        self._refresh_tasks: dict[str, asyncio.Task] = {}
+
+    def _get_redis_key(self, key: str) -> str:
+        return f"cache:{self.name}:{key}"
+
+    def _load_model(self, data: dict) -> M:
+        # `model_validate` builds a new instance on every hit, so cached values are never shared
+        return self.model_class.model_validate(data)
+
+    async def _get(self, key: str) -> tuple[bool, M | None, bool, bytes | None]:
+        """
+        Returns:
+            Same as `get`, plus whether the value is stale and the value read from
+            Redis, to store a new value only if it did not change
+        """
+        if (data := self.local_cache.get(key)) is not None:
+            return True, self._load_model(data), False, None
+
+        redis_key = self._get_redis_key(key)
+        try:
+            if self.stale_ttl_seconds:
+                async with get_redis().pipeline(transaction=False) as pipeline:
+                    pipeline.get(redis_key)
+                    pipeline.ttl(redis_key)
+                    value, remaining_ttl = await pipeline.execute()
+            else:
+                value, remaining_ttl = await get_redis().get(redis_key), None
+        except RedisError:
+            logger.warning("Cannot get key %s from %s cache", key, self.name)
+            return False, None, False, None
+
+        if value is None or value.startswith(INVALIDATED_PREFIX):
+            redis_cache_requests_total.labels(self.name, "miss").inc()
+            return False, None, False, value
+        if value == MISSING_VALUE:
+            redis_cache_requests_total.labels(self.name, "negative_hit").inc()
+            return True, None, False, value
+
+        data = json.loads(value)
+        if remaining_ttl is not None and 0 <= remaining_ttl <= self.stale_ttl_seconds:
+            redis_cache_requests_total.labels(self.name, "stale_hit").inc()
+            return True, self._load_model(data), True, value
+
+        redis_cache_requests_total.labels(self.name, "hit").inc()
+        self.local_cache.set(key, data, self.local_ttl_seconds)
+        return True, self._load_model(data), False, value
+
+    async def get(self, key: str) -> tuple[bool, M | None]:
+        """
+        Args:
+            key:
+
+        Returns:
+            A tuple with ``True`` and the cached value (``None`` if the key is known
+            to be missing) if the key is cached, ``(False, None)`` otherwise
+        """
+        cached, value, _, _ = await self._get(key)
+        return cached, value
+
+    async def _fill(
+        self,
+        key: str,
+        read_value: bytes | None,
+        value: M | None,
+        get_keys: Callable[[M], list[str]] | None,
+    ) -> None:
+        """
+        Stores a loaded value, only if `key` still holds `read_value` in Redis.
+
+        Args:
+            key: Key looked up.
+            read_value: Value read from Redis for `key` before loading, `None` if absent.
+            value: Loaded value, `None` if it does not exist.
+            get_keys: Function returning every key of the value, only `key` if not set.
+        """
+        if value is None:
+            if not self.negative_ttl_seconds:
+                return
+            keys, data, serialized_data = [key], None, MISSING_VALUE
+            ttl_seconds = self.negative_ttl_seconds
+        else:
+            keys = get_keys(value) if get_keys else [key]
+            # Looked up key is the one checked by the script
+            keys = [key] + [other_key for other_key in keys if other_key != key]
+            data = value.model_dump(mode="json")
+            serialized_data = json.dumps(data).encode()
+            ttl_seconds = self.ttl_seconds + self.stale_ttl_seconds
+        try:
+            written = await get_redis().register_script(_FILL_SCRIPT)(
+                keys=[self._get_redis_key(key) for key in keys],
+                args=[
+                    "0" if read_value is None else "1",
+                    read_value or b"",
+                    serialized_data,
+                    ttl_seconds,
+                ],
+            )
+        except RedisError:
+            logger.warning("Cannot store keys %s in %s cache", keys, self.name)
+            return
+        if data is not None:
+            for index in written:
+                self.local_cache.set(keys[index - 1], data, self.local_ttl_seconds)
+
+    async def _refresh(
+        self,
+        key: str,
+        read_value: bytes | None,
+        loader: Callable[[], Awaitable[M | None]],
+        get_keys: Callable[[M], list[str]] | None,
+    ) -> None:
+        try:
+            await self._fill(key, read_value, await loader(), get_keys)
+        except Exception:
+            logger.warning("Cannot refresh key %s of %s cache", key, self.name)
+        finally:
+            self._refresh_tasks.pop(key, None)
+
+    @overload
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[M]],
+        get_keys: Callable[[M], list[str]] | None = None,
+    ) -> M:
+        pass
+
+    @overload
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[M | None]],
+        get_keys: Callable[[M], list[str]] | None = None,
+    ) -> M | None:
+        pass
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[M | None]],
+        get_keys: Callable[[M], list[str]] | None = None,
+    ) -> M | None:
+        """
+        Returns the cached value or loads and caches it. Stale values are returned
+        while a single background task per key and process refreshes them.
+
+        The loaded value is not stored if the key was written or invalidated while
+        loading it, as it could be older than the source of truth.
+
+        Args:
+            key:
+            loader: Coroutine function returning the value from the source of truth,
+                `None` if it does not exist.
+            get_keys: Function returning every key the loaded value is stored under,
+                only `key` if not provided.
+
+        Returns:
+            Cached or loaded value, `None` if it does not exist
+        """
+        cached, value, stale, read_value = await self._get(key)
+        if cached:
+            if stale and key not in self._refresh_tasks:
+                self._refresh_tasks[key] = asyncio.create_task(
+                    self._refresh(key, read_value, loader, get_keys)
+                )
+            return value
+
+        value = await loader()
+        await self._fill(key, read_value, value, get_keys)
+        return value
+
+    async def set(self, keys: list[str], value: M) -> None:
+        """
+        Stores the same value under every provided key in both tiers.
+
+        Args:
+            keys:
+            value:
+        """
+        data = value.model_dump(mode="json")
+        serialized_data = json.dumps(data)
+        for key in keys:
+            self.local_cache.set(key, data, self.local_ttl_seconds)
+        try:
+            async with get_redis().pipeline(transaction=False) as pipeline:
+                for key in keys:
+                    pipeline.set(
+                        self._get_redis_key(key),
+                        serialized_data,
+                        ex=self.ttl_seconds + self.stale_ttl_seconds,
+                    )
+                await pipeline.execute()
+        except RedisError:
+            logger.warning("Cannot store keys %s in %s cache", keys, self.name)
+
+    async def set_missing(self, key: str) -> None:
+        """
+        Remembers in Redis that the key does not exist in the source of truth, unless
+        the key is stored or invalidated.
+
+        Args:
+            key:
+        """
+        try:
+            await get_redis().set(
+                self._get_redis_key(key),
+                MISSING_VALUE,
+                ex=self.negative_ttl_seconds,
+                nx=True,
+            )
+        except RedisError:
+            logger.warning("Cannot store missing key %s in %s cache", key, self.name)
+
+    async def delete(self, keys: list[str]) -> None:
+        """
+        Removes the keys from both tiers. Other processes can keep the value in their
+        in-process tier for up to `local_ttl_seconds`. The keys are replaced in Redis
+        by a tombstone, so values loaded or refreshing before are not stored.
+
+        Args:
+            keys:
+        """
+        for key in keys:
+            self.local_cache.delete(key)
+            # Refreshing could store the deleted value again
+            if refresh_task := self._refresh_tasks.pop(key, None):
+                refresh_task.cancel()
+        redis_keys = [self._get_redis_key(key) for key in keys]
+        tombstone = INVALIDATED_PREFIX + uuid.uuid4().bytes
+        try:
+            async with get_redis().pipeline(transaction=False) as pipeline:
+                for redis_key in redis_keys:
+                    pipeline.set(redis_key, tombstone, ex=self.tombstone_ttl_seconds)
+                await pipeline.execute()
+        except RedisError:
+            logger.error("Cannot invalidate keys %s in %s cache", keys, self.name)
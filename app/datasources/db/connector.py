@@ -1,7 +1,7 @@
 import logging
 import uuid
 from contextlib import contextmanager
-from contextvars import ContextVar
+from contextvars import Context, ContextVar
 from functools import cache, wraps
 from typing import Generator
 
@@ -14,15 +14,58 @@ from sqlalchemy.ext.asyncio import (
 from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 
 from ...config import settings
+from .instrumentation import InstrumentedAsyncAdaptedQueuePool, instrument_engine
 
 logger = logging.getLogger(__name__)
 
 pool_classes = {
     NullPool.__name__: NullPool,
-    AsyncAdaptedQueuePool.__name__: AsyncAdaptedQueuePool,
+    AsyncAdaptedQueuePool.__name__: InstrumentedAsyncAdaptedQueuePool,
 }
 
-_db_session_context: ContextVar[str] = ContextVar("db_session_context")
+
+class DatabaseSessionNotAllowed(Exception):
+    pass
+
+
+class DatabaseSessionScope:
+    """
+    Scope of the database session of a context. Session id is only generated when the
+    database session is used for the first time, so contexts that never use the
+    database don't create a session and don't need to remove it.
+
+    The scope is mutable, so child tasks (that copy the ContextVar) share it.
+    """
+
+    __slots__ = ("_session_id", "database_allowed")
+
+    def __init__(self, session_id: str | None = None):
+        self._session_id = session_id
+        self.database_allowed = True
+
+    @property
+    def session_id(self) -> str | None:
+        """
+        Returns:
+            Session id if the database session was used, `None` otherwise
+        """
+        return self._session_id
+
+    def get_or_create_session_id(self) -> str:
+        """
+        Raises:
+            DatabaseSessionNotAllowed: if the database cannot be used in this scope
+        """
+        if not self.database_allowed:
+            raise DatabaseSessionNotAllowed(
+                "Database session cannot be used in this context"
+            )
+        if self._session_id is None:
+            self._session_id = str(uuid.uuid4())
+        return self._session_id
+
+
+_db_session_context: ContextVar[DatabaseSessionScope] = ContextVar("db_session_context")
 
 
 @cache
@@ -34,44 +77,47 @@ def get_engine() -> AsyncEngine:
         Database engine instance
     """
     if settings.TEST:
-        return create_async_engine(
+        engine = create_async_engine(
             settings.DATABASE_URL,
             future=True,
             poolclass=NullPool,
         )
     else:
-        return create_async_engine(
+        engine = create_async_engine(
             settings.DATABASE_URL,
             future=True,
             poolclass=pool_classes.get(settings.DATABASE_POOL_CLASS),
             pool_size=settings.DATABASE_POOL_SIZE,
         )
+    instrument_engine(engine.sync_engine, settings.DATABASE_SLOW_QUERY_SECONDS)
+    return engine
 
 
 @contextmanager
 def set_database_session_context(
     session_id: str | None = None,
-) -> Generator[None, None, None]:
+) -> Generator[DatabaseSessionScope, None, None]:
     """
     Set session ContextVar, at the end it will be removed.
     This context is designed to be used with `async_scoped_session` to define a context scope.
 
 
     Args:
-        session_id: Optional session ID. If not provided, it will be generated automatically.
+        session_id: Optional session ID. If not provided, it will be generated on the first use
+            of the database session.
 
     Yields:
-        Generator function that yields control back to the caller.
+        Scope of the database session for the context.
 
     Finally:
         The session context is removed after the function has finished executing.
     """
 
-    _session_id: str = session_id or str(uuid.uuid4())
+    scope = DatabaseSessionScope(session_id)
     logger.debug("Storing db_session context")
-    token = _db_session_context.set(_session_id)
+    token = _db_session_context.set(scope)
     try:
-        yield
+        yield scope
     finally:
         logger.debug("Removing db_session context")
         _db_session_context.reset(token)
@@ -79,13 +125,62 @@ def set_database_session_context(
 
 def _get_database_session_context() -> str:
     """
-    Get the database session id from the ContextVar.
+    Get the database session id from the ContextVar, generating it on first use.
     Used as a scope function on `async_scoped_session`.
 
     Returns:
         session_id for the current context
+
+    Raises:
+        LookupError: if there is no database session context
+        DatabaseSessionNotAllowed: if the database cannot be used in the current context
+    """
+    return _db_session_context.get().get_or_create_session_id()
+
+
+def get_database_session_id(context: Context | None = None) -> str | None:
+    """
+    Get the database session id without creating the session.
+
+    Args:
+        context: Context to read instead of the current one, like the context of another task.
+
+    Returns:
+        session_id for the context, `None` if the database session was not used
+    """
+    scope = (
+        _db_session_context.get(None)
+        if context is None
+        else context.get(_db_session_context)
+    )
+    if scope:
+        return scope.session_id
+    return None
+
+
+async def remove_database_session(scope: DatabaseSessionScope) -> None:
+    """
+    Close the database session of the scope, only if it was used.
+
+    Args:
+        scope:
+    """
+    if scope.session_id is not None:
+        logger.debug(f"Removing session context: {scope.session_id}")
+        scope.database_allowed = True
+        await db_session.remove()
+
+
+async def disable_database_session() -> None:
+    """
+    Dependency for routes that don't use the database. Using the database session
+    in those routes raises `DatabaseSessionNotAllowed`.
+
+    Defined as a coroutine, so FastAPI runs it in the event loop instead of the
+    threadpool.
     """
-    return _db_session_context.get()
+    if scope := _db_session_context.get(None):
+        scope.database_allowed = False
 
 
 def db_session_context(func):
@@ -105,14 +200,11 @@ def db_session_context(func):
 
     @wraps(func)
     async def wrapper(*args, **kwargs):
-        with set_database_session_context():
+        with set_database_session_context() as scope:
             try:
                 return await func(*args, **kwargs)
             finally:
-                logger.debug(
-                    f"Removing session context: {_get_database_session_context()}"
-                )
-                await db_session.remove()
+                await remove_database_session(scope)
 
     return wrapper
 
@@ -0,0 +1,126 @@
+"""
+Prometheus metrics for the database connection pool and the executed statements.
+"""
+
+import logging
+import re
+import time
+from functools import lru_cache
+from typing import Any
+
+from prometheus_client import Gauge, Histogram
+from sqlalchemy import Connection, Engine, event
+from sqlalchemy.engine import ExceptionContext, ExecutionContext
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
+
+logger = logging.getLogger(__name__)
+
+db_pool_checkout_wait_seconds = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time getting a connection from the database pool, opening it if needed",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+db_pool_connections = Gauge(
+    "db_pool_connections",
+    "Database pool connections by state: `checked_out`, `idle` and `overflow`",
+    ["state"],
+    multiprocess_mode="livesum",
+)
+db_statement_duration_seconds = Histogram(
+    "db_statement_duration_seconds",
+    "Time executing database statements, by normalized statement",
+    ["fingerprint"],
+)
+
+_STRING_LITERAL_PATTERN = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_PATTERN = re.compile(r"\b\d+(?:\.\d+)?\b")
+# Lists of parameters, like `IN ($?::UUID, $?::UUID)`, after replacing the numbers
+_PARAMETER_LIST_PATTERN = re.compile(r"\$\?(?:::\w+)?(?:\s*,\s*\$\?(?:::\w+)?)+")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+_QUERY_START_TIME_KEY = "query_start_time"
+
+
+@lru_cache(maxsize=1024)
+def get_statement_fingerprint(statement: str) -> str:
+    """
+    Args:
+        statement: SQL statement sent to the database.
+
+    Returns:
+        Statement with literals and parameters replaced, so every execution of the
+        same query shares the fingerprint, like `SELECT ... WHERE user.id = $?::UUID`
+    """
+    fingerprint = _STRING_LITERAL_PATTERN.sub("?", statement)
+    fingerprint = _NUMBER_PATTERN.sub("?", fingerprint)
+    fingerprint = _PARAMETER_LIST_PATTERN.sub("...", fingerprint)
+    return _WHITESPACE_PATTERN.sub(" ", fingerprint).strip()
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool recording the checkout wait time and the state of its connections.
+    """
+
+    def _observe_connections(self) -> None:
+        db_pool_connections.labels("checked_out").set(self.checkedout())
+        db_pool_connections.labels("idle").set(self.checkedin())
+        # Overflow is negative while the pool is not full
+        db_pool_connections.labels("overflow").set(max(self.overflow(), 0))
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_wait_seconds.observe(time.perf_counter() - start)
+            self._observe_connections()
+
+    def _do_return_conn(self, record: ConnectionPoolEntry) -> None:
+        super()._do_return_conn(record)
+        self._observe_connections()
+
+
+def instrument_engine(engine: Engine, slow_query_seconds: float = 0) -> None:
+    """
+    Records the duration of every statement executed by the engine.
+
+    Args:
+        engine: Engine to instrument, `sync_engine` for async engines.
+        slow_query_seconds: Statements taking longer are logged with the database
+            session of the context. `0` to disable.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(
+        conn: Connection,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: ExecutionContext | None,
+        executemany: bool,
+    ) -> None:
+        conn.info.setdefault(_QUERY_START_TIME_KEY, []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(
+        conn: Connection,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: ExecutionContext | None,
+        executemany: bool,
+    ) -> None:
+        duration = time.perf_counter() - conn.info[_QUERY_START_TIME_KEY].pop()
+        fingerprint = get_statement_fingerprint(statement)
+        db_statement_duration_seconds.labels(fingerprint).observe(duration)
+        if slow_query_seconds and duration >= slow_query_seconds:
+            logger.warning(f"Slow query took {duration:.3f} seconds: {fingerprint}")
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context: ExceptionContext) -> None:
+        if exception_context.connection is not None and (
+            query_start_times := exception_context.connection.info.get(
+                _QUERY_START_TIME_KEY
+            )
+        ):
+            query_start_times.pop()
@@ -1,11 +1,17 @@
 import datetime
 import uuid
-from typing import Self, Sequence
+from contextlib import asynccontextmanager
+from enum import Enum
+from functools import cache
+from typing import Any, AsyncIterator, ClassVar, Self, Sequence
 
-from sqlalchemy import DateTime, func, update
+from sqlalchemy import JSON, DateTime, exists, func, update
+from sqlalchemy.orm import aliased
 from sqlmodel import Field, SQLModel, col, delete, select
 
-from .connector import db_session
+from ...config import settings
+from ..cache.two_tier_cache import TwoTierCache
+from .connector import db_session, get_engine
 
 
 class SqlQueryBase:
@@ -15,16 +21,21 @@ class SqlQueryBase:
         result = await db_session.execute(select(cls))
         return result.scalars().all()
 
-    async def _save(self):
+    async def _save(self, *related: SQLModel):
+        """
+        Args:
+            *related: Instances stored in the same transaction, like outbox events.
+        """
         db_session.add(self)
+        db_session.add_all(related)
         await db_session.commit()
         return self
 
-    async def update(self):
-        return await self._save()
+    async def update(self, *related: SQLModel):
+        return await self._save(*related)
 
-    async def create(self):
-        return await self._save()
+    async def create(self, *related: SQLModel):
+        return await self._save(*related)
 
 
 class TimeStampedSQLModel(SQLModel):
@@ -60,19 +71,113 @@ class User(SqlQueryBase, SQLModel, table=True):
     async def count(cls) -> int:
         return (await db_session.execute(select(func.count(col(cls.id))))).one()[0]
 
+    @classmethod
+    async def iter_ids(cls, page_size: int = 1000) -> AsyncIterator[uuid.UUID]:
+        """
+        Get the id of every user, sorted, reading one page at a time.
+
+        Args:
+            page_size:
+
+        Returns: Async iterator of user ids.
+
+        """
+        last_id: uuid.UUID | None = None
+        while True:
+            query = select(col(cls.id)).order_by(col(cls.id)).limit(page_size)
+            if last_id is not None:
+                query = query.where(col(cls.id) > last_id)
+            user_ids = (await db_session.execute(query)).scalars().all()
+            for user_id in user_ids:
+                yield user_id
+            if len(user_ids) < page_size:
+                return
+            last_id = user_ids[-1]
+
+    @classmethod
+    async def get_existing_ids(cls, user_ids: list[uuid.UUID]) -> set[uuid.UUID]:
+        """
+        Get the ids of the provided users that exist.
+
+        Args:
+            user_ids:
+
+        Returns: Set of user ids, missing users are not included.
+
+        """
+        query = select(col(cls.id)).where(col(cls.id).in_(user_ids))
+        return set((await db_session.execute(query)).scalars().all())
+
+    @staticmethod
+    def _get_email_cache_key(email: str) -> str:
+        return f"email:{email}"
+
+    @staticmethod
+    def _get_user_id_cache_key(user_id: uuid.UUID) -> str:
+        return f"id:{user_id}"
+
+    def _get_cache_keys(self) -> list[str]:
+        return [
+            self._get_email_cache_key(self.email),
+            self._get_user_id_cache_key(self.id),
+        ]
+
+    @classmethod
+    async def _get_cached(cls, cache_key: str, query) -> Self | None:
+        """
+        Reads the user from the cache, or executes the query and caches the result.
+        Cached users are not attached to the database session.
+
+        Args:
+            cache_key:
+            query: Select query for the user if it's not cached
+
+        Returns:
+            User or None if it does not exist
+        """
+
+        async def load() -> Self | None:
+            result = await db_session.execute(query)
+            return result.scalars().first()
+
+        # Not stored if the user is updated while being read, see `TwoTierCache`
+        return await get_user_cache().get_or_load(  # type: ignore[return-value]
+            cache_key, load, lambda user: user._get_cache_keys()
+        )
+
     @classmethod
     async def get_by_email(cls, email: str) -> Self | None:
-        result = await db_session.execute(select(cls).where(cls.email == email))
-        if user := result.first():
-            return user[0]
-        return None
+        return await cls._get_cached(
+            cls._get_email_cache_key(email), select(cls).where(cls.email == email)
+        )
 
     @classmethod
     async def get_by_user_id(cls, user_id: uuid.UUID) -> Self | None:
-        result = await db_session.execute(select(cls).where(cls.id == user_id))
-        if user := result.first():
-            return user[0]
-        return None
+        return await cls._get_cached(
+            cls._get_user_id_cache_key(user_id), select(cls).where(cls.id == user_id)
+        )
+
+    @classmethod
+    async def lock_by_user_id(cls, user_id: uuid.UUID) -> bool:
+        """
+        Lock the user row until the end of the current transaction (`SELECT ... FOR UPDATE`),
+        so operations for the same user are serialized.
+
+        Args:
+            user_id:
+
+        Returns: True if the user exists, False otherwise.
+
+        """
+        query = select(col(cls.id)).where(cls.id == user_id).with_for_update()
+        result = await db_session.execute(query)
+        return result.first() is not None
+
+    async def create(self, *related: SQLModel):
+        user = await super().create(*related)
+        # Remove the negative cache entries for the new user
+        await get_user_cache().delete(self._get_cache_keys())
+        return user
 
     @classmethod
     async def update_password(cls, user_id: uuid.UUID, new_password: str) -> bool:
@@ -90,15 +195,60 @@ class User(SqlQueryBase, SQLModel, table=True):
             update(cls)
             .where(col(cls.id) == user_id)
             .values(hashed_password=new_password)
+            .returning(col(cls.email))
         )
         result = await db_session.execute(query)
+        emails = result.scalars().all()
         await db_session.commit()
-        return True if result.rowcount == 1 else False
+        await get_user_cache().delete(
+            [cls._get_user_id_cache_key(user_id)]
+            + [cls._get_email_cache_key(email) for email in emails]
+        )
+        return True if len(emails) == 1 else False
+
+    @classmethod
+    async def delete_by_user_id(cls, user_id: uuid.UUID) -> bool:
+        """
+        Delete a user by id.
+
+        Args:
+            user_id:
+
+        Returns: True if deleted False otherwise.
+
+        """
+        query = delete(cls).where(col(cls.id) == user_id).returning(col(cls.email))
+        result = await db_session.execute(query)
+        emails = result.scalars().all()
+        await db_session.commit()
+        await get_user_cache().delete(
+            [cls._get_user_id_cache_key(user_id)]
+            + [cls._get_email_cache_key(email) for email in emails]
+        )
+        return True if len(emails) == 1 else False
+
+
+@cache
+def get_user_cache() -> TwoTierCache[User]:
+    """
+    Creates and returns the cache for users, shared by id and email lookups.
+
+    Returns:
+        An instance of TwoTierCache for users.
+    """
+    return TwoTierCache(
+        "user",
+        User,
+        settings.USER_CACHE_LOCAL_MAX_SIZE,
+        settings.USER_CACHE_LOCAL_TTL_SECONDS,
+        settings.USER_CACHE_TTL_SECONDS,
+        settings.USER_CACHE_NEGATIVE_TTL_SECONDS,
+    )
 
 
 class ApiKey(SqlQueryBase, TimeStampedSQLModel, SQLModel, table=True):
     id: uuid.UUID = Field(primary_key=True)
-    user_id: uuid.UUID = Field(nullable=False, foreign_key="user.id")
+    user_id: uuid.UUID = Field(nullable=False, foreign_key="user.id", index=True)
     key: str = Field(nullable=False, unique=True)
     description: str = Field(nullable=False, max_length=200)
 
@@ -123,13 +273,16 @@ class ApiKey(SqlQueryBase, TimeStampedSQLModel, SQLModel, table=True):
         return None
 
     @classmethod
-    async def delete_by_ids(cls, api_key_id: uuid.UUID, user_id: uuid.UUID) -> bool:
+    async def delete_by_ids(
+        cls, api_key_id: uuid.UUID, user_id: uuid.UUID, *related: SQLModel
+    ) -> bool:
         """
         Delete an ApiKey by api key id and user id.
 
         Args:
             api_key_id:
             user_id:
+            *related: Instances stored in the same transaction, like outbox events.
 
         Returns: True if deleted False otherwise.
 
@@ -140,9 +293,72 @@ class ApiKey(SqlQueryBase, TimeStampedSQLModel, SQLModel, table=True):
             .where(col(cls.id) == api_key_id)
         )
         result = await db_session.execute(query)
+        db_session.add_all(related)
         await db_session.commit()
         return True if result.rowcount == 1 else False
 
+    @classmethod
+    async def iter_ids(
+        cls, page_size: int = 1000
+    ) -> AsyncIterator[tuple[uuid.UUID, uuid.UUID]]:
+        """
+        Get the id and user id of every ApiKey, sorted by id, reading one page at a time.
+
+        Args:
+            page_size:
+
+        Returns: Async iterator of (api key id, user id).
+
+        """
+        last_id: uuid.UUID | None = None
+        while True:
+            query = (
+                select(col(cls.id), col(cls.user_id))
+                .order_by(col(cls.id))
+                .limit(page_size)
+            )
+            if last_id is not None:
+                query = query.where(col(cls.id) > last_id)
+            rows = (await db_session.execute(query)).all()
+            for api_key_id, user_id in rows:
+                yield api_key_id, user_id
+            if len(rows) < page_size:
+                return
+            last_id = rows[-1][0]
+
+    @classmethod
+    async def get_descriptions(
+        cls, api_key_ids: list[uuid.UUID]
+    ) -> dict[uuid.UUID, str]:
+        """
+        Get the description of the provided ApiKeys.
+
+        Args:
+            api_key_ids:
+
+        Returns: Description by api key id, missing ApiKeys are not included.
+
+        """
+        query = select(col(cls.id), col(cls.description)).where(
+            col(cls.id).in_(api_key_ids)
+        )
+        result = await db_session.execute(query)
+        return {api_key_id: description for api_key_id, description in result.all()}
+
+    @classmethod
+    async def count_by_user(cls, user_id: uuid.UUID) -> int:
+        """
+        Count the ApiKeys of a user.
+
+        Args:
+            user_id:
+
+        Returns: Number of ApiKeys.
+
+        """
+        query = select(func.count()).select_from(cls).where(cls.user_id == user_id)
+        return (await db_session.execute(query)).scalar_one()
+
     @classmethod
     async def get_api_keys_by_user(cls, user_id: uuid.UUID) -> Sequence["ApiKey"]:
         """
@@ -161,7 +377,7 @@ class ApiKey(SqlQueryBase, TimeStampedSQLModel, SQLModel, table=True):
 
 class Webhook(SqlQueryBase, TimeStampedSQLModel, SQLModel, table=True):
     id: uuid.UUID = Field(primary_key=True)
-    user_id: uuid.UUID = Field(nullable=False, foreign_key="user.id")
+    user_id: uuid.UUID = Field(nullable=False, foreign_key="user.id", index=True)
     description: str = Field(nullable=True, max_length=200)
     external_webhook_id: uuid.UUID = Field(nullable=False, unique=True)
 
@@ -206,6 +422,20 @@ class Webhook(SqlQueryBase, TimeStampedSQLModel, SQLModel, table=True):
         await db_session.commit()
         return True if result.rowcount == 1 else False
 
+    @classmethod
+    async def count_by_user(cls, user_id: uuid.UUID) -> int:
+        """
+        Count the Webhooks of a user.
+
+        Args:
+            user_id:
+
+        Returns: Number of Webhooks.
+
+        """
+        query = select(func.count()).select_from(cls).where(cls.user_id == user_id)
+        return (await db_session.execute(query)).scalar_one()
+
     @classmethod
     async def get_webhooks_by_user(cls, user_id: uuid.UUID) -> Sequence["Webhook"]:
         """
@@ -220,3 +450,136 @@ class Webhook(SqlQueryBase, TimeStampedSQLModel, SQLModel, table=True):
         query = select(cls).where(cls.user_id == user_id)
         result = await db_session.execute(query)
         return result.scalars().all()
+
+
+class ApisixOutboxOperation(str, Enum):
+    ADD_CONSUMER_GROUP = "add_consumer_group"
+    UPSERT_CONSUMER = "upsert_consumer"
+    DELETE_CONSUMER = "delete_consumer"
+
+
+class ApisixOutboxEvent(SqlQueryBase, TimeStampedSQLModel, SQLModel, table=True):
+    """
+    APISIX admin operation pending to be sent, stored in the same transaction as the
+    change requiring it. Events are sent by `ApisixOutboxWorker` in `id` order per user.
+    """
+
+    # Advisory lock held by the process draining the outbox
+    LOCK_ID: ClassVar[int] = 7_211_847_351
+
+    id: int | None = Field(default=None, primary_key=True)
+    user_id: uuid.UUID = Field(nullable=False, index=True)
+    operation: str = Field(nullable=False, max_length=50)
+    resource_name: str = Field(nullable=False, max_length=100)
+    payload: dict[str, Any] = Field(default_factory=dict, sa_type=JSON)
+    # Operation and resource, so the same change cannot be enqueued twice
+    idempotency_key: str = Field(nullable=False, unique=True, max_length=200)
+    attempts: int = Field(default=0, nullable=False)
+    next_attempt_at: datetime.datetime = Field(
+        default_factory=lambda: datetime.datetime.now(datetime.timezone.utc),
+        nullable=False,
+        sa_type=DateTime(timezone=True),  # type: ignore
+        index=True,
+    )
+    last_error: str | None = Field(default=None, nullable=True)
+    # Not retried anymore, kept to be inspected. Doesn't block the following events
+    failed: bool = Field(default=False, nullable=False)
+
+    @classmethod
+    def _build(
+        cls,
+        user_id: uuid.UUID,
+        operation: ApisixOutboxOperation,
+        resource_name: str,
+        payload: dict[str, Any] | None = None,
+    ) -> Self:
+        return cls(
+            user_id=user_id,
+            operation=operation.value,
+            resource_name=resource_name,
+            payload=payload or {},
+            idempotency_key=f"{operation.value}:{resource_name}",
+        )
+
+    @classmethod
+    def add_consumer_group(
+        cls, user_id: uuid.UUID, requests_number: int, time_window: int
+    ) -> Self:
+        return cls._build(
+            user_id,
+            ApisixOutboxOperation.ADD_CONSUMER_GROUP,
+            user_id.hex,
+            {"requests_number": requests_number, "time_window": time_window},
+        )
+
+    @classmethod
+    def upsert_consumer(
+        cls, user_id: uuid.UUID, consumer_name: str, description: str | None
+    ) -> Self:
+        return cls._build(
+            user_id,
+            ApisixOutboxOperation.UPSERT_CONSUMER,
+            consumer_name,
+            {"description": description, "consumer_group_name": user_id.hex},
+        )
+
+    @classmethod
+    def delete_consumer(cls, user_id: uuid.UUID, consumer_name: str) -> Self:
+        return cls._build(user_id, ApisixOutboxOperation.DELETE_CONSUMER, consumer_name)
+
+    @classmethod
+    @asynccontextmanager
+    async def lock_outbox(cls) -> AsyncIterator[bool]:
+        """
+        Lock the outbox while in the context, so only one process sends the events and
+        their order is kept. The lock is held by its own connection in autocommit mode,
+        so no transaction is kept open while the events are sent.
+
+        Returns: True if the lock was acquired, False if another process holds it.
+
+        """
+        async with get_engine().connect() as connection:
+            connection = await connection.execution_options(
+                isolation_level="AUTOCOMMIT"
+            )
+            query = select(func.pg_try_advisory_lock(cls.LOCK_ID))
+            locked = bool((await connection.execute(query)).scalar_one())
+            try:
+                yield locked
+            finally:
+                if locked:
+                    await connection.execute(
+                        select(func.pg_advisory_unlock(cls.LOCK_ID))
+                    )
+
+    @classmethod
+    async def get_pending(cls, limit: int) -> Sequence[Self]:
+        """
+        Get the events ready to be sent, in order. Events of a user waiting for a retry
+        block the following events of the same user, failed events are skipped.
+
+        Args:
+            limit:
+
+        Returns: List of ApisixOutboxEvents.
+
+        """
+        now = datetime.datetime.now(datetime.timezone.utc)
+        previous = aliased(cls)
+        previous_waiting = (
+            exists()
+            .where(col(previous.user_id) == col(cls.user_id))
+            .where(col(previous.id) < col(cls.id))
+            .where(col(previous.next_attempt_at) > now)
+            .where(~col(previous.failed))
+        )
+        query = (
+            select(cls)
+            .where(col(cls.next_attempt_at) <= now)
+            .where(~col(cls.failed))
+            .where(~previous_waiting)
+            .order_by(col(cls.id))
+            .limit(limit)
+        )
+        result = await db_session.execute(query)
+        return result.scalars().all()
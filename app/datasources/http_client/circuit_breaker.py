@@ -0,0 +1,156 @@
+"""
+Circuit breaker for the clients of external services, failing fast while a service is
+failing instead of waiting for every request to time out.
+"""
+
+import enum
+import logging
+import time
+
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+circuit_breaker_state = Gauge(
+    "circuit_breaker_state",
+    "Circuit breaker state by upstream: 0 closed, 1 half-open, 2 open",
+    ["upstream"],
+    multiprocess_mode="livemax",
+)
+circuit_breaker_transitions_total = Counter(
+    "circuit_breaker_transitions_total",
+    "Circuit breaker state changes by upstream and new state",
+    ["upstream", "state"],
+)
+circuit_breaker_rejected_requests_total = Counter(
+    "circuit_breaker_rejected_requests_total",
+    "Requests failed fast without being sent as the circuit breaker was open",
+    ["upstream"],
+)
+
+
+class CircuitBreakerState(enum.IntEnum):
+    CLOSED = 0
+    HALF_OPEN = 1
+    OPEN = 2
+
+
+class CircuitBreakerOpen(Exception):
+    def __init__(self, upstream: str, retry_after_seconds: float):
+        """
+
+        Args:
+            upstream: Name of the service.
+            retry_after_seconds: Seconds until requests are allowed again.
+        """
+        super().__init__(
+            f"Circuit breaker of {upstream} is open, retry after "
+            f"{retry_after_seconds:.1f} seconds"
+        )
+        self.upstream = upstream
+        self.retry_after_seconds = retry_after_seconds
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures, rejecting every request for
+    `recovery_seconds`. Then it's half-open: up to `half_open_max_requests` probe
+    requests are sent, closing the breaker if they succeed or opening it again if not.
+    """
+
+    def __init__(
+        self,
+        upstream: str,
+        failure_threshold: int = 5,
+        recovery_seconds: float = 30,
+        half_open_max_requests: int = 1,
+    ):
+        """
+
+        Args:
+            upstream: Name of the service, used as metrics label.
+            failure_threshold: Consecutive failures opening the breaker.
+            recovery_seconds: Seconds the breaker stays open before probing the service.
+            half_open_max_requests: Probe requests sent at once when half-open.
+        """
+        self.upstream = upstream
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.half_open_max_requests = half_open_max_requests
+        self.state = CircuitBreakerState.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_requests = 0
+        circuit_breaker_state.labels(upstream).set(self.state)
+
+    def _set_state(self, state: CircuitBreakerState) -> None:
+        if state == self.state:
+            return
+        if state == CircuitBreakerState.OPEN:
+            logger.warning(
+                "Circuit breaker of %s is open after %d consecutive failures",
+                self.upstream,
+                self.consecutive_failures,
+            )
+            self.opened_at = time.monotonic()
+        elif state == CircuitBreakerState.CLOSED:
+            logger.info("Circuit breaker of %s is closed", self.upstream)
+        self.state = state
+        self.probe_requests = 0
+        circuit_breaker_state.labels(self.upstream).set(state)
+        circuit_breaker_transitions_total.labels(
+            self.upstream, state.name.lower()
+        ).inc()
+
+    def before_request(self) -> bool:
+        """
+        Checks if a request can be sent.
+
+        Returns:
+            `True` if the request is a probe of the half-open breaker
+
+        Raises:
+            CircuitBreakerOpen: if the request must fail fast
+        """
+        if self.state == CircuitBreakerState.CLOSED:
+            return False
+        if self.state == CircuitBreakerState.OPEN:
+            retry_after_seconds = (
+                self.opened_at + self.recovery_seconds - time.monotonic()
+            )
+            if retry_after_seconds > 0:
+                circuit_breaker_rejected_requests_total.labels(self.upstream).inc()
+                raise CircuitBreakerOpen(self.upstream, retry_after_seconds)
+            self._set_state(CircuitBreakerState.HALF_OPEN)
+        if self.probe_requests >= self.half_open_max_requests:
+            circuit_breaker_rejected_requests_total.labels(self.upstream).inc()
+            raise CircuitBreakerOpen(self.upstream, 0)
+        self.probe_requests += 1
+        return True
+
+    def after_request(self, is_probe: bool, success: bool | None) -> None:
+        """
+        Records the result of a request allowed by `before_request`.
+
+        Args:
+            is_probe: Value returned by `before_request`.
+            success: If the service answered properly, `None` if the request didn't
+                complete for other reasons, like being cancelled.
+        """
+        if is_probe:
+            if self.state != CircuitBreakerState.HALF_OPEN:
+                return
+            self.probe_requests -= 1
+        elif self.state != CircuitBreakerState.CLOSED:
+            # Requests sent before the breaker opened don't change its state
+            return
+
+        if success is None:
+            return
+        if success:
+            self.consecutive_failures = 0
+            self._set_state(CircuitBreakerState.CLOSED)
+            return
+        self.consecutive_failures += 1
+        if is_probe or self.consecutive_failures >= self.failure_threshold:
+            self._set_state(CircuitBreakerState.OPEN)
@@ -0,0 +1,45 @@
+"""
+Deadline of the incoming request being served, so requests to external services don't
+wait longer than the time left to answer it.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Generator
+
+# Monotonic time the current request must be answered by, `None` without deadline
+_request_deadline: ContextVar[float | None] = ContextVar(
+    "request_deadline", default=None
+)
+
+
+@contextmanager
+def set_request_deadline(budget_seconds: float) -> Generator[None, None, None]:
+    """
+    Sets the deadline of the requests sent inside the context. A deadline already set
+    by an outer context is kept if it's earlier.
+
+    Args:
+        budget_seconds: Seconds from now to answer the request, `0` for no deadline.
+    """
+    deadline = _request_deadline.get()
+    if budget_seconds:
+        new_deadline = time.monotonic() + budget_seconds
+        deadline = new_deadline if deadline is None else min(deadline, new_deadline)
+    token = _request_deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _request_deadline.reset(token)
+
+
+def get_remaining_seconds() -> float | None:
+    """
+    Returns:
+        Seconds until the deadline of the current request, negative if it passed.
+        `None` if there is no deadline
+    """
+    if (deadline := _request_deadline.get()) is None:
+        return None
+    return deadline - time.monotonic()
@@ -0,0 +1,137 @@
+"""
+Hedged requests: when a request takes longer than most, a duplicate is sent and the
+first to succeed is used, so a single slow upstream replica doesn't delay the response.
+"""
+
+import asyncio
+import statistics
+import time
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+
+from prometheus_client import Counter
+
+T = TypeVar("T")
+
+http_client_hedged_requests_total = Counter(
+    "http_client_hedged_requests_total",
+    "Duplicated requests sent as the first one was slower than the hedge delay, "
+    "by upstream and request answering first: `primary`, `hedge` or `none` if both failed",
+    ["upstream", "winner"],
+)
+
+
+class HedgingPolicy:
+    """
+    Sends a duplicate request when the first one takes longer than the `percentile` of
+    the latency of the latest requests. Only the first request of every call is
+    measured, so the latency of the duplicates doesn't hide the slow ones.
+    """
+
+    def __init__(
+        self,
+        upstream: str,
+        percentile: int = 95,
+        min_delay_seconds: float = 0.01,
+        min_samples: int = 20,
+        max_samples: int = 1000,
+    ):
+        """
+
+        Args:
+            upstream: Name of the service, used as metrics label.
+            percentile: Percentile of the latency used as hedge delay.
+            min_delay_seconds: Minimum hedge delay, so fast services are not hedged
+                for negligible delays.
+            min_samples: Requests measured before hedging.
+            max_samples: Latest requests used to calculate the delay.
+        """
+        self.upstream = upstream
+        self.percentile = percentile
+        self.min_delay_seconds = min_delay_seconds
+        self.min_samples = max(min_samples, 2)
+        self.latencies: deque[float] = deque(maxlen=max_samples)
+        self._delay: float | None = None
+        # Delay is calculated again after this number of new samples
+        self._update_interval = max(max_samples // 100, 1)
+        self._samples_since_update = 0
+
+    def observe(self, latency_seconds: float) -> None:
+        self.latencies.append(latency_seconds)
+        self._samples_since_update += 1
+
+    def get_delay(self) -> float | None:
+        """
+        Returns:
+            Seconds to wait for a request before sending a duplicate, `None` if there
+            are not enough samples yet
+        """
+        if len(self.latencies) < self.min_samples:
+            return None
+        if self._delay is None or self._samples_since_update >= self._update_interval:
+            self._delay = max(
+                statistics.quantiles(self.latencies, n=100)[self.percentile - 1],
+                self.min_delay_seconds,
+            )
+            self._samples_since_update = 0
+        return self._delay
+
+    async def _measure(self, request: Callable[[], Awaitable[T]]) -> T:
+        start = time.perf_counter()
+        try:
+            result = await request()
+        except asyncio.CancelledError:
+            # Slower than the hedge, the time it ran is a lower bound of its latency.
+            # Not measuring it would drift the delay towards the fastest requests
+            self.observe(time.perf_counter() - start)
+            raise
+        self.observe(time.perf_counter() - start)
+        return result
+
+    async def run(self, request: Callable[[], Awaitable[T]]) -> T:
+        """
+        Runs the request, and a duplicate of it if it's slower than the hedge delay.
+        The slower one is cancelled.
+
+        Args:
+            request: Function sending the request. Must be idempotent.
+
+        Returns:
+            Result of the first request succeeding
+
+        Raises:
+            Exception: Raised by the request if every request failed
+        """
+        delay = self.get_delay()
+        primary = asyncio.ensure_future(self._measure(request))
+        if delay is None:
+            return await primary
+
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return primary.result()
+
+            hedge = asyncio.ensure_future(request())
+            tasks.add(hedge)
+            pending = set(tasks)
+            errors: list[BaseException] = []
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if (error := task.exception()) is not None:
+                        errors.append(error)
+                        continue
+                    winner = "primary" if task is primary else "hedge"
+                    http_client_hedged_requests_total.labels(
+                        self.upstream, winner
+                    ).inc()
+                    return task.result()
+            http_client_hedged_requests_total.labels(self.upstream, "none").inc()
+            raise errors[0]
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,91 @@
+"""
+HTTP clients of the external services, started and closed with the application, so
+sessions are bound to the application event loop and no sockets are leaked on shutdown.
+"""
+
+import asyncio
+import logging
+from typing import Protocol
+
+from ...config import settings
+from ..api_gateway.apisix.apisix_client import get_apisix_client
+from ..metrics.datadog.datadog_client import get_datadog_client
+from ..metrics.prometheus.prometheus_client import get_prometheus_client
+from ..webhooks.events_service.events_service_client import get_events_service_client
+from .instrumented_http_client import InstrumentedHttpClient
+
+logger = logging.getLogger(__name__)
+
+
+class HttpClientFactory(Protocol):
+    """
+    Client factory decorated with `functools.cache`.
+    """
+
+    def __call__(self) -> InstrumentedHttpClient:
+        """
+        Returns:
+            The cached client
+        """
+
+    def cache_clear(self) -> None:
+        """
+        Removes the cached client, so a new one is created on the next call.
+        """
+
+
+def get_http_client_factories() -> dict[str, tuple[HttpClientFactory, bool]]:
+    """
+    Returns:
+        Cached factory of every HTTP client and whether the service is configured,
+        by service name
+    """
+    return {
+        "apisix": (get_apisix_client, bool(settings.APISIX_BASE_URL)),
+        "events_service": (
+            get_events_service_client,
+            bool(settings.EVENTS_SERVICE_BASE_URL),
+        ),
+        "datadog": (get_datadog_client, bool(settings.DATADOG_API_KEY)),
+        "prometheus": (get_prometheus_client, bool(settings.PROMETHEUS_BASE_URL)),
+    }
+
+
+async def start_http_clients(
+    warmup_connections: int = 0, warmup_timeout_seconds: float = 1
+) -> None:
+    """
+    Creates the clients of the configured services and opens connections to them.
+    A service failing to warm up doesn't prevent the application from starting.
+
+    Args:
+        warmup_connections: Connections opened to every service, `0` to disable.
+        warmup_timeout_seconds: Time to open the connections, the startup is delayed
+            at most this long by unreachable services.
+    """
+    clients: list[InstrumentedHttpClient] = [
+        factory()
+        for factory, configured in get_http_client_factories().values()
+        if configured
+    ]
+    if not warmup_connections:
+        return
+    opened_connections = await asyncio.gather(
+        *(
+            client.warmup(warmup_connections, warmup_timeout_seconds)
+            for client in clients
+        )
+    )
+    for client, opened in zip(clients, opened_connections):
+        logger.debug("Opened %d connections to %s", opened, client.upstream)
+
+
+async def close_http_clients() -> None:
+    """
+    Closes every client and clears the factories cache, so a new client is created if
+    the application starts again.
+    """
+    for factory, _ in get_http_client_factories().values():
+        # Sessions are created on first use, closing a client not used is a no-op
+        await factory().close()
+        factory.cache_clear()
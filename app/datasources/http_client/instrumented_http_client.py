@@ -0,0 +1,317 @@
+"""
+Base HTTP client for the external services, recording Prometheus metrics of every request
+so slow upstreams can be told apart.
+"""
+
+import asyncio
+import logging
+import time
+from types import SimpleNamespace
+from typing import Any
+
+import aiohttp
+from prometheus_client import Counter, Histogram
+from safe_eth.util.http import build_full_url
+
+from ...config import settings
+from .circuit_breaker import CircuitBreaker
+from .deadline import get_remaining_seconds
+
+logger = logging.getLogger(__name__)
+
+# Placeholder replacing resource identifiers in endpoint templates
+RESOURCE_ID_PLACEHOLDER = "{id}"
+
+http_client_request_duration_seconds = Histogram(
+    "http_client_request_duration_seconds",
+    "Time until the response headers of outgoing HTTP requests are received",
+    ["upstream", "method", "endpoint", "status_class"],
+)
+http_client_connection_phase_duration_seconds = Histogram(
+    "http_client_connection_phase_duration_seconds",
+    "Time spent on every phase of getting a connection for outgoing HTTP requests",
+    ["upstream", "phase"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+http_client_connections_total = Counter(
+    "http_client_connections_total",
+    "Connections used by outgoing HTTP requests",
+    ["upstream", "reused"],
+)
+
+
+def get_status_class(status: int) -> str:
+    """
+    Args:
+        status: HTTP status code.
+
+    Returns:
+        Status class of the status code, like `2xx`
+    """
+    return f"{status // 100}xx"
+
+
+def create_trace_config(upstream: str) -> aiohttp.TraceConfig:
+    """
+    Creates a trace config recording how long outgoing requests take to get a connection:
+        - `pool_wait`: Waiting for a free connection when the pool limit is reached.
+        - `dns`: Resolving the host, only when not cached.
+        - `connect`: TCP and TLS handshakes of a new connection.
+
+    Args:
+        upstream: Name of the service the requests are sent to.
+
+    Returns:
+        Trace config to add to the client session.
+    """
+
+    def observe_phase(phase: str, duration_seconds: float) -> None:
+        http_client_connection_phase_duration_seconds.labels(upstream, phase).observe(
+            duration_seconds
+        )
+
+    async def on_connection_queued_start(
+        session: aiohttp.ClientSession,
+        context: SimpleNamespace,
+        params: aiohttp.TraceConnectionQueuedStartParams,
+    ) -> None:
+        context.queued_start = time.perf_counter()
+
+    async def on_connection_queued_end(
+        session: aiohttp.ClientSession,
+        context: SimpleNamespace,
+        params: aiohttp.TraceConnectionQueuedEndParams,
+    ) -> None:
+        observe_phase("pool_wait", time.perf_counter() - context.queued_start)
+
+    async def on_connection_create_start(
+        session: aiohttp.ClientSession,
+        context: SimpleNamespace,
+        params: aiohttp.TraceConnectionCreateStartParams,
+    ) -> None:
+        context.create_start = time.perf_counter()
+        context.dns_duration = 0.0
+
+    async def on_connection_create_end(
+        session: aiohttp.ClientSession,
+        context: SimpleNamespace,
+        params: aiohttp.TraceConnectionCreateEndParams,
+    ) -> None:
+        # Host is resolved while creating the connection
+        observe_phase(
+            "connect",
+            time.perf_counter() - context.create_start - context.dns_duration,
+        )
+        http_client_connections_total.labels(upstream, "false").inc()
+
+    async def on_connection_reuseconn(
+        session: aiohttp.ClientSession,
+        context: SimpleNamespace,
+        params: aiohttp.TraceConnectionReuseconnParams,
+    ) -> None:
+        http_client_connections_total.labels(upstream, "true").inc()
+
+    async def on_dns_resolvehost_start(
+        session: aiohttp.ClientSession,
+        context: SimpleNamespace,
+        params: aiohttp.TraceDnsResolveHostStartParams,
+    ) -> None:
+        context.dns_start = time.perf_counter()
+
+    async def on_dns_resolvehost_end(
+        session: aiohttp.ClientSession,
+        context: SimpleNamespace,
+        params: aiohttp.TraceDnsResolveHostEndParams,
+    ) -> None:
+        context.dns_duration = time.perf_counter() - context.dns_start
+        observe_phase("dns", context.dns_duration)
+
+    # Signal callbacks are annotated wrongly by aiohttp, hence the type ignores
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_connection_queued_start.append(on_connection_queued_start)  # type: ignore[arg-type]
+    trace_config.on_connection_queued_end.append(on_connection_queued_end)  # type: ignore[arg-type]
+    trace_config.on_connection_create_start.append(on_connection_create_start)  # type: ignore[arg-type]
+    trace_config.on_connection_create_end.append(on_connection_create_end)  # type: ignore[arg-type]
+    trace_config.on_connection_reuseconn.append(on_connection_reuseconn)  # type: ignore[arg-type]
+    trace_config.on_dns_resolvehost_start.append(on_dns_resolvehost_start)  # type: ignore[arg-type]
+    trace_config.on_dns_resolvehost_end.append(on_dns_resolvehost_end)  # type: ignore[arg-type]
+    return trace_config
+
+
+class InstrumentedHttpClient:
+    """
+    Base class for the clients of external services, sharing the connection pool setup
+    and recording latency, status class and connection metrics of every request.
+    """
+
+    # Path segments followed by a resource identifier, like `webhooks` in `/webhooks/{id}`
+    resource_collections: frozenset[str] = frozenset()
+
+    def __init__(
+        self,
+        upstream: str,
+        base_url: str,
+        connections_pool_size: int = 100,
+        request_timeout: float = 10,
+        circuit_breaker: CircuitBreaker | None = None,
+    ):
+        """
+
+        Args:
+            upstream: Name of the service, used as metrics label.
+            base_url: The base URL of the service.
+            connections_pool_size: Maximum number of simultaneous connections.
+            request_timeout: The timeout (in seconds) for HTTP requests.
+            circuit_breaker: Breaker failing requests fast while the service is failing.
+                Timeouts, connection errors and 5xx responses are failures.
+        """
+        self.upstream = upstream
+        self.base_url = base_url
+        self.connections_pool_size = connections_pool_size
+        self.request_timeout = request_timeout
+        self.circuit_breaker = circuit_breaker
+        self._async_session: aiohttp.ClientSession | None = None
+
+    @property
+    def async_session(self) -> aiohttp.ClientSession:
+        """
+        Session is created on first use, so it's bound to the running event loop.
+
+        Returns:
+            Client session with the connection pool of the service
+        """
+        if self._async_session is None or self._async_session.closed:
+            self._async_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.connections_pool_size,
+                    limit_per_host=self.connections_pool_size,
+                    keepalive_timeout=settings.HTTP_CLIENT_KEEPALIVE_TIMEOUT_SECONDS,
+                    ttl_dns_cache=settings.HTTP_CLIENT_DNS_CACHE_TTL_SECONDS,
+                ),
+                trace_configs=[create_trace_config(self.upstream)],
+            )
+        return self._async_session
+
+    async def close(self) -> None:
+        """
+        Closes the session and its connections, if it was created.
+        """
+        if self._async_session is not None:
+            await self._async_session.close()
+            self._async_session = None
+
+    async def warmup(self, connections: int, timeout_seconds: float = 1) -> int:
+        """
+        Opens connections to the service, kept alive in the pool so the first requests
+        don't pay for the DNS resolution and the TCP and TLS handshakes.
+
+        Args:
+            connections: Number of connections to open.
+            timeout_seconds: Time to open every connection, shorter than the request
+                timeout so a slow service doesn't delay the application startup.
+
+        Returns:
+            Number of connections opened
+        """
+
+        async def open_connection() -> None:
+            # Any response opens the connection, whatever its status
+            async with self.async_session.head(
+                self.base_url,
+                timeout=aiohttp.ClientTimeout(total=timeout_seconds),
+                allow_redirects=False,
+            ) as response:
+                await response.read()
+
+        results = await asyncio.gather(
+            *(open_connection() for _ in range(connections)), return_exceptions=True
+        )
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            logger.warning(
+                "Cannot warm up %d connections to %s: %s",
+                len(errors),
+                self.upstream,
+                errors[0],
+            )
+        return connections - len(errors)
+
+    def get_endpoint_template(self, url: str) -> str:
+        """
+        Args:
+            url: URL relative to the base URL, like `/webhooks/<uuid>?limit=10`.
+
+        Returns:
+            Path of the URL with the resource identifiers replaced, like `/webhooks/{id}`,
+            so metrics don't create a new series per resource
+        """
+        segments = url.split("?", 1)[0].split("/")
+        for position in range(1, len(segments)):
+            if (
+                segments[position]
+                and segments[position - 1] in self.resource_collections
+            ):
+                segments[position] = RESOURCE_ID_PLACEHOLDER
+        return "/".join(segments)
+
+    async def _send_request(
+        self, method: str, url: str, **kwargs: Any
+    ) -> aiohttp.ClientResponse:
+        """
+        Sends an HTTP request and records its metrics.
+
+        Args:
+            method: HTTP method, like `GET`.
+            url: URL relative to the base URL.
+            **kwargs: Arguments for the `aiohttp` request, like `json` or `headers`.
+
+        Returns:
+            The response object from the HTTP request, whatever its status.
+
+        Raises:
+            ValueError: If the request is not valid.
+            IOError: If there is a connection error or the request times out, or the
+                deadline of the request being served passed.
+            CircuitBreakerOpen: If the circuit breaker is open, without sending the request.
+        """
+        # Not waiting longer than the time left to answer the request being served
+        timeout = self.request_timeout
+        limited_by_deadline = False
+        remaining_seconds = get_remaining_seconds()
+        if remaining_seconds is not None and remaining_seconds < timeout:
+            if remaining_seconds <= 0:
+                raise asyncio.TimeoutError(
+                    f"Request deadline passed before sending it to {self.upstream}"
+                )
+            timeout, limited_by_deadline = remaining_seconds, True
+
+        is_probe = (
+            self.circuit_breaker.before_request() if self.circuit_breaker else False
+        )
+        request_func = getattr(self.async_session, method.lower())
+        status_class = "error"
+        success: bool | None = None
+        start = time.perf_counter()
+        try:
+            response = await request_func(
+                build_full_url(self.base_url, url),
+                timeout=aiohttp.ClientTimeout(total=timeout),
+                **kwargs,
+            )
+            status_class = get_status_class(response.status)
+            success = status_class != "5xx"
+            return response
+        except asyncio.TimeoutError:
+            status_class = "timeout"
+            # Upstream is not failing if it only timed out for the shortened timeout
+            success = None if limited_by_deadline else False
+            raise
+        except (OSError, aiohttp.ClientError):
+            success = False
+            raise
+        finally:
+            http_client_request_duration_seconds.labels(
+                self.upstream, method, self.get_endpoint_template(url), status_class
+            ).observe(time.perf_counter() - start)
+            if self.circuit_breaker:
+                self.circuit_breaker.after_request(is_probe, success)
@@ -2,10 +2,12 @@ import datetime
 from functools import cache
 
 import aiohttp
-from safe_eth.util.http import build_full_url
 
 from ....config import settings
 from ....datasources.api_gateway.api_gateway_metrics import ApiGatewayMetric
+from ....datasources.http_client.instrumented_http_client import (
+    InstrumentedHttpClient,
+)
 from ....datasources.metrics.exceptions import MetricsRequestError
 from ....models.metrics import TimeSeriesMetricData
 
@@ -27,7 +29,7 @@ def get_datadog_client() -> "DatadogClient":
     )
 
 
-class DatadogClient:
+class DatadogClient(InstrumentedHttpClient):
     """Client for querying metrics from Datadog."""
 
     def __init__(
@@ -46,13 +48,14 @@ class DatadogClient:
             app_key: The Datadog application key.
             request_timeout: Timeout in seconds for API requests.
         """
-        self.base_url = base_url
+        super().__init__(
+            "datadog",
+            base_url,
+            connections_pool_size=connections_pool_size,
+            request_timeout=request_timeout,
+        )
         self.api_key = api_key
         self.app_key = app_key
-        self.async_session = aiohttp.ClientSession(
-            connector=aiohttp.TCPConnector(limit=connections_pool_size)
-        )
-        self.request_timeout = request_timeout
 
     async def _do_request(
         self,
@@ -78,10 +81,7 @@ class DatadogClient:
         query = metric.get_metric_query()
         from_timestamp = int(from_datetime.timestamp())
         to_timestamp = int(to_datetime.timestamp())
-        full_url = build_full_url(
-            self.base_url,
-            f"api/v1/query?from={from_timestamp}&to={to_timestamp}&query={query}",
-        )
+        url = f"api/v1/query?from={from_timestamp}&to={to_timestamp}&query={query}"
 
         headers = {
             "DD-API-KEY": self.api_key,
@@ -89,11 +89,7 @@ class DatadogClient:
         }
 
         try:
-            response = await self.async_session.get(
-                full_url,
-                headers=headers,
-                timeout=aiohttp.ClientTimeout(total=self.request_timeout),
-            )
+            response = await self._send_request("GET", url, headers=headers)
 
         except (ValueError, IOError) as e:
             raise MetricsRequestError(
@@ -4,9 +4,11 @@ from functools import cache
 from typing import Any
 
 import aiohttp
-from safe_eth.util.http import build_full_url
 
 from ....config import settings
+from ....datasources.http_client.instrumented_http_client import (
+    InstrumentedHttpClient,
+)
 from ....datasources.metrics.exceptions import MetricsRequestError
 from ....models.metrics import TimeSeriesMetricData
 
@@ -28,7 +30,7 @@ def get_prometheus_client() -> "PrometheusClient":
     )
 
 
-class PrometheusClient:
+class PrometheusClient(InstrumentedHttpClient):
     """Client for querying metrics from Prometheus."""
 
     def __init__(
@@ -40,32 +42,28 @@ class PrometheusClient:
             base_url: The base URL of the Prometheus API.
             request_timeout: Timeout in seconds for API requests.
         """
-        self.base_url = base_url
-        self.async_session = aiohttp.ClientSession(
-            connector=aiohttp.TCPConnector(limit=connections_pool_size)
+        super().__init__(
+            "prometheus",
+            base_url,
+            connections_pool_size=connections_pool_size,
+            request_timeout=request_timeout,
         )
-        self.request_timeout = request_timeout
 
     async def _do_request(
         self,
         endpoint: str,
         params: dict,
     ) -> aiohttp.ClientResponse:
-        full_url = build_full_url(self.base_url, endpoint)
         try:
-            response = await self.async_session.get(
-                full_url,
-                params=params,
-                timeout=aiohttp.ClientTimeout(total=self.request_timeout),
-            )
+            response = await self._send_request("GET", endpoint, params=params)
         except (ValueError, IOError) as e:
             raise MetricsRequestError(
-                f"Error while requesting metrics from {full_url} with params '{params}'"
+                f"Error while requesting metrics from {endpoint} with params '{params}'"
             ) from e
 
         if not response.ok:
             raise MetricsRequestError(
-                f"Error while requesting metrics from {full_url} with params '{params}': {response.status} {response.reason}"
+                f"Error while requesting metrics from {endpoint} with params '{params}': {response.status} {response.reason}"
             )
 
         return response
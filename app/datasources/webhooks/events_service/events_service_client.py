@@ -1,14 +1,16 @@
 import logging
 import uuid
 from functools import cache
-from typing import Any, Callable
+from typing import Any
 
 import aiohttp
-from safe_eth.util.http import build_full_url
 
 from ....config import settings
 from ....models.webhook import WebhookEventsService, WebhookEventType
-from .exceptions import EventsServiceRequestError
+from ...http_client.circuit_breaker import CircuitBreaker, CircuitBreakerOpen
+from ...http_client.hedging import HedgingPolicy
+from ...http_client.instrumented_http_client import InstrumentedHttpClient
+from .exceptions import EventsServiceRequestError, EventsServiceUnavailable
 
 logger = logging.getLogger(__name__)
 
@@ -26,16 +28,38 @@ def get_events_service_client() -> "EventsServiceClient":
         api_key=settings.EVENTS_SERVICE_API_KEY,
         connections_pool_size=settings.EVENTS_SERVICE_CONNECTIONS_POOL_SIZE,
         request_timeout=settings.EVENTS_SERVICE_REQUEST_TIMEOUT,
+        circuit_breaker=(
+            CircuitBreaker(
+                "events_service",
+                failure_threshold=settings.EVENTS_SERVICE_CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+                recovery_seconds=settings.EVENTS_SERVICE_CIRCUIT_BREAKER_RECOVERY_SECONDS,
+            )
+            if settings.EVENTS_SERVICE_CIRCUIT_BREAKER_FAILURE_THRESHOLD
+            else None
+        ),
+        hedging_policy=(
+            HedgingPolicy(
+                "events_service",
+                percentile=settings.EVENTS_SERVICE_HEDGE_PERCENTILE,
+                min_delay_seconds=settings.EVENTS_SERVICE_HEDGE_MIN_DELAY_SECONDS,
+            )
+            if settings.EVENTS_SERVICE_HEDGED_REQUESTS
+            else None
+        ),
     )
 
 
-class EventsServiceClient:
+class EventsServiceClient(InstrumentedHttpClient):
+    resource_collections = frozenset({"webhooks"})
+
     def __init__(
         self,
         base_url: str,
         api_key: str | None = None,
         connections_pool_size: int = 100,
-        request_timeout: int = 10,
+        request_timeout: float = 10,
+        circuit_breaker: CircuitBreaker | None = None,
+        hedging_policy: HedgingPolicy | None = None,
     ):
         """
 
@@ -43,33 +67,37 @@ class EventsServiceClient:
             base_url: The base URL for the Events Service API.
             api_key: The API key for authenticating requests.
             request_timeout: The timeout (in seconds) for HTTP requests.
+            circuit_breaker: Breaker failing requests fast while the events service is failing.
+            hedging_policy: Policy sending a duplicate of slow webhook reads.
         """
-        self.base_url = base_url
-        self.api_key = api_key
-        self.async_session = aiohttp.ClientSession(
-            connector=aiohttp.TCPConnector(limit=connections_pool_size)
+        super().__init__(
+            "events_service",
+            base_url,
+            connections_pool_size=connections_pool_size,
+            request_timeout=request_timeout,
+            circuit_breaker=circuit_breaker,
         )
-        self.request_timeout = request_timeout
+        self.api_key = api_key
+        self.hedging_policy = hedging_policy
 
     async def _do_request(
-        self, url: str, request_func: Callable, payload: dict[str, Any] | None = None
+        self, url: str, method: str, payload: dict[str, Any] | None = None
     ) -> aiohttp.ClientResponse:
         """
-        A generic method to perform HTTP requests (GET, PUT, PATCH, DELETE).
+        A generic method to perform HTTP requests (GET, PUT, POST, DELETE).
 
         Args:
             url: The URL to send the request to.
-            request_func: The function to execute (e.g., async_session.get, async_session.put, async_session.patch, async_session.delete).
+            method: The HTTP method (e.g., GET, PUT, POST, DELETE).
             payload: The data to be sent in the request body.
 
         Returns:
             The response object from the HTTP request.
 
         Raises:
+            EventsServiceUnavailable: If the circuit breaker is open.
             EventsServiceRequestError: If there is an error with the request.
         """
-        full_url = build_full_url(self.base_url, url)
-
         headers = {}
         if self.api_key:
             headers["Authorization"] = f"Basic {self.api_key}"
@@ -77,19 +105,21 @@ class EventsServiceClient:
             headers["Content-Type"] = "application/json"
 
         try:
-            response = await request_func(
-                full_url,
-                json=payload if payload else None,
-                headers=headers,
-                timeout=aiohttp.ClientTimeout(total=self.request_timeout),
+            response = await self._send_request(
+                method, url, json=payload if payload else None, headers=headers
             )
 
+        except CircuitBreakerOpen as e:
+            raise EventsServiceUnavailable(
+                f"Error performing request to {url}: {e}", e.retry_after_seconds
+            ) from e
         except (ValueError, IOError) as e:
             raise EventsServiceRequestError(
                 f"Error performing request to {url} with payload {payload}"
             ) from e
 
         if not response.ok:
+            response.release()
             raise EventsServiceRequestError(
                 f"Error performing request to {url} with payload {payload}: {response.status} {response.reason}"
             )
@@ -109,7 +139,7 @@ class EventsServiceClient:
         Raises:
             EventsServiceRequestError: If there is an error with the request.
         """
-        return await self._do_request(url, self.async_session.get)
+        return await self._do_request(url, "GET")
 
     async def _put_request(
         self, url: str, payload: dict[str, Any]
@@ -127,7 +157,7 @@ class EventsServiceClient:
         Raises:
             EventsServiceRequestError: If there is an error with the request.
         """
-        return await self._do_request(url, self.async_session.put, payload)
+        return await self._do_request(url, "PUT", payload)
 
     async def _post_request(
         self, url: str, payload: dict[str, Any]
@@ -145,7 +175,7 @@ class EventsServiceClient:
         Raises:
             EventsServiceRequestError: If there is an error with the request.
         """
-        return await self._do_request(url, self.async_session.post, payload)
+        return await self._do_request(url, "POST", payload)
 
     async def _delete_request(self, url: str) -> aiohttp.ClientResponse:
         """
@@ -160,7 +190,7 @@ class EventsServiceClient:
         Raises:
             EventsServiceRequestError: If there is an error with the request.
         """
-        return await self._do_request(url, self.async_session.delete)
+        return await self._do_request(url, "DELETE")
 
     def _parse_webhook_data(self, webhook_data: dict) -> WebhookEventsService:
         """
@@ -294,6 +324,15 @@ class EventsServiceClient:
         Raises:
             ApiGatewayRequestError: If there is an error while retrieving the webhook (e.g., HTTP error, invalid response).
         """
-        response = await self._get_request(f"/webhooks/{webhook_id}")
-        webhook_data = await response.json()
+
+        async def get_webhook_data() -> dict[str, Any]:
+            response = await self._get_request(f"/webhooks/{webhook_id}")
+            return await response.json()
+
+        # Hedged requests include reading the body, as a slow replica could be slow
+        # sending it too
+        if self.hedging_policy:
+            webhook_data = await self.hedging_policy.run(get_webhook_data)
+        else:
+            webhook_data = await get_webhook_data()
         return self._parse_webhook_data(webhook_data)
@@ -1,2 +1,18 @@
 class EventsServiceRequestError(Exception):
     pass
+
+
+class EventsServiceUnavailable(EventsServiceRequestError):
+    """
+    Requests to the events service fail fast without being sent, as it's failing.
+    """
+
+    def __init__(self, message: str, retry_after_seconds: float):
+        """
+
+        Args:
+            message:
+            retry_after_seconds: Seconds until requests are sent again.
+        """
+        super().__init__(message)
+        self.retry_after_seconds = retry_after_seconds
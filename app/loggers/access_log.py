@@ -0,0 +1,126 @@
+"""
+Sampling of the `Http request` access logs. Requests metrics are recorded for every
+request, only log lines are sampled.
+"""
+
+import random
+from functools import cache
+
+from prometheus_client import Counter
+
+from ..config import settings
+
+access_logs_total = Counter(
+    "access_logs_total",
+    "HTTP access logs by sampling decision: `logged`, `sampled_out` or `excluded`",
+    ["decision"],
+)
+
+
+@cache
+def get_access_log_sampler() -> "AccessLogSampler":
+    """
+    Creates and returns an AccessLogSampler instance with the configured policy.
+
+    Returns:
+        An instance of AccessLogSampler.
+    """
+    return AccessLogSampler(
+        sample_rate=settings.ACCESS_LOG_SAMPLE_RATE,
+        route_sample_rates=settings.ACCESS_LOG_ROUTE_SAMPLE_RATES,
+        slow_request_seconds=settings.ACCESS_LOG_SLOW_REQUEST_SECONDS,
+        excluded_routes=settings.ACCESS_LOG_EXCLUDED_ROUTES,
+    )
+
+
+class AccessLogSampler:
+    """
+    Decides which requests are logged:
+        - Requests to excluded routes are never logged.
+        - Requests failing with an exception or a 5xx status, or slower than
+          `slow_request_seconds`, are always logged.
+        - Other requests are logged with the sample rate of their route.
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = 1.0,
+        route_sample_rates: dict[str, float] | None = None,
+        slow_request_seconds: float = 0,
+        excluded_routes: list[str] | None = None,
+    ):
+        """
+
+        Args:
+            sample_rate: Ratio of requests logged, between 0 and 1, for routes without
+                their own rate.
+            route_sample_rates: Sample rate by route template, like `/api/v1/users/me`.
+            slow_request_seconds: Requests taking longer are always logged, `0` to disable.
+            excluded_routes: Route templates never logged.
+        """
+        self.sample_rate = sample_rate
+        self.route_sample_rates = route_sample_rates or {}
+        self.slow_request_seconds = slow_request_seconds
+        self.excluded_routes = frozenset(excluded_routes or ())
+
+    def get_sample_rate(
+        self,
+        route: str,
+        status_code: int,
+        duration_seconds: float,
+        exception: Exception | None = None,
+    ) -> float:
+        """
+        Args:
+            route: Route template of the request.
+            status_code: Status code of the response.
+            duration_seconds: Time serving the request.
+            exception: Unhandled exception raised serving the request, if any.
+
+        Returns:
+            Probability of logging the request, between 0 and 1
+        """
+        if route in self.excluded_routes:
+            return 0.0
+        if (
+            exception is not None
+            or status_code >= 500
+            or (
+                self.slow_request_seconds
+                and duration_seconds >= self.slow_request_seconds
+            )
+        ):
+            return 1.0
+        return self.route_sample_rates.get(route, self.sample_rate)
+
+    def sample(
+        self,
+        route: str,
+        status_code: int,
+        duration_seconds: float,
+        exception: Exception | None = None,
+    ) -> float | None:
+        """
+        Decides if the request is logged, recording the decision.
+
+        Args:
+            route: Route template of the request.
+            status_code: Status code of the response.
+            duration_seconds: Time serving the request.
+            exception: Unhandled exception raised serving the request, if any.
+
+        Returns:
+            Sample rate to include in the log, so every logged line can be weighted by
+            `1 / sampleRate` to estimate totals. `None` if the request must not be logged
+        """
+        sample_rate = self.get_sample_rate(
+            route, status_code, duration_seconds, exception=exception
+        )
+        if sample_rate <= 0:
+            access_logs_total.labels("excluded").inc()
+            return None
+        if sample_rate < 1 and random.random() >= sample_rate:
+            access_logs_total.labels("sampled_out").inc()
+            return None
+        access_logs_total.labels("logged").inc()
+        return sample_rate
@@ -0,0 +1,168 @@
+"""
+Logging pipeline that doesn't block the event loop: log records are put in a bounded
+queue and a listener thread formats and writes them in batches.
+"""
+
+import atexit
+import copy
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Literal
+
+from prometheus_client import Counter
+
+from .safe_logger import SafeJsonFormatter
+
+# Put in the queue to stop the listener
+_STOP_SENTINEL = object()
+
+log_records_dropped_total = Counter(
+    "log_records_dropped_total",
+    "Log records dropped as the logging queue was full",
+)
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    Queue handler for a bounded queue. When the queue is full, records are dropped or
+    the logging thread blocks until the listener makes room, depending on `block`.
+    """
+
+    def __init__(self, log_queue: queue.Queue, block: bool = False):
+        """
+
+        Args:
+            log_queue: Queue shared with the listener.
+            block: Wait for the listener when the queue is full instead of dropping records.
+        """
+        super().__init__(log_queue)
+        self.log_queue = log_queue
+        self.block = block
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Arguments could change before the listener formats the record, so the message
+        # is built now. Exception info is kept, it's formatted by the listener
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.block:
+            self.log_queue.put(record)
+            return
+        try:
+            self.log_queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped_total.inc()
+
+
+class BatchStreamHandler(logging.StreamHandler):
+    """
+    Stream handler writing several records at once, flushing the stream once per batch.
+    """
+
+    def emit_batch(self, records: list[logging.LogRecord]) -> None:
+        messages = []
+        for record in records:
+            try:
+                messages.append(self.format(record) + self.terminator)
+            except Exception:
+                self.handleError(record)
+        if not messages:
+            return
+        self.acquire()
+        try:
+            self.stream.write("".join(messages))
+            self.flush()
+        except Exception:
+            self.handleError(records[-1])
+        finally:
+            self.release()
+
+
+class BatchQueueListener(QueueListener):
+    """
+    Queue listener handling every record waiting in the queue, up to `batch_size`,
+    at once.
+    """
+
+    def __init__(
+        self,
+        log_queue: queue.Queue,
+        *handlers: logging.Handler,
+        batch_size: int = 100,
+    ):
+        """
+
+        Args:
+            log_queue: Queue shared with the queue handler.
+            *handlers: Handlers of the records. `BatchStreamHandler` handles the whole batch.
+            batch_size: Maximum number of records handled at once.
+        """
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.log_queue = log_queue
+        self.batch_size = batch_size
+
+    def enqueue_sentinel(self) -> None:
+        # Queue could be full, wait until the pending records are handled
+        self.log_queue.put(_STOP_SENTINEL)
+
+    def handle_batch(self, records: list[logging.LogRecord]) -> None:
+        for handler in self.handlers:
+            handler_records = [
+                record for record in records if record.levelno >= handler.level
+            ]
+            if isinstance(handler, BatchStreamHandler):
+                handler.emit_batch(handler_records)
+            else:
+                for record in handler_records:
+                    handler.handle(record)
+
+    def _monitor(self) -> None:
+        stopped = False
+        while not stopped:
+            records: list[logging.LogRecord] = []
+            while len(records) < self.batch_size:
+                try:
+                    # Wait only for the first record of the batch
+                    record = self.log_queue.get(block=not records)
+                except queue.Empty:
+                    break
+                self.log_queue.task_done()
+                if record is _STOP_SENTINEL:
+                    stopped = True
+                    break
+                records.append(record)
+            if records:
+                self.handle_batch(records)
+
+
+def create_queue_handler(
+    max_size: int = 10_000,
+    full_policy: Literal["drop", "block"] = "drop",
+    batch_size: int = 100,
+) -> BoundedQueueHandler:
+    """
+    Creates a queue handler writing the records as JSON to stderr from a listener thread,
+    that is stopped at exit after writing the pending records. Used as `logging.config`
+    handler factory.
+
+    Args:
+        max_size: Maximum number of records waiting to be written.
+        full_policy: `drop` records or `block` the logging thread when the queue is full.
+        batch_size: Maximum number of records written at once.
+
+    Returns:
+        Queue handler for the loggers
+    """
+    log_queue: queue.Queue = queue.Queue(maxsize=max_size)
+    stream_handler = BatchStreamHandler(sys.stderr)
+    stream_handler.setFormatter(SafeJsonFormatter())
+    listener = BatchQueueListener(log_queue, stream_handler, batch_size=batch_size)
+    listener.start()
+    atexit.register(listener.stop)
+    return BoundedQueueHandler(log_queue, block=full_policy == "block")
@@ -1,9 +1,12 @@
 import datetime
 import logging
 import traceback
+from typing import Any
 
 from pydantic.main import BaseModel
 
+import orjson
+
 logger = logging.getLogger(__name__)
 
 
@@ -12,6 +15,7 @@ class HttpRequestLog(BaseModel):
     method: str
     body: str | None = None
     startTime: datetime.datetime
+    sampleRate: float | None = None  # Only for sampled logs
 
 
 class HttpResponseLog(BaseModel):
@@ -41,6 +45,10 @@ class JsonLog(BaseModel):
     contextMessage: ContextMessageLog | dict | None = None
 
 
+def _exclude_none(values: dict[str, Any]) -> dict[str, Any]:
+    return {key: value for key, value in values.items() if value is not None}
+
+
 class SafeJsonFormatter(logging.Formatter):
     """
     Json formatter with following schema
@@ -51,42 +59,41 @@ class SafeJsonFormatter(logging.Formatter):
         message: str,
         contextMessage: <contextMessage>
     }
+
+    Logs are built as dictionaries and encoded with `orjson`, as formatting runs for
+    every log record. The schema is defined by `JsonLog` model.
     """
 
     def format(self, record):
+        context_message: dict[str, Any] = {}
+        if (db_session := getattr(record, "db_session", None)) is not None:
+            context_message["dbSession"] = db_session
+        if (http_request := getattr(record, "http_request", None)) is not None:
+            context_message["httpRequest"] = _exclude_none(http_request)
+        if (http_response := getattr(record, "http_response", None)) is not None:
+            context_message["httpResponse"] = _exclude_none(http_response)
         if record.levelname == "ERROR":
-            exception_info: str | None = None
+            error_info: dict[str, Any] = {
+                "function": record.funcName,
+                "line": record.lineno,
+            }
             # Check if the error contains exception data
             if record.exc_info:
                 exc_type, exc_value, exc_tb = record.exc_info
-                exception_info = "".join(
+                error_info["exceptionInfo"] = "".join(
                     traceback.format_exception(exc_type, exc_value, exc_tb)
                 )
-            record.error_detail = ErrorInfo(
-                function=record.funcName,
-                line=record.lineno,
-                exceptionInfo=exception_info,
-            )
-
-        context_message = ContextMessageLog(
-            dbSession=getattr(record, "db_session", None),
-            httpRequest=getattr(record, "http_request", None),
-            httpResponse=getattr(record, "http_response", None),
-            errorInfo=getattr(record, "error_detail", None),
-        )
-
-        json_log = JsonLog(
-            level=record.levelname,
-            timestamp=datetime.datetime.fromtimestamp(
+            context_message["errorInfo"] = error_info
+
+        json_log: dict[str, Any] = {
+            "level": record.levelname,
+            "timestamp": datetime.datetime.fromtimestamp(
                 record.created, datetime.timezone.utc
             ),
-            context=f"{record.module}.{record.funcName}",
-            message=record.getMessage(),
-            contextMessage=(
-                context_message
-                if len(context_message.model_dump(exclude_none=True))
-                else None
-            ),
-        )
+            "context": f"{record.module}.{record.funcName}",
+            "message": record.getMessage(),
+        }
+        if context_message:
+            json_log["contextMessage"] = context_message
 
-        return json_log.model_dump_json(exclude_none=True)
+        return orjson.dumps(json_log, default=str, option=orjson.OPT_UTC_Z).decode()
@@ -0,0 +1,124 @@
+"""
+Monitor of the event loop responsiveness. Blocking calls (sync I/O, CPU bound work)
+delay every other request served by the process.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from prometheus_client import Histogram
+
+from .datasources.db.connector import get_database_session_id
+
+logger = logging.getLogger(__name__)
+
+event_loop_lag_seconds = Histogram(
+    "event_loop_lag_seconds",
+    "Delay of the event loop running a scheduled callback",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+
+class LoopMonitor:
+    """
+    Measures the event loop lag with a heartbeat task sleeping periodically: the time it
+    wakes up later than expected is the time the loop was busy running other callbacks.
+
+    On debug, a watchdog thread logs the stack of the event loop thread when the
+    heartbeat is late by more than `blocking_threshold_seconds`, pointing to the
+    blocking call, along with the database session of the blocked task.
+    """
+
+    def __init__(
+        self,
+        interval_seconds: float,
+        blocking_threshold_seconds: float,
+        debug: bool = False,
+    ):
+        """
+
+        Args:
+            interval_seconds: Time between heartbeats.
+            blocking_threshold_seconds: Lag of the heartbeat to log the blocking stack.
+            debug: Start the watchdog thread logging the blocking stacks.
+        """
+        self.interval_seconds = interval_seconds
+        self.blocking_threshold_seconds = blocking_threshold_seconds
+        self.debug = debug
+        self._heartbeat_task: asyncio.Task | None = None
+        self._watchdog_thread: threading.Thread | None = None
+        self._stopped = threading.Event()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._last_heartbeat = time.monotonic()
+
+    def start(self) -> None:
+        """
+        Starts monitoring the running event loop.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        if self.debug:
+            self._watchdog_thread = threading.Thread(
+                target=self._watchdog, name="loop-monitor-watchdog", daemon=True
+            )
+            self._watchdog_thread.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+        if self._watchdog_thread:
+            self._watchdog_thread.join()
+            self._watchdog_thread = None
+
+    async def _heartbeat(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected_time = loop.time() + self.interval_seconds
+            await asyncio.sleep(self.interval_seconds)
+            event_loop_lag_seconds.observe(max(loop.time() - expected_time, 0.0))
+            self._last_heartbeat = time.monotonic()
+
+    def _watchdog(self) -> None:
+        reported_heartbeat: float | None = None
+        while not self._stopped.wait(self.blocking_threshold_seconds / 2):
+            last_heartbeat = self._last_heartbeat
+            lag = time.monotonic() - last_heartbeat - self.interval_seconds
+            # Report every blocking only once, until the heartbeat runs again
+            if (
+                lag > self.blocking_threshold_seconds
+                and reported_heartbeat != last_heartbeat
+            ):
+                reported_heartbeat = last_heartbeat
+                self._log_blocking_stack(lag)
+
+    def _log_blocking_stack(self, lag: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id or 0)
+        if frame is None:
+            return
+
+        stack = "".join(traceback.format_stack(frame))
+        task = asyncio.current_task(self._loop)
+        extra = {}
+        # Context of other tasks can only be read from Python 3.12
+        if task is not None and hasattr(task, "get_context"):
+            if session_id := get_database_session_id(task.get_context()):
+                extra["db_session"] = session_id
+        logger.warning(
+            f"Event loop blocked for more than {lag:.3f} seconds"
+            f" running {task.get_name() if task else 'a callback'}:\n{stack}",
+            extra=extra,
+        )
@@ -1,5 +1,6 @@
 import datetime
 import logging
+from contextlib import asynccontextmanager
 
 from fastapi import APIRouter, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -10,13 +11,27 @@ from starlette.responses import Response
 from . import VERSION
 from .config import settings
 from .datasources.db.connector import (
-    _get_database_session_context,
-    db_session,
+    get_database_session_id,
+    remove_database_session,
     set_database_session_context,
 )
-from .loggers.safe_logger import HttpRequestLog, HttpResponseLog
-from .routers import about, api_keys, default, google, users, webhooks
+from .datasources.http_client.deadline import set_request_deadline
+from .datasources.http_client.http_client_registry import (
+    close_http_clients,
+    start_http_clients,
+)
+from .loggers.access_log import get_access_log_sampler
+from .loop_monitor import LoopMonitor
+from .metrics import (
+    get_route_template,
+    http_requests_in_progress,
+    mark_metrics_process_dead,
+    observe_http_request,
+)
+from .routers import about, api_keys, default, google, metrics, users, webhooks
 from .routers.exceptions_handler import register_exception_handlers
+from .services.apisix_outbox_worker import get_apisix_outbox_worker
+from .services.jwt_service import get_jwt_key_manager
 
 logger = logging.getLogger()
 
@@ -34,11 +49,9 @@ def log_record_factory_for_request(*args, **kwargs) -> logging.LogRecord:
     """
     # Create a log record with additional context
     record = logging.LogRecord(*args, **kwargs)
-    try:
-        record.db_session = _get_database_session_context()
-    except LookupError:
-        # This error means that there is not session
-        pass
+    # Database session is not created if it was not used yet
+    if session_id := get_database_session_id():
+        record.db_session = session_id
 
     return record
 
@@ -46,12 +59,43 @@ def log_record_factory_for_request(*args, **kwargs) -> logging.LogRecord:
 logging.setLogRecordFactory(log_record_factory_for_request)
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Prepares the application resources before serving requests.
+
+    Args:
+        app:
+    """
+    # Parse JWT keys once, before the first token is signed or verified
+    get_jwt_key_manager()
+    loop_monitor = LoopMonitor(
+        settings.EVENT_LOOP_MONITOR_INTERVAL_SECONDS,
+        settings.EVENT_LOOP_MONITOR_BLOCKING_THRESHOLD_SECONDS,
+        debug=settings.EVENT_LOOP_MONITOR_DEBUG,
+    )
+    if settings.EVENT_LOOP_MONITOR_INTERVAL_SECONDS:
+        loop_monitor.start()
+    await start_http_clients(
+        settings.HTTP_CLIENT_WARMUP_CONNECTIONS,
+        settings.HTTP_CLIENT_WARMUP_TIMEOUT_SECONDS,
+    )
+    if settings.APISIX_OUTBOX_ENABLED:
+        get_apisix_outbox_worker().start()
+    yield
+    await get_apisix_outbox_worker().stop()
+    await close_http_clients()
+    await loop_monitor.stop()
+    mark_metrics_process_dead()
+
+
 app = FastAPI(
     title="Safe Auth Service",
     description="API to grant JWT tokens for using across the Safe Core{API} infrastructure.",
     version=VERSION,
     docs_url=None,
     redoc_url=None,
+    lifespan=lifespan,
 )
 
 register_exception_handlers(app)
@@ -67,6 +111,7 @@ api_v1_router.include_router(users.router)
 api_v1_router.include_router(webhooks.router)
 app.include_router(api_v1_router)
 app.include_router(default.router)
+app.include_router(metrics.router)
 
 # Middlewares
 
@@ -84,7 +129,10 @@ async def http_request_middleware(request: Request, call_next):
     """
     Intercepts request and do some actions:
      - Set the database session context for the current request, so the same database session is used across the whole request.
-     - Log requests calls
+       The session is only created if the request uses the database.
+     - Set the deadline of the requests to external services, see `HTTP_REQUEST_DEADLINE_SECONDS`.
+     - Log requests calls, sampled by `AccessLogSampler`
+     - Record requests metrics
 
     Args:
         request:
@@ -97,39 +145,54 @@ async def http_request_middleware(request: Request, call_next):
         Exception
     """
     start_time = datetime.datetime.now(datetime.timezone.utc)
-    exception_occurred = False
-    with set_database_session_context():
+    exception: Exception | None = None
+    in_progress_gauge = http_requests_in_progress.labels(request.method)
+    in_progress_gauge.inc()
+    with (
+        set_database_session_context() as database_session_scope,
+        set_request_deadline(settings.HTTP_REQUEST_DEADLINE_SECONDS),
+    ):
         response: Response | None = None
         try:
             response = await call_next(request)
         except Exception as e:
-            exception_occurred = True
+            exception = e
             raise e
         finally:
-            await db_session.remove()
-            # Log request
-            try:
-                end_time = datetime.datetime.now(datetime.timezone.utc)
-                total_time = (
-                    end_time - start_time
-                ).total_seconds() * 1000  # time in ms
-                http_request = HttpRequestLog(
-                    url=str(request.url),
-                    method=request.method,
-                    startTime=start_time,
-                )
-                status_code = response.status_code if response else 500
-                http_response = HttpResponseLog(
-                    status=status_code,
-                    endTime=end_time,
-                    totalTime=int(total_time),
-                )
-                if exception_occurred:
+            await remove_database_session(database_session_scope)
+            in_progress_gauge.dec()
+            end_time = datetime.datetime.now(datetime.timezone.utc)
+            total_time = (end_time - start_time).total_seconds() * 1000  # time in ms
+            status_code = response.status_code if response else 500
+            observe_http_request(
+                request, status_code, total_time / 1000, exception=exception
+            )
+            # Log request, `HttpRequestLog` and `HttpResponseLog` define the schema
+            sample_rate = get_access_log_sampler().sample(
+                get_route_template(request),
+                status_code,
+                total_time / 1000,
+                exception=exception,
+            )
+            if sample_rate is not None:
+                http_request = {
+                    "url": str(request.url),
+                    "method": request.method,
+                    "startTime": start_time,
+                }
+                if sample_rate < 1:
+                    http_request["sampleRate"] = sample_rate
+                http_response = {
+                    "status": status_code,
+                    "endTime": end_time,
+                    "totalTime": int(total_time),
+                }
+                if exception is not None:
                     logger.error(
                         "Http request",
                         extra={
-                            "http_response": http_response.model_dump(),
-                            "http_request": http_request.model_dump(),
+                            "http_response": http_response,
+                            "http_request": http_request,
                         },
                         exc_info=True,
                     )
@@ -137,11 +200,9 @@ async def http_request_middleware(request: Request, call_next):
                     logger.info(
                         "Http request",
                         extra={
-                            "http_response": http_response.model_dump(),
-                            "http_request": http_request.model_dump(),
+                            "http_response": http_response,
+                            "http_request": http_request,
                         },
                     )
-            except ValueError as e:
-                logger.error(f"Validation log error {e}")
 
     return response
@@ -0,0 +1,105 @@
+"""
+Prometheus metrics for the HTTP requests served by the application.
+
+When running several worker processes, `PROMETHEUS_MULTIPROC_DIR` environment variable
+must point to an empty directory shared by every worker, so metrics are aggregated
+across processes.
+"""
+
+import os
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    multiprocess,
+)
+from starlette.requests import Request
+
+# Route label for requests not matching any route, so unknown paths don't create new series
+UNMATCHED_ROUTE = "<unmatched>"
+
+http_requests_total = Counter(
+    "http_requests_total",
+    "HTTP requests served",
+    ["method", "route", "status"],
+)
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds",
+    "Time serving HTTP requests",
+    ["method", "route", "status"],
+)
+http_requests_in_progress = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests being served",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+http_request_exceptions_total = Counter(
+    "http_request_exceptions_total",
+    "HTTP requests failed with an unhandled exception",
+    ["method", "route", "exception"],
+)
+
+
+def get_route_template(request: Request) -> str:
+    """
+    Args:
+        request: Request already processed by the router.
+
+    Returns:
+        Path template of the route matching the request, like `/api/v1/api-keys/{api_key_id}`
+    """
+    if route := request.scope.get("route"):
+        return route.path
+    return UNMATCHED_ROUTE
+
+
+def observe_http_request(
+    request: Request,
+    status_code: int,
+    duration_seconds: float,
+    exception: Exception | None = None,
+) -> None:
+    """
+    Records a served HTTP request.
+
+    Args:
+        request:
+        status_code: Status code of the response.
+        duration_seconds: Time serving the request.
+        exception: Unhandled exception raised serving the request, if any.
+    """
+    route = get_route_template(request)
+    http_requests_total.labels(request.method, route, status_code).inc()
+    http_request_duration_seconds.labels(request.method, route, status_code).observe(
+        duration_seconds
+    )
+    if exception is not None:
+        http_request_exceptions_total.labels(
+            request.method, route, type(exception).__name__
+        ).inc()
+
+
+def get_metrics_registry() -> CollectorRegistry:
+    """
+    Returns:
+        Registry aggregating the metrics of every worker process if `PROMETHEUS_MULTIPROC_DIR`
+        is configured, the registry of the current process otherwise
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def mark_metrics_process_dead() -> None:
+    """
+    Removes the live gauges of the current process when it stops, if running with
+    several worker processes.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(os.getpid())
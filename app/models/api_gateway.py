@@ -16,3 +16,31 @@ class Consumer(BaseModel):
     labels: dict[str, str] | None
     plugins: dict[str, Any] | None
     consumer_group_name: str | None
+
+
+class ConsumersJwtConfigUpdateSummary(BaseModel):
+    dry_run: bool
+    total: int = 0  # Consumers checked
+    up_to_date: int = 0  # Consumers skipped, as their JWT config already matches
+    updated: int = 0  # Consumers updated, or to be updated on dry run
+    failed: list[str] = []  # Names of the consumers that could not be updated
+    # Every consumer up to this name (sorted) was processed, used to resume the update
+    last_consumer_name: str | None = None
+
+
+class ApisixReconciliationSummary(BaseModel):
+    dry_run: bool
+    delete_orphans: bool
+    users: int = 0  # Users in the database
+    api_keys: int = 0  # Api keys in the database
+    consumer_groups: int = 0  # Consumer groups of users in Apisix
+    consumers: int = 0  # Consumers of api keys in Apisix
+    unmanaged: int = 0  # Apisix consumers and groups not named after users or api keys
+    # Drift, by Apisix consumer group or consumer name
+    missing_consumer_groups: list[str] = []  # Users without consumer group
+    missing_consumers: list[str] = []  # Api keys without consumer
+    wrong_group_consumers: list[str] = []  # Consumers not in the group of their user
+    orphan_consumer_groups: list[str] = []  # Consumer groups without user
+    orphan_consumers: list[str] = []  # Consumers without api key
+    repaired: int = 0  # Drifted resources fixed, 0 on dry run
+    failed: list[str] = []  # Names of the resources that could not be fixed
@@ -1,11 +1,13 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
 from .. import VERSION
+from ..datasources.db.connector import disable_database_session
 from ..models.about import About
 
 router = APIRouter(
     prefix="/about",
     tags=["About"],
+    dependencies=[Depends(disable_database_session)],
 )
 
 
@@ -1,5 +1,8 @@
+import hashlib
 import logging
+import time
 import uuid
+from functools import cache
 from typing import Annotated, Any
 
 from fastapi import Depends, HTTPException
@@ -10,7 +13,9 @@ from jwt import ExpiredSignatureError, InvalidTokenError
 from starlette import status
 
 from app.config import settings
+from app.datasources.cache.memory import TTLLRUCache
 from app.datasources.db.models import User
+from app.services.jwt_service import get_jwt_key_manager
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/users/login")
 
@@ -19,13 +24,41 @@ class UserFromJWTDoesNotExist(Exception):
     pass
 
 
+@cache
+def get_jwt_cache() -> TTLLRUCache[bytes, dict[str, Any]]:
+    """
+    Returns:
+        Cache of already verified JWT claims, keyed by the token digest.
+    """
+    return TTLLRUCache("jwt", settings.JWT_CACHE_MAX_SIZE)
+
+
 async def get_jwt_info_from_auth_token(
     token: Annotated[str, Depends(oauth2_scheme)],
 ) -> dict[str, Any]:
+    """
+    Verifies and decodes the JWT token. Verified claims are cached until the token
+    expires or `JWT_CACHE_MAX_TTL_SECONDS` pass, so repeated requests with the same
+    token skip the signature verification.
+
+    Args:
+        token:
+
+    Returns:
+        Decoded JWT claims
+
+    Raises:
+        HTTPException: if the token is expired or not valid
+    """
+    jwt_cache = get_jwt_cache()
+    token_digest = hashlib.sha256(token.encode()).digest()
+    if (jwt_info := jwt_cache.get(token_digest)) is not None:
+        return jwt_info.copy()
+
     try:
-        return jwt.decode(
+        jwt_info = jwt.decode(
             token,
-            settings.JWT_PRIVATE_KEY,
+            get_jwt_key_manager().verification_key,
             algorithms=[settings.JWT_ALGORITHM],
             audience=settings.JWT_AUDIENCE,
         )
@@ -42,6 +75,12 @@ async def get_jwt_info_from_auth_token(
             headers={"WWW-Authenticate": "Bearer"},
         ) from e
 
+    ttl_seconds: float = settings.JWT_CACHE_MAX_TTL_SECONDS
+    if "exp" in jwt_info:
+        ttl_seconds = min(ttl_seconds, jwt_info["exp"] - time.time())
+    jwt_cache.set(token_digest, jwt_info, ttl_seconds)
+    return jwt_info.copy()
+
 
 def get_user_id_from_jwt(jwt_info: dict) -> uuid.UUID:
     return uuid.UUID(jwt_info["sub"])
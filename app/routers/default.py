@@ -1,10 +1,12 @@
 from typing import Literal
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
 from fastapi.responses import RedirectResponse
 
-router = APIRouter()
+from ..datasources.db.connector import disable_database_session
+
+router = APIRouter(dependencies=[Depends(disable_database_session)])
 
 
 @router.get("/docs", include_in_schema=False)
@@ -1,9 +1,14 @@
+import math
+
 from fastapi import FastAPI
 
 from starlette.requests import Request
 from starlette.responses import JSONResponse
 
+from ..datasources.api_gateway.exceptions import ApiGatewayUnavailable
+from ..datasources.webhooks.events_service.exceptions import EventsServiceUnavailable
 from ..services.api_key_service import ApiKeyCreationLimitReached
+from ..services.password_hasher import PasswordHasherBusy
 from ..services.user_service import (
     TemporaryTokenExists,
     TemporaryTokenNotValid,
@@ -66,3 +71,33 @@ def register_exception_handlers(app: FastAPI):
             status_code=403,
             content={"detail": str(exc)},
         )
+
+    @app.exception_handler(PasswordHasherBusy)
+    async def password_hasher_busy_exception_handler(
+        request: Request, exc: PasswordHasherBusy
+    ):
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Service is busy, please try again later"},
+            headers={"Retry-After": "1"},
+        )
+
+    @app.exception_handler(ApiGatewayUnavailable)
+    async def api_gateway_unavailable_exception_handler(
+        request: Request, exc: ApiGatewayUnavailable
+    ):
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Service is unavailable, please try again later"},
+            headers={"Retry-After": str(max(math.ceil(exc.retry_after_seconds), 1))},
+        )
+
+    @app.exception_handler(EventsServiceUnavailable)
+    async def events_service_unavailable_exception_handler(
+        request: Request, exc: EventsServiceUnavailable
+    ):
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Service is unavailable, please try again later"},
+            headers={"Retry-After": str(max(math.ceil(exc.retry_after_seconds), 1))},
+        )
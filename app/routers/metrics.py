@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Depends, Response
+
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from ..datasources.db.connector import disable_database_session
+from ..metrics import get_metrics_registry
+
+router = APIRouter(dependencies=[Depends(disable_database_session)])
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    # Not async, collecting the metrics of every worker process reads files
+    return Response(
+        generate_latest(get_metrics_registry()), media_type=CONTENT_TYPE_LATEST
+    )
@@ -5,6 +5,7 @@ from fastapi.security import OAuth2PasswordRequestForm
 
 from starlette import status
 
+from ..datasources.db.connector import disable_database_session
 from ..datasources.email.email_client import (
     send_register_temporary_token_email,
     send_reset_password_temporary_token_email,
@@ -39,7 +40,7 @@ async def pre_register(
 ):
     user_service = UserService()
     try:
-        token = user_service.pre_register_user(user_request.email)
+        token = await user_service.pre_register_user(user_request.email)
         background_tasks.add_task(
             send_register_temporary_token_email, user_request.email, token
         )
@@ -78,7 +79,7 @@ async def login(form_data: Annotated[OAuth2PasswordRequestForm, Depends()]) -> T
     return token
 
 
-@router.get("/me")
+@router.get("/me", dependencies=[Depends(disable_database_session)])
 async def get_current_user(
     jwt_info: Annotated[dict, Depends(get_jwt_info_from_auth_token)],
 ):
@@ -1,13 +1,19 @@
 import datetime
+import logging
 import uuid
 
 from pydantic import TypeAdapter
 
 from ..config import settings
 from ..datasources.api_gateway.apisix.apisix_client import get_apisix_client
-from ..datasources.db.models import ApiKey
+from ..datasources.api_gateway.exceptions import ApiGatewayRequestError
+from ..datasources.db.models import ApiKey, ApisixOutboxEvent
 from ..models.api_key import ApiKeyPublic
 from ..services.jwt_service import JwtService
+from .apisix_outbox_worker import get_apisix_outbox_worker
+from .quota_service import create_within_quota, is_user_quota_available
+
+logger = logging.getLogger(__name__)
 
 
 class ApiKeyServiceException(Exception):
@@ -22,6 +28,8 @@ async def generate_api_key(user_id: uuid.UUID, description: str) -> ApiKeyPublic
     """
     Generate and store in database a new api key for a given user.
     Each api_key for user will contain a unique subject with user id and api key id concatenated.
+    With `APISIX_OUTBOX_ENABLED`, the APISIX consumer is created after the api key is stored.
+    Otherwise, it's created before, and deleted if the api key cannot be stored.
 
     Args:
         user_id: unique user identifier.
@@ -33,20 +41,12 @@ async def generate_api_key(user_id: uuid.UUID, description: str) -> ApiKeyPublic
     Returns: serialized ApiKeyPublic object.
 
     """
-    user_api_keys = await ApiKey.get_api_keys_by_user(user_id)
-    if (
-        len(user_api_keys)
-        >= settings.APISIX_FREEMIUM_CONSUMER_GROUP_API_KEY_CREATION_LIMIT
-    ):
+    limit = settings.APISIX_FREEMIUM_CONSUMER_GROUP_API_KEY_CREATION_LIMIT
+    if not await is_user_quota_available(ApiKey, user_id, limit):
         raise ApiKeyCreationLimitReached("Api key creation limit reached")
 
     api_key_id = uuid.uuid4()
     api_key_subject = f"{user_id.hex}_{api_key_id.hex}"
-    await get_apisix_client().upsert_consumer(
-        api_key_subject,
-        description=description,
-        consumer_group_name=user_id.hex,
-    )
     access_key_expires = datetime.timedelta(days=settings.JWT_API_KEY_EXPIRE_DAYS)
     access_key = JwtService.create_access_token(
         api_key_subject, access_key_expires, settings.JWT_AUDIENCE, {}
@@ -54,7 +54,31 @@ async def generate_api_key(user_id: uuid.UUID, description: str) -> ApiKeyPublic
     api_key = ApiKey(
         id=api_key_id, user_id=user_id, key=access_key, description=description
     )
-    await api_key.create()
+    if settings.APISIX_OUTBOX_ENABLED:
+        if not await create_within_quota(
+            api_key,
+            limit,
+            ApisixOutboxEvent.upsert_consumer(user_id, api_key_subject, description),
+        ):
+            raise ApiKeyCreationLimitReached("Api key creation limit reached")
+        get_apisix_outbox_worker().notify()
+        return ApiKeyPublic.model_validate(api_key)
+
+    await get_apisix_client().upsert_consumer(
+        api_key_subject,
+        description=description,
+        consumer_group_name=user_id.hex,
+    )
+    created = False
+    try:
+        created = await create_within_quota(api_key, limit)
+    finally:
+        # Concurrent creations reached the limit meanwhile, or the api key could not
+        # be stored
+        if not created:
+            await get_apisix_client().delete_consumer(api_key_subject)
+    if not created:
+        raise ApiKeyCreationLimitReached("Api key creation limit reached")
     return ApiKeyPublic.model_validate(api_key)
 
 
@@ -75,8 +99,29 @@ async def delete_api_key_by_id(api_key_id: uuid.UUID, user_id: uuid.UUID) -> boo
         return False
 
     api_key_subject = f"{user_id.hex}_{api_key_id.hex}"
-    await get_apisix_client().delete_consumer(api_key_subject)
-    return await ApiKey.delete_by_ids(api_key_id, user_id)
+    if not settings.APISIX_OUTBOX_ENABLED:
+        await get_apisix_client().delete_consumer(api_key_subject)
+        return await ApiKey.delete_by_ids(api_key_id, user_id)
+
+    # Consumer is deleted before answering, so the api key stops working right away.
+    # The outbox deletes it again after any pending event creating it, and if it
+    # could not be deleted now
+    try:
+        await get_apisix_client().delete_consumer(api_key_subject)
+    except ApiGatewayRequestError as e:
+        if e.status_code != 404:
+            logger.warning(
+                "Cannot delete consumer %s, it will be deleted by the outbox: %s",
+                api_key_subject,
+                e,
+            )
+    deleted = await ApiKey.delete_by_ids(
+        api_key_id,
+        user_id,
+        ApisixOutboxEvent.delete_consumer(user_id, api_key_subject),
+    )
+    get_apisix_outbox_worker().notify()
+    return deleted
 
 
 async def get_api_key_by_ids(
@@ -0,0 +1,288 @@
+"""
+Worker sending the APISIX outbox: admin operations stored in the database in the same
+transaction as the users and API keys requiring them, so requests don't wait for APISIX.
+"""
+
+import asyncio
+import datetime
+import logging
+import uuid
+from functools import cache
+from typing import Sequence
+
+from prometheus_client import Counter, Histogram
+
+from ..config import settings
+from ..datasources.api_gateway.apisix.apisix_client import (
+    get_apisix_client,
+    is_retryable_error,
+)
+from ..datasources.api_gateway.exceptions import ApiGatewayRequestError
+from ..datasources.db.connector import (
+    db_session,
+    remove_database_session,
+    set_database_session_context,
+)
+from ..datasources.db.models import ApisixOutboxEvent, ApisixOutboxOperation
+
+logger = logging.getLogger(__name__)
+
+apisix_outbox_events_total = Counter(
+    "apisix_outbox_events_total",
+    "APISIX outbox events sent, by operation and result: `success`, `error` or "
+    "`failed` when it won't be retried",
+    ["operation", "result"],
+)
+apisix_outbox_event_delay_seconds = Histogram(
+    "apisix_outbox_event_delay_seconds",
+    "Time since an APISIX outbox event was stored until it was sent",
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600),
+)
+
+
+class ApisixOutboxWorker:
+    """
+    Sends the pending outbox events in batches. Events of a user are sent in order, and
+    an event failing delays the following ones of the same user until it's retried with
+    exponential backoff. Events rejected by APISIX (`4xx` but `429`) or reaching
+    `max_attempts` are marked as failed, so they stop blocking the user. Events of
+    different users are sent in parallel.
+
+    Operations are idempotent (`PUT` of a named resource, `DELETE` ignoring missing
+    resources), so an event is sent again safely if the worker stops before removing it.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 100,
+        concurrency: int = 10,
+        poll_interval_seconds: float = 1,
+        retry_backoff_seconds: float = 1,
+        retry_max_backoff_seconds: float = 300,
+        max_attempts: int = 10,
+    ):
+        """
+
+        Args:
+            batch_size: Events read from the database at once.
+            concurrency: Users whose events are sent in parallel.
+            poll_interval_seconds: Time between checks of the outbox when it's empty.
+            retry_backoff_seconds: Delay of the first retry of a failed event.
+            retry_max_backoff_seconds: Maximum delay between retries.
+            max_attempts: Attempts before marking an event as failed.
+        """
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.poll_interval_seconds = poll_interval_seconds
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.retry_max_backoff_seconds = retry_max_backoff_seconds
+        self.max_attempts = max_attempts
+        self._wake_up = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """
+        Starts sending the outbox in the running event loop.
+        """
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def notify(self) -> None:
+        """
+        Wakes up the worker to send new events without waiting for the poll interval.
+        """
+        self._wake_up.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                processed = await self.process_batch()
+            except Exception:
+                logger.exception("Cannot process the APISIX outbox")
+                processed = 0
+            if processed < self.batch_size:
+                try:
+                    await asyncio.wait_for(
+                        self._wake_up.wait(), self.poll_interval_seconds
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                self._wake_up.clear()
+
+    def get_retry_delay(self, attempts: int) -> float:
+        return min(
+            self.retry_backoff_seconds * 2 ** (attempts - 1),
+            self.retry_max_backoff_seconds,
+        )
+
+    def is_retryable(self, event: ApisixOutboxEvent, error: Exception) -> bool:
+        return (
+            isinstance(error, ApiGatewayRequestError)
+            and is_retryable_error(error)
+            and event.attempts < self.max_attempts
+        )
+
+    async def send_event(self, event: ApisixOutboxEvent) -> None:
+        """
+        Raises:
+            ApiGatewayRequestError: If the operation could not be sent to APISIX
+        """
+        apisix_client = get_apisix_client()
+        if event.operation == ApisixOutboxOperation.ADD_CONSUMER_GROUP:
+            await apisix_client.add_consumer_group_with_rate_limit(
+                event.resource_name,
+                event.payload["requests_number"],
+                event.payload["time_window"],
+            )
+        elif event.operation == ApisixOutboxOperation.UPSERT_CONSUMER:
+            await apisix_client.upsert_consumer(
+                event.resource_name,
+                description=event.payload.get("description"),
+                consumer_group_name=event.payload.get("consumer_group_name"),
+            )
+        elif event.operation == ApisixOutboxOperation.DELETE_CONSUMER:
+            try:
+                await apisix_client.delete_consumer(event.resource_name)
+            except ApiGatewayRequestError as e:
+                # Already deleted
+                if e.status_code != 404:
+                    raise
+        else:
+            raise ValueError(f"Unknown APISIX outbox operation {event.operation}")
+
+    async def _send_user_events(
+        self, events: list[ApisixOutboxEvent], semaphore: asyncio.Semaphore
+    ) -> list[tuple[ApisixOutboxEvent, Exception | None]]:
+        """
+        Sends the events of a user in order, stopping on the first failure.
+
+        Returns:
+            Every event sent with its error, `None` if it succeeded
+        """
+        results: list[tuple[ApisixOutboxEvent, Exception | None]] = []
+        async with semaphore:
+            for event in events:
+                try:
+                    await self.send_event(event)
+                except Exception as e:
+                    results.append((event, e))
+                    break
+                results.append((event, None))
+        return results
+
+    async def _store_results(
+        self, results: Sequence[tuple[ApisixOutboxEvent, Exception | None]]
+    ) -> None:
+        now = datetime.datetime.now(datetime.timezone.utc)
+        for event, error in results:
+            if error is None:
+                apisix_outbox_events_total.labels(event.operation, "success").inc()
+                apisix_outbox_event_delay_seconds.observe(
+                    (now - event.created).total_seconds()
+                )
+                await db_session.delete(event)
+                continue
+            event.attempts += 1
+            event.last_error = str(error)
+            if self.is_retryable(event, error):
+                apisix_outbox_events_total.labels(event.operation, "error").inc()
+                event.next_attempt_at = now + datetime.timedelta(
+                    seconds=self.get_retry_delay(event.attempts)
+                )
+                logger.warning(
+                    "Cannot send APISIX outbox event %s %s after %d attempts: %s",
+                    event.operation,
+                    event.resource_name,
+                    event.attempts,
+                    error,
+                )
+            else:
+                apisix_outbox_events_total.labels(event.operation, "failed").inc()
+                event.failed = True
+                logger.error(
+                    "APISIX outbox event %s %s failed after %d attempts, it won't be "
+                    "retried: %s",
+                    event.operation,
+                    event.resource_name,
+                    event.attempts,
+                    error,
+                )
+            db_session.add(event)
+        await db_session.commit()
+
+    async def process_batch(self) -> int:
+        """
+        Sends a batch of pending events, removing the ones sent and scheduling a retry
+        for the failed ones, or marking them as failed if they cannot be retried.
+
+        Returns:
+            Number of events sent or failed, `0` if the outbox is being processed by
+            another process
+        """
+        async with ApisixOutboxEvent.lock_outbox() as locked:
+            if not locked:
+                return 0
+            with set_database_session_context() as database_session_scope:
+                try:
+                    events_by_user: dict[uuid.UUID, list[ApisixOutboxEvent]] = {}
+                    for event in await ApisixOutboxEvent.get_pending(self.batch_size):
+                        events_by_user.setdefault(event.user_id, []).append(event)
+                    # Transaction is not kept open while sending the events
+                    await db_session.commit()
+                    if not events_by_user:
+                        return 0
+
+                    # Database session is only used after sending, it cannot be
+                    # shared by concurrent tasks
+                    semaphore = asyncio.Semaphore(self.concurrency)
+                    user_results = await asyncio.gather(
+                        *(
+                            self._send_user_events(events, semaphore)
+                            for events in events_by_user.values()
+                        )
+                    )
+                    results = [result for results in user_results for result in results]
+                    await self._store_results(results)
+                    return len(results)
+                finally:
+                    await remove_database_session(database_session_scope)
+
+    async def drain(self) -> int:
+        """
+        Processes batches until no event is ready to be sent.
+
+        Returns:
+            Number of events sent or failed
+        """
+        total = 0
+        while processed := await self.process_batch():
+            total += processed
+            if processed < self.batch_size:
+                break
+        return total
+
+
+@cache
+def get_apisix_outbox_worker() -> ApisixOutboxWorker:
+    """
+    Creates and returns the APISIX outbox worker.
+
+    Returns:
+        An instance of ApisixOutboxWorker.
+    """
+    return ApisixOutboxWorker(
+        batch_size=settings.APISIX_OUTBOX_BATCH_SIZE,
+        concurrency=settings.APISIX_OUTBOX_CONCURRENCY,
+        poll_interval_seconds=settings.APISIX_OUTBOX_POLL_INTERVAL_SECONDS,
+        retry_backoff_seconds=settings.APISIX_OUTBOX_RETRY_BACKOFF_SECONDS,
+        retry_max_backoff_seconds=settings.APISIX_OUTBOX_RETRY_MAX_BACKOFF_SECONDS,
+        max_attempts=settings.APISIX_OUTBOX_MAX_ATTEMPTS,
+    )
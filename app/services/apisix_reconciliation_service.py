@@ -0,0 +1,334 @@
+"""
+Reconciliation of the users and api keys stored in the database with their Apisix
+consumer groups and consumers, finding and fixing the drift between them.
+"""
+
+import asyncio
+import logging
+import uuid
+from typing import Awaitable, Callable, Iterable, TypeVar
+
+from ..config import settings
+from ..datasources.api_gateway.apisix.apisix_client import get_apisix_client
+from ..datasources.api_gateway.exceptions import ApiGatewayRequestError
+from ..datasources.db.models import ApiKey, User
+from ..models.api_gateway import ApisixReconciliationSummary
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Api key consumers are stored as a single int: user id in the high bits, api key id
+# in the low bits
+_UUID_BITS = 128
+_UUID_MASK = (1 << _UUID_BITS) - 1
+
+
+def parse_uuid_hex(name: str) -> int | None:
+    """
+    Args:
+        name: Apisix consumer group name, like `<user_id_hex>`.
+
+    Returns:
+        The uuid as int, `None` if the name is not a uuid in hex format
+    """
+    if len(name) != 32:
+        return None
+    try:
+        return uuid.UUID(hex=name).int
+    except ValueError:
+        return None
+
+
+def parse_consumer_name(name: str) -> int | None:
+    """
+    Args:
+        name: Apisix consumer name, like `<user_id_hex>_<api_key_id_hex>`.
+
+    Returns:
+        User id and api key id packed in an int, `None` if the name doesn't belong to
+        an api key
+    """
+    user_hex, separator, api_key_hex = name.partition("_")
+    if not separator:
+        return None
+    user_id = parse_uuid_hex(user_hex)
+    api_key_id = parse_uuid_hex(api_key_hex)
+    if user_id is None or api_key_id is None:
+        return None
+    return (user_id << _UUID_BITS) | api_key_id
+
+
+def get_consumer_ids(consumer: int) -> tuple[uuid.UUID, uuid.UUID]:
+    """
+    Returns:
+        User id and api key id of a consumer packed by `parse_consumer_name`
+    """
+    return uuid.UUID(int=consumer >> _UUID_BITS), uuid.UUID(int=consumer & _UUID_MASK)
+
+
+def get_consumer_name(consumer: int) -> str:
+    user_id, api_key_id = get_consumer_ids(consumer)
+    return f"{user_id.hex}_{api_key_id.hex}"
+
+
+class ApisixReconciler:
+    """
+    Compares the users and api keys of the database with the consumer groups and
+    consumers of Apisix. Both sides are read page by page and only their ids are kept,
+    as ints, so the drift is found with set operations.
+
+    Apisix is read before the database: resources created in between are found in the
+    database and fixed idempotently, instead of being taken as orphans and deleted.
+    Orphans are also looked up in the database again before deleting them, as the
+    services create the Apisix resources before committing their rows.
+    """
+
+    def __init__(
+        self,
+        dry_run: bool = False,
+        delete_orphans: bool = False,
+        max_concurrency: int = 10,
+        database_page_size: int = 1000,
+    ):
+        """
+
+        Args:
+            dry_run: Only report the drift, without fixing it.
+            delete_orphans: Delete the consumers and consumer groups without api key or
+                user in the database. Otherwise, they are only reported.
+            max_concurrency: Drifted resources fixed at the same time.
+            database_page_size: Rows read from the database at once.
+        """
+        self.dry_run = dry_run
+        self.delete_orphans = delete_orphans
+        self.max_concurrency = max_concurrency
+        self.database_page_size = database_page_size
+        self.summary = ApisixReconciliationSummary(
+            dry_run=dry_run, delete_orphans=delete_orphans
+        )
+
+    async def _run_bounded(
+        self,
+        elements: Iterable[T],
+        repair: Callable[[T], Awaitable[object]],
+        get_name: Callable[[T], str],
+    ) -> None:
+        """
+        Runs `repair` for every element, at most `max_concurrency` at once.
+        """
+        iterator = iter(elements)
+
+        async def worker() -> None:
+            # Iterator is shared by the workers, so every element is repaired once
+            for element in iterator:
+                try:
+                    await repair(element)
+                except ApiGatewayRequestError as e:
+                    logger.error("Cannot reconcile %s: %s", get_name(element), e)
+                    self.summary.failed.append(get_name(element))
+                else:
+                    self.summary.repaired += 1
+
+        await asyncio.gather(*(worker() for _ in range(self.max_concurrency)))
+
+    async def _get_apisix_ids(self) -> tuple[set[int], set[int], set[int]]:
+        """
+        Returns:
+            Consumer groups of users, consumers of api keys and consumers not in the
+            group of their user
+        """
+        apisix_client = get_apisix_client()
+        consumer_groups: set[int] = set()
+        async for consumer_group in apisix_client.iter_consumer_groups():
+            if (user_id := parse_uuid_hex(consumer_group.name)) is None:
+                self.summary.unmanaged += 1
+            else:
+                consumer_groups.add(user_id)
+
+        consumers: set[int] = set()
+        wrong_group_consumers: set[int] = set()
+        async for consumer in apisix_client.iter_consumers():
+            if (consumer_ids := parse_consumer_name(consumer.name)) is None:
+                self.summary.unmanaged += 1
+                continue
+            consumers.add(consumer_ids)
+            if consumer.consumer_group_name != consumer.name.partition("_")[0]:
+                wrong_group_consumers.add(consumer_ids)
+        self.summary.consumer_groups = len(consumer_groups)
+        self.summary.consumers = len(consumers)
+        return consumer_groups, consumers, wrong_group_consumers
+
+    async def _get_database_ids(self) -> tuple[set[int], set[int]]:
+        """
+        Returns:
+            Users and api keys, packed like Apisix consumers
+        """
+        users = {
+            user_id.int
+            async for user_id in User.iter_ids(page_size=self.database_page_size)
+        }
+        api_keys = {
+            (user_id.int << _UUID_BITS) | api_key_id.int
+            async for api_key_id, user_id in ApiKey.iter_ids(
+                page_size=self.database_page_size
+            )
+        }
+        self.summary.users = len(users)
+        self.summary.api_keys = len(api_keys)
+        return users, api_keys
+
+    async def _get_existing_user_ids(self, user_ids: list[int]) -> set[uuid.UUID]:
+        existing_user_ids: set[uuid.UUID] = set()
+        for start in range(0, len(user_ids), self.database_page_size):
+            existing_user_ids.update(
+                await User.get_existing_ids(
+                    [
+                        uuid.UUID(int=user_id)
+                        for user_id in user_ids[start : start + self.database_page_size]
+                    ]
+                )
+            )
+        return existing_user_ids
+
+    async def _get_api_key_descriptions(
+        self, consumers: list[int]
+    ) -> dict[uuid.UUID, str]:
+        descriptions: dict[uuid.UUID, str] = {}
+        for start in range(0, len(consumers), self.database_page_size):
+            descriptions.update(
+                await ApiKey.get_descriptions(
+                    [
+                        get_consumer_ids(consumer)[1]
+                        for consumer in consumers[
+                            start : start + self.database_page_size
+                        ]
+                    ]
+                )
+            )
+        return descriptions
+
+    async def run(self) -> ApisixReconciliationSummary:
+        """
+        Finds the drift between the database and Apisix and fixes it, unless on dry
+        run. Missing consumer groups are created before the consumers, and orphan
+        consumers are deleted before the consumer groups.
+
+        Returns:
+            Summary of the drift found and fixed
+        """
+        apisix_consumer_groups, apisix_consumers, wrong_group_consumers = (
+            await self._get_apisix_ids()
+        )
+        users, api_keys = await self._get_database_ids()
+
+        missing_consumer_groups = sorted(users - apisix_consumer_groups)
+        orphan_consumer_groups = sorted(apisix_consumer_groups - users)
+        missing_consumers = sorted(api_keys - apisix_consumers)
+        wrong_group_consumers &= api_keys
+        orphan_consumers = sorted(apisix_consumers - api_keys)
+        # Only the drift is kept while fixing it
+        del users, api_keys, apisix_consumer_groups, apisix_consumers
+
+        self.summary.missing_consumer_groups = [
+            uuid.UUID(int=user_id).hex for user_id in missing_consumer_groups
+        ]
+        self.summary.orphan_consumer_groups = [
+            uuid.UUID(int=user_id).hex for user_id in orphan_consumer_groups
+        ]
+        self.summary.missing_consumers = [
+            get_consumer_name(consumer) for consumer in missing_consumers
+        ]
+        self.summary.wrong_group_consumers = [
+            get_consumer_name(consumer) for consumer in sorted(wrong_group_consumers)
+        ]
+        self.summary.orphan_consumers = [
+            get_consumer_name(consumer) for consumer in orphan_consumers
+        ]
+        if self.dry_run:
+            return self.summary
+
+        apisix_client = get_apisix_client()
+        await self._run_bounded(
+            missing_consumer_groups,
+            lambda user_id: apisix_client.add_consumer_group_with_rate_limit(
+                uuid.UUID(int=user_id).hex,
+                settings.APISIX_FREEMIUM_CONSUMER_GROUP_REQUESTS_PER_SECOND_MAX,
+                settings.APISIX_FREEMIUM_CONSUMER_GROUP_REQUESTS_PER_SECOND_TIME_WINDOW_SECONDS,
+            ),
+            lambda user_id: uuid.UUID(int=user_id).hex,
+        )
+
+        # Descriptions are read before repairing, database session cannot be shared
+        # by concurrent tasks. Api keys deleted since the diff are not returned, and
+        # their consumers must not be created again, or the revoked keys would work
+        consumers_to_upsert = missing_consumers + sorted(wrong_group_consumers)
+        descriptions = await self._get_api_key_descriptions(consumers_to_upsert)
+        consumers_to_upsert = [
+            consumer
+            for consumer in consumers_to_upsert
+            if get_consumer_ids(consumer)[1] in descriptions
+        ]
+
+        async def upsert_consumer(consumer: int) -> None:
+            user_id, api_key_id = get_consumer_ids(consumer)
+            await apisix_client.upsert_consumer(
+                get_consumer_name(consumer),
+                description=descriptions.get(api_key_id),
+                consumer_group_name=user_id.hex,
+            )
+
+        await self._run_bounded(consumers_to_upsert, upsert_consumer, get_consumer_name)
+
+        if self.delete_orphans:
+            # Users and api keys committed after reading the database are not orphans
+            created_api_keys = await self._get_api_key_descriptions(orphan_consumers)
+            orphan_consumers = [
+                consumer
+                for consumer in orphan_consumers
+                if get_consumer_ids(consumer)[1] not in created_api_keys
+            ]
+            created_users = await self._get_existing_user_ids(orphan_consumer_groups)
+            orphan_consumer_groups = [
+                user_id
+                for user_id in orphan_consumer_groups
+                if uuid.UUID(int=user_id) not in created_users
+            ]
+            await self._run_bounded(
+                orphan_consumers,
+                lambda consumer: apisix_client.delete_consumer(
+                    get_consumer_name(consumer)
+                ),
+                get_consumer_name,
+            )
+            await self._run_bounded(
+                orphan_consumer_groups,
+                lambda user_id: apisix_client.delete_consumer_group(
+                    uuid.UUID(int=user_id).hex
+                ),
+                lambda user_id: uuid.UUID(int=user_id).hex,
+            )
+        return self.summary
+
+
+async def reconcile_apisix(
+    dry_run: bool = False,
+    delete_orphans: bool = False,
+    max_concurrency: int | None = None,
+) -> ApisixReconciliationSummary:
+    """
+    Finds and fixes the drift between the database and Apisix, see `ApisixReconciler`.
+
+    Args:
+        dry_run: Only report the drift, without fixing it.
+        delete_orphans: Delete consumers and consumer groups not in the database.
+        max_concurrency: Drifted resources fixed at the same time.
+
+    Returns:
+        Summary of the drift found and fixed
+    """
+    return await ApisixReconciler(
+        dry_run=dry_run,
+        delete_orphans=delete_orphans,
+        max_concurrency=max_concurrency or settings.APISIX_RECONCILIATION_CONCURRENCY,
+    ).run()
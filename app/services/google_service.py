@@ -45,7 +45,7 @@ class GoogleService:
                         detail="Empty access token",
                     )
             async with session.get(
-                "https://www.googleapis.com/oauth2/v1/userinfo",
+                settings.GOOGLE_USERINFO_URL,
                 headers={"Authorization": f"Bearer {access_token}"},
             ) as response:
                 return GoogleUser.model_validate_json(await response.text())
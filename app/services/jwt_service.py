@@ -1,9 +1,82 @@
 from datetime import datetime, timedelta, timezone
+from functools import cache
+from typing import TYPE_CHECKING, cast
 
 import jwt
+from cryptography.hazmat.primitives.serialization import (
+    load_pem_private_key,
+    load_pem_public_key,
+)
 
 from ..config import settings
 
+if TYPE_CHECKING:
+    from jwt.algorithms import AllowedPrivateKeys, AllowedPublicKeys
+
+
+class JwtKeyNotConfigured(Exception):
+    pass
+
+
+class JwtKeyManager:
+    """
+    Parses the PEM keys only once. PyJWT uses `cryptography` key objects as they are,
+    while PEM strings are parsed and loaded again on every encode/decode.
+    """
+
+    def __init__(self, private_key_pem: str, public_key_pem: str):
+        """
+
+        Args:
+            private_key_pem: PEM private key used to sign tokens.
+            public_key_pem: PEM public key used to verify tokens. If not provided,
+                it's derived from the private key.
+        """
+        self._signing_key: "AllowedPrivateKeys | None" = None
+        self._verification_key: "AllowedPublicKeys | None" = None
+        if private_key_pem:
+            self._signing_key = cast(
+                "AllowedPrivateKeys",
+                load_pem_private_key(private_key_pem.encode(), password=None),
+            )
+        if public_key_pem:
+            self._verification_key = cast(
+                "AllowedPublicKeys", load_pem_public_key(public_key_pem.encode())
+            )
+        elif self._signing_key is not None:
+            self._verification_key = self._signing_key.public_key()
+
+    @property
+    def signing_key(self) -> "AllowedPrivateKeys":
+        """
+        Raises:
+            JwtKeyNotConfigured: if no private key was provided
+        """
+        if self._signing_key is None:
+            raise JwtKeyNotConfigured("JWT private key is not configured")
+        return self._signing_key
+
+    @property
+    def verification_key(self) -> "AllowedPublicKeys":
+        """
+        Raises:
+            JwtKeyNotConfigured: if neither a public nor a private key were provided
+        """
+        if self._verification_key is None:
+            raise JwtKeyNotConfigured("JWT public key is not configured")
+        return self._verification_key
+
+
+@cache
+def get_jwt_key_manager() -> JwtKeyManager:
+    """
+    Creates and returns a JwtKeyManager instance with the configured keys.
+
+    Returns:
+        An instance of JwtKeyManager.
+    """
+    return JwtKeyManager(settings.JWT_PRIVATE_KEY, settings.JWT_PUBLIC_KEY)
+
 
 class JwtService:
     @staticmethod
@@ -41,6 +114,8 @@ class JwtService:
             "data": data.copy(),
         }
         encoded_jwt = jwt.encode(
-            to_encode, settings.JWT_PRIVATE_KEY, algorithm=settings.JWT_ALGORITHM
+            to_encode,
+            get_jwt_key_manager().signing_key,
+            algorithm=settings.JWT_ALGORITHM,
         )
         return encoded_jwt
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+from typing import Callable, TypeVar
+
+import bcrypt
+from prometheus_client import Counter, Histogram
+
+from ..config import settings
+from ..models.types import passwordType
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+HASHING_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+password_hasher_queue_wait_seconds = Histogram(
+    "password_hasher_queue_wait_seconds",
+    "Time a password hashing job waits for a free worker",
+    ["operation"],
+    buckets=HASHING_BUCKETS,
+)
+password_hasher_duration_seconds = Histogram(
+    "password_hasher_duration_seconds",
+    "Time spent running bcrypt in a worker",
+    ["operation"],
+    buckets=HASHING_BUCKETS,
+)
+password_hasher_rejected_total = Counter(
+    "password_hasher_rejected_total",
+    "Password hashing jobs rejected because the queue was full",
+    ["operation"],
+)
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+@cache
+def get_password_hasher() -> "PasswordHasher":
+    """
+    Creates and returns a PasswordHasher instance.
+
+    Returns:
+        An instance of PasswordHasher.
+    """
+    return PasswordHasher(
+        pool_size=settings.PASSWORD_HASHER_POOL_SIZE,
+        max_queue_size=settings.PASSWORD_HASHER_MAX_QUEUE_SIZE,
+        bcrypt_rounds=settings.PASSWORD_HASHER_BCRYPT_ROUNDS,
+    )
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification in a bounded pool of worker threads, so the
+    event loop is not blocked while a password is being hashed.
+    bcrypt releases the GIL, so threads are enough to use every core.
+    """
+
+    def __init__(self, pool_size: int, max_queue_size: int, bcrypt_rounds: int = 12):
+        """
+
+        Args:
+            pool_size: Number of worker threads running bcrypt.
+            max_queue_size: Maximum number of jobs waiting for a free worker.
+                When reached, new jobs are rejected with `PasswordHasherBusy`.
+            bcrypt_rounds: bcrypt cost factor used for new hashes.
+        """
+        self.pool_size = pool_size
+        self.max_queue_size = max_queue_size
+        self.bcrypt_rounds = bcrypt_rounds
+        self.executor = ThreadPoolExecutor(
+            max_workers=pool_size, thread_name_prefix="password-hasher"
+        )
+        self._pending_jobs = 0
+
+    @property
+    def pending_jobs(self) -> int:
+        """
+        Returns:
+            Number of jobs running or waiting for a worker.
+        """
+        return self._pending_jobs
+
+    def _release_job(self) -> None:
+        self._pending_jobs -= 1
+
+    async def _run(self, operation: str, func: Callable[..., T], *args) -> T:
+        """
+        Runs `func` on the worker pool and waits for the result.
+
+        Args:
+            operation: Name of the operation, used as metric label.
+            func: Blocking function to run.
+            *args: Arguments for `func`.
+
+        Returns:
+            The value returned by `func`.
+
+        Raises:
+            PasswordHasherBusy: If the queue of pending jobs is full.
+        """
+        if self._pending_jobs >= self.pool_size + self.max_queue_size:
+            password_hasher_rejected_total.labels(operation).inc()
+            raise PasswordHasherBusy(
+                f"Password hasher queue is full ({self._pending_jobs} pending jobs)"
+            )
+
+        submitted_at = time.perf_counter()
+
+        def job() -> T:
+            started_at = time.perf_counter()
+            password_hasher_queue_wait_seconds.labels(operation).observe(
+                started_at - submitted_at
+            )
+            try:
+                return func(*args)
+            finally:
+                password_hasher_duration_seconds.labels(operation).observe(
+                    time.perf_counter() - started_at
+                )
+
+        loop = asyncio.get_running_loop()
+        self._pending_jobs += 1
+        future = self.executor.submit(job)
+        # Release the slot when the job really finishes, even if the caller is cancelled
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release_job))
+        return await asyncio.wrap_future(future)
+
+    async def hash_password(self, password: passwordType) -> str:
+        """
+        Args:
+            password:
+
+        Returns:
+            A string like '$2b$12$yadYxE5ZNfF28M.M00gha.SEaPF2Z.ICEqgIhbhZrgCrCR7PEK7uS'
+
+        Raises:
+            PasswordHasherBusy: If the queue of pending jobs is full.
+        """
+        hashed_password = await self._run(
+            "hash",
+            bcrypt.hashpw,
+            password.get_secret_value().encode(),
+            bcrypt.gensalt(self.bcrypt_rounds),
+        )
+        return hashed_password.decode()
+
+    async def verify_password(
+        self, plain_password: passwordType, hashed_password: str
+    ) -> bool:
+        """
+        Args:
+            plain_password:
+            hashed_password:
+
+        Returns:
+            ``True`` if the password matches the hash, ``False`` otherwise
+
+        Raises:
+            PasswordHasherBusy: If the queue of pending jobs is full.
+        """
+        return await self._run(
+            "verify",
+            bcrypt.checkpw,
+            plain_password.get_secret_value().encode(),
+            hashed_password.encode(),
+        )
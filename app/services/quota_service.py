@@ -0,0 +1,51 @@
+import uuid
+
+from ..datasources.db.connector import db_session
+from ..datasources.db.models import ApiKey, User, Webhook
+
+
+async def is_user_quota_available(
+    model: type[ApiKey] | type[Webhook], user_id: uuid.UUID, limit: int
+) -> bool:
+    """
+    Check if the user can create a new element of the provided model, to reject the
+    creation before calling remote services. The limit is enforced by
+    `create_within_quota` when storing the element.
+
+    The transaction is finished, so no connection is held during the remote calls.
+
+    Args:
+        model: Database model limited per user.
+        user_id:
+        limit: Maximum number of elements for the user.
+
+    Returns:
+        True if the user has not reached the limit, False otherwise
+    """
+    available = await model.count_by_user(user_id) < limit
+    await db_session.commit()
+    return available
+
+
+async def create_within_quota(element: ApiKey | Webhook, limit: int, *related) -> bool:
+    """
+    Store the element if the user has not reached the limit.
+
+    The user row is locked, so concurrent creations for the same user wait for each
+    other and cannot exceed the limit. Counting and storing are done in a short
+    transaction, the lock must not be held during remote calls.
+
+    Args:
+        element: Element to store, limited per user.
+        limit: Maximum number of elements for the user.
+        *related: Instances stored in the same transaction, like outbox events.
+
+    Returns:
+        True if the element was stored, False if the user reached the limit
+    """
+    await User.lock_by_user_id(element.user_id)
+    if await type(element).count_by_user(element.user_id) >= limit:
+        await db_session.rollback()
+        return False
+    await element.create(*related)
+    return True
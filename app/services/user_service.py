@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import secrets
 import uuid
@@ -7,16 +8,20 @@ from typing import cast
 from fastapi import HTTPException
 from pydantic import SecretStr
 
-import bcrypt
+from sqlmodel import SQLModel
 from starlette import status
 
 from ..config import settings
 from ..datasources.api_gateway.apisix.apisix_client import get_apisix_client
 from ..datasources.cache.redis import get_redis
-from ..datasources.db.models import User
+from ..datasources.db.models import ApisixOutboxEvent, User
 from ..models.types import passwordType
 from ..models.users import Token
+from .apisix_outbox_worker import get_apisix_outbox_worker
 from .jwt_service import JwtService
+from .password_hasher import get_password_hasher
+
+logger = logging.getLogger(__name__)
 
 
 class UserServiceException(Exception):
@@ -53,9 +58,14 @@ class UserService:
 
     def __init__(self):
         self.jwt_service = JwtService()
+        self.password_hasher = get_password_hasher()
 
     async def create_user_in_db(
-        self, user_id: uuid.UUID, email: str, password: passwordType
+        self,
+        user_id: uuid.UUID,
+        email: str,
+        password: passwordType,
+        *related: SQLModel,
     ) -> User:
         """
         Creates a new user in the database with a hashed password.
@@ -64,31 +74,90 @@ class UserService:
             user_id: The unique identifier to assign to the user.
             email: The user's email address.
             password: The user's plain-text password.
+            *related: Instances stored in the same transaction, like outbox events.
 
         Returns:
             User: The newly created user instance.
         """
-        hashed_password = self.hash_password(password)
+        hashed_password = await self.hash_password(password)
         user = User(id=user_id, email=email, hashed_password=hashed_password)
-        await user.create()
+        await user.create(*related)
         return user
 
     async def register_user_in_apisix(self, user_id: uuid.UUID) -> None:
         """
-        Registers a new user in APISIX by creating a consumer group and applying rate limits.
+        Registers a new user in APISIX by creating a consumer group with its rate limit,
+        in a single request.
 
         Args:
             user_id (uuid.UUID): The UUID of the user.
         """
-        apisix_client = get_apisix_client()
-        consumer_group_id = user_id.hex
-        await apisix_client.add_consumer_group(consumer_group_id)
-        await apisix_client.set_rate_limit_to_consumer_group(
-            consumer_group_id,
+        await get_apisix_client().add_consumer_group_with_rate_limit(
+            user_id.hex,
             settings.APISIX_FREEMIUM_CONSUMER_GROUP_REQUESTS_PER_SECOND_MAX,
             settings.APISIX_FREEMIUM_CONSUMER_GROUP_REQUESTS_PER_SECOND_TIME_WINDOW_SECONDS,
         )
 
+    async def create_user(
+        self, user_id: uuid.UUID, email: str, password: passwordType
+    ) -> User:
+        """
+        Registers the user in APISIX while the password is hashed and the user is stored
+        in the database. If one of them fails, the other one is undone, so there are no
+        users without consumer group or consumer groups without user.
+        With `APISIX_OUTBOX_ENABLED`, the user is registered in APISIX after it's stored.
+
+        Args:
+            user_id: The unique identifier to assign to the user.
+            email: The user's email address.
+            password: The user's plain-text password.
+
+        Returns:
+            User: The newly created user instance.
+
+        Raises:
+            ApiGatewayRequestError: if the user cannot be registered in APISIX
+            PasswordHasherBusy: if the password hasher queue is full
+        """
+        if settings.APISIX_OUTBOX_ENABLED:
+            outbox_user = await self.create_user_in_db(
+                user_id,
+                email,
+                password,
+                ApisixOutboxEvent.add_consumer_group(
+                    user_id,
+                    settings.APISIX_FREEMIUM_CONSUMER_GROUP_REQUESTS_PER_SECOND_MAX,
+                    settings.APISIX_FREEMIUM_CONSUMER_GROUP_REQUESTS_PER_SECOND_TIME_WINDOW_SECONDS,
+                ),
+            )
+            get_apisix_outbox_worker().notify()
+            return outbox_user
+
+        apisix_result, user = await asyncio.gather(
+            self.register_user_in_apisix(user_id),
+            self.create_user_in_db(user_id, email, password),
+            return_exceptions=True,
+        )
+        if isinstance(user, BaseException):
+            if not isinstance(apisix_result, BaseException):
+                try:
+                    await get_apisix_client().delete_consumer_group(user_id.hex)
+                except Exception:
+                    logger.exception(
+                        "Cannot remove APISIX consumer group of not created user %s",
+                        user_id,
+                    )
+            raise user
+        if isinstance(apisix_result, BaseException):
+            try:
+                await User.delete_by_user_id(user_id)
+            except Exception:
+                logger.exception(
+                    "Cannot remove user %s not registered in APISIX", user_id
+                )
+            raise apisix_result
+        return user
+
     def emit_access_token(self, user_id: uuid.UUID) -> Token:
         access_token_expires = timedelta(days=settings.JWT_AUTH_SERVICE_EXPIRE_DAYS)
         access_token = self.jwt_service.create_access_token(
@@ -96,45 +165,69 @@ class UserService:
         )
         return Token(access_token=access_token, token_type="bearer")
 
-    def verify_password(
+    async def verify_password(
         self, plain_password: passwordType, hashed_password: str
     ) -> bool:
-        return bcrypt.checkpw(
-            plain_password.get_secret_value().encode(), hashed_password.encode()
+        """
+        Verifies the password in the password hasher worker pool.
+
+        Raises:
+            PasswordHasherBusy: if the password hasher queue is full
+        """
+        return await self.password_hasher.verify_password(
+            plain_password, hashed_password
         )
 
-    def hash_password(self, password: passwordType) -> str:
+    async def hash_password(self, password: passwordType) -> str:
         """
+        Hashes the password in the password hasher worker pool.
+
         Args:
             password:
 
         Returns:
             A string like '$2b$12$yadYxE5ZNfF28M.M00gha.SEaPF2Z.ICEqgIhbhZrgCrCR7PEK7uS'
+
+        Raises:
+            PasswordHasherBusy: if the password hasher queue is full
         """
-        return bcrypt.hashpw(
-            password.get_secret_value().encode(), bcrypt.gensalt()
-        ).decode()
+        return await self.password_hasher.hash_password(password)
 
-    def temporary_token_generate(
+    async def temporary_token_generate(
         self,
         key_prefix: str,
         email: str,
         ttl_seconds: int = settings.PRE_REGISTRATION_TOKEN_TTL_SECONDS,
     ) -> str:
         """
-        Generates a temporary token and stores it in the cache for an email
+        Generates a temporary token and stores it in the cache for an email.
+        Both keys are written in the same MULTI transaction, and the email key is only
+        written if it does not exist (`SET NX`), so only one token can exist per email.
 
         Returns:
             Temporary token
+
+        Raises:
+            TemporaryTokenExists: if a temporary token already exists for the email
         """
         token = uuid.uuid4().hex
-        # Store one key with the email (to prevent more than one token for the same email)
-        get_redis().set(key_prefix + email, token, ex=ttl_seconds)
-        # Store one key with the token (so email can be retrieved with the token, and it's not required on next steps)
-        get_redis().set(key_prefix + token, email, ex=ttl_seconds)
+        token_key = key_prefix + token
+        async with get_redis().pipeline(transaction=True) as pipeline:
+            # Store one key with the email (to prevent more than one token for the same email)
+            pipeline.set(key_prefix + email, token, ex=ttl_seconds, nx=True)
+            # Store one key with the token (so email can be retrieved with the token, and it's not required on next steps)
+            pipeline.set(token_key, email, ex=ttl_seconds)
+            email_key_stored, _ = await pipeline.execute()
+
+        if not email_key_stored:
+            # Token key is not linked to the email key, remove it
+            await get_redis().delete(token_key)
+            raise TemporaryTokenExists(f"Temporary token exists for {email}")
         return token
 
-    def temporary_token_get_email(self, key_prefix: str, token: str) -> str | None:
+    async def temporary_token_get_email(
+        self, key_prefix: str, token: str
+    ) -> str | None:
         """
         Get email from temporary token
 
@@ -146,12 +239,14 @@ class UserService:
             `Email` if token is valid, `None` otherwise
 
         """
-        email = cast(bytes, get_redis().get(key_prefix + token))
+        email = cast(bytes | None, await get_redis().get(key_prefix + token))
         if email:
             return email.decode()
         return None
 
-    def temporary_token_exists_for_email(self, key_prefix: str, email: str) -> bool:
+    async def temporary_token_exists_for_email(
+        self, key_prefix: str, email: str
+    ) -> bool:
         """
         Args:
             email:
@@ -159,9 +254,9 @@ class UserService:
         Returns:
             ``True`` if a temporary token exists for the provided email
         """
-        return cast(bool, get_redis().exists(key_prefix + email))
+        return bool(await get_redis().exists(key_prefix + email))
 
-    def pre_register_user(self, email: str) -> str:
+    async def pre_register_user(self, email: str) -> str:
         """
         Args:
             email:
@@ -172,15 +267,9 @@ class UserService:
         Raises:
             TemporaryTokenExists: if a temporary token already exists for the email
         """
-
-        if self.temporary_token_exists_for_email(
-            self.TEMPORARY_TOKEN_REGISTRATION_PREFIX, email
-        ):
-            raise TemporaryTokenExists(f"Temporary token exists for {email}")
-        token = self.temporary_token_generate(
+        return await self.temporary_token_generate(
             self.TEMPORARY_TOKEN_REGISTRATION_PREFIX, email
         )
-        return token
 
     async def register_user(self, password: passwordType, token: str) -> User:
         """
@@ -196,23 +285,20 @@ class UserService:
             UserAlreadyExists: user with the provided email exists in the database
         """
 
-        email = self.temporary_token_get_email(
+        email = await self.temporary_token_get_email(
             self.TEMPORARY_TOKEN_REGISTRATION_PREFIX, token
         )
         if not email:
             raise TemporaryTokenNotValid(f"Temporary token {token} not valid")
         if await User.get_by_email(email):
             raise UserAlreadyExists(f"User with email {email} already exists")
-        user_id = uuid.uuid4()
-        await self.register_user_in_apisix(user_id)
-        user = await self.create_user_in_db(user_id, email, password)
-        return user
+        return await self.create_user(uuid.uuid4(), email, password)
 
     async def authenticate_user(
         self, email: str, password: passwordType
     ) -> User | None:
         user = await User.get_by_email(email)
-        if user and self.verify_password(password, user.hashed_password):
+        if user and await self.verify_password(password, user.hashed_password):
             return user
         return None
 
@@ -241,9 +327,7 @@ class UserService:
             random_password = SecretStr(
                 secrets.token_hex(64)
             )  # Random password so user can change it afterward
-            user_id = uuid.uuid4()
-            await self.register_user_in_apisix(user_id)
-            user = await self.create_user_in_db(user_id, email, random_password)
+            user = await self.create_user(uuid.uuid4(), email, random_password)
         return self.emit_access_token(user.id)
 
     async def change_password(
@@ -264,12 +348,12 @@ class UserService:
             WrongPassword: in case the old password is incorrect
 
         """
-        if old_password is not None and not self.verify_password(
+        if old_password is not None and not await self.verify_password(
             old_password, user.hashed_password
         ):
             raise WrongPassword("Incorrect password")
 
-        hashed_password = self.hash_password(new_password)
+        hashed_password = await self.hash_password(new_password)
         return await User.update_password(user.id, hashed_password)
 
     async def get_forgot_password_token(self, email: str) -> str | None:
@@ -281,19 +365,17 @@ class UserService:
 
         Returns: a token if the email exists, None otherwise
 
+        Raises:
+            TemporaryTokenExists: if a temporary token already exists for the email
+
         """
-        if self.temporary_token_exists_for_email(
-            self.TEMPORARY_TOKEN_RESET_PASSWORD_PREFIX, email
-        ):
-            raise TemporaryTokenExists(f"Temporary token exists for {email}")
         # Check if the user exists
         if not await User.get_by_email(email):
             return None
 
-        token = self.temporary_token_generate(
+        return await self.temporary_token_generate(
             self.TEMPORARY_TOKEN_RESET_PASSWORD_PREFIX, email
         )
-        return token
 
     async def reset_password(self, token: str, new_password: passwordType) -> bool:
         """
@@ -306,7 +388,7 @@ class UserService:
         Returns:
 
         """
-        email = self.temporary_token_get_email(
+        email = await self.temporary_token_get_email(
             self.TEMPORARY_TOKEN_RESET_PASSWORD_PREFIX, token
         )
         if not email:
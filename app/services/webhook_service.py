@@ -1,12 +1,15 @@
 import asyncio
 import uuid
+from functools import cache
 
 from ..config import settings
+from ..datasources.cache.two_tier_cache import TwoTierCache
 from ..datasources.db.models import Webhook
 from ..datasources.webhooks.events_service.events_service_client import (
     get_events_service_client,
 )
 from ..models.webhook import WebhookEventsService, WebhookPublic, WebhookRequest
+from .quota_service import create_within_quota, is_user_quota_available
 
 
 class WebhookServiceException(Exception):
@@ -25,6 +28,45 @@ class WebhookCreationLimitReached(WebhookServiceException):
     pass
 
 
+@cache
+def get_webhook_cache() -> TwoTierCache[WebhookEventsService]:
+    """
+    Creates and returns the cache for the events service webhooks, by external webhook id.
+    Updated and deleted webhooks are invalidated with tombstones, so lookups and
+    refreshes running meanwhile don't store the previous webhook and its authorization.
+
+    Returns:
+        An instance of TwoTierCache for events service webhooks.
+    """
+    return TwoTierCache(
+        "events_service_webhook",
+        WebhookEventsService,
+        settings.EVENTS_SERVICE_WEBHOOK_CACHE_LOCAL_MAX_SIZE,
+        settings.EVENTS_SERVICE_WEBHOOK_CACHE_LOCAL_TTL_SECONDS,
+        settings.EVENTS_SERVICE_WEBHOOK_CACHE_TTL_SECONDS,
+        negative_ttl_seconds=0,
+        stale_ttl_seconds=settings.EVENTS_SERVICE_WEBHOOK_CACHE_STALE_TTL_SECONDS,
+    )
+
+
+async def _get_events_service_webhook(
+    external_webhook_id: uuid.UUID,
+) -> WebhookEventsService:
+    """
+    Retrieves a webhook from the events service, using the webhook cache.
+
+    Args:
+        external_webhook_id: The ID of the webhook in the events service.
+
+    Returns:
+        WebhookEventsService: The webhook from the event service.
+    """
+    return await get_webhook_cache().get_or_load(
+        str(external_webhook_id),
+        lambda: get_events_service_client().get_webhook(external_webhook_id),
+    )
+
+
 def _parse_webhook_public(
     model_webhook: Webhook, events_service_webhook: WebhookEventsService
 ) -> WebhookPublic:
@@ -61,7 +103,8 @@ async def generate_webhook(
 ) -> WebhookPublic:
     """
     Generates a new webhook for a user, adding it to the event service and creating
-    a corresponding entry in the database.
+    a corresponding entry in the database. The webhook is removed from the events
+    service if it cannot be stored.
 
     Args:
         user_id: The ID of the user for whom the webhook is being generated.
@@ -73,9 +116,8 @@ async def generate_webhook(
     Raises:
         WebhookCreationLimitReached: If the user has reached the webhook creation limit.
     """
-    user_webhooks = await Webhook.get_webhooks_by_user(user_id)
-
-    if len(user_webhooks) >= settings.EVENTS_SERVICE_WEBHOOKS_CREATION_LIMIT:
+    limit = settings.EVENTS_SERVICE_WEBHOOKS_CREATION_LIMIT
+    if not await is_user_quota_available(Webhook, user_id, limit):
         raise WebhookCreationLimitReached("Webhook creation limit reached")
 
     webhook_id = uuid.uuid4()
@@ -93,7 +135,19 @@ async def generate_webhook(
         description=webhook_request_info.description,
         external_webhook_id=events_service_webhook.id,
     )
-    await db_webhook.create()
+    created = False
+    try:
+        created = await create_within_quota(db_webhook, limit)
+    finally:
+        # Concurrent creations reached the limit meanwhile, or the webhook could not
+        # be stored
+        if not created:
+            await get_events_service_client().delete_webhook(events_service_webhook.id)
+    if not created:
+        raise WebhookCreationLimitReached("Webhook creation limit reached")
+    await get_webhook_cache().set(
+        [str(events_service_webhook.id)], events_service_webhook
+    )
     return _parse_webhook_public(db_webhook, events_service_webhook)
 
 
@@ -128,6 +182,7 @@ async def update_webhook_by_ids(
         authorization=webhook_request_info.authorization,
         description=_get_external_description(user_id, webhook_id),
     )
+    await get_webhook_cache().delete([str(stored_webhook.external_webhook_id)])
     stored_webhook.description = webhook_request_info.description
     await stored_webhook.update()
     return True
@@ -145,7 +200,7 @@ async def get_webhooks_by_user(user_id: uuid.UUID) -> list["WebhookPublic"]:
     """
     db_webhooks = await Webhook.get_webhooks_by_user(user_id)
     retrieve_events_service_webhooks_tasks = [
-        get_events_service_client().get_webhook(webhook.external_webhook_id)
+        _get_events_service_webhook(webhook.external_webhook_id)
         for webhook in db_webhooks
     ]
     events_service_webhooks = await asyncio.gather(
@@ -171,7 +226,7 @@ async def get_webhook_by_ids(
         WebhookPublic | None: The corresponding webhook, or None if not found.
     """
     if (webhook := await Webhook.get_by_ids(webhook_id, user_id)) is not None:
-        events_service_webhook = await get_events_service_client().get_webhook(
+        events_service_webhook = await _get_events_service_webhook(
             webhook.external_webhook_id
         )
         return _parse_webhook_public(webhook, events_service_webhook)
@@ -194,4 +249,5 @@ async def delete_webhook_by_id(webhook_id: uuid.UUID, user_id: uuid.UUID) -> boo
         return False
 
     await get_events_service_client().delete_webhook(stored_webhook.external_webhook_id)
+    await get_webhook_cache().delete([str(stored_webhook.external_webhook_id)])
     return await Webhook.delete_by_ids(webhook_id, user_id)
@@ -1,8 +1,21 @@
+import asyncio
 from unittest import IsolatedAsyncioTestCase, mock
 
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.config import settings
 from app.datasources.api_gateway.api_gateway_client import ApiGatewayClient
-from app.datasources.api_gateway.apisix.apisix_client import get_apisix_client
-from app.datasources.api_gateway.exceptions import ApiGatewayRequestError
+from app.datasources.api_gateway.apisix.apisix_client import (
+    ApisixClient,
+    get_apisix_client,
+)
+from app.datasources.api_gateway.exceptions import (
+    ApiGatewayRequestError,
+    ApiGatewayUnavailable,
+)
+from app.datasources.http_client.circuit_breaker import CircuitBreaker
+from app.models.api_gateway import Consumer, ConsumersJwtConfigUpdateSummary
 
 
 class TestApisixClient(IsolatedAsyncioTestCase):
@@ -114,6 +127,25 @@ class TestApisixClient(IsolatedAsyncioTestCase):
             },
         )
 
+    async def test_add_consumer_group_with_rate_limit(self):
+        await self.apisix_client.add_consumer_group_with_rate_limit(
+            "consumer_group_created_with_rate_limit",
+            requests_number=5,
+            time_window=1,
+            description="description",
+        )
+
+        consumer_group = await self.apisix_client.get_consumer_group(
+            "consumer_group_created_with_rate_limit"
+        )
+        self.assertEqual(consumer_group.description, "description")
+        assert consumer_group.plugins is not None
+        self.assertEqual(consumer_group.plugins["limit-count"]["count"], 5)
+        self.assertEqual(consumer_group.plugins["limit-count"]["time_window"], 1)
+        self.assertEqual(
+            consumer_group.plugins["limit-count"]["key"], "consumer_group_id"
+        )
+
     async def test_delete_consumer_group(self):
         await self.apisix_client.add_consumer_group("consumer_group_to_delete")
 
@@ -147,6 +179,30 @@ class TestApisixClient(IsolatedAsyncioTestCase):
         consumers = await self.apisix_client.get_consumers()
         self.assertListEqual(consumers, [consumer])
 
+    async def test_iter_consumers(self):
+        consumer_names = [f"consumer_{index}" for index in range(12)]
+        for consumer_name in consumer_names:
+            await self.apisix_client.upsert_consumer(consumer_name)
+
+        consumers = [
+            consumer async for consumer in self.apisix_client.iter_consumers(10)
+        ]
+        self.assertCountEqual([consumer.name for consumer in consumers], consumer_names)
+
+    async def test_iter_consumer_groups(self):
+        consumer_group_names = [f"consumer_group_{index}" for index in range(12)]
+        for consumer_group_name in consumer_group_names:
+            await self.apisix_client.add_consumer_group(consumer_group_name)
+
+        consumer_groups = [
+            consumer_group
+            async for consumer_group in self.apisix_client.iter_consumer_groups(10)
+        ]
+        self.assertCountEqual(
+            [consumer_group.name for consumer_group in consumer_groups],
+            consumer_group_names,
+        )
+
     async def test_upsert_consumer(self):
         with self.assertRaises(ApiGatewayRequestError):
             await self.apisix_client.get_consumer("consumer_one")
@@ -247,3 +303,273 @@ class TestApisixClient(IsolatedAsyncioTestCase):
                     }
                 },
             )
+
+
+class TestApisixClientUpdateConsumersJwtConfig(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.apisix_client = ApisixClient("http://apisix")
+        self.consumers = [
+            Consumer(
+                name=f"consumer_{index}",
+                description=None,
+                labels=None,
+                plugins={
+                    "jwt-auth": {
+                        "key": f"consumer_{index}",
+                        "algorithm": "ES256",
+                        "public_key": "old key",
+                    }
+                },
+                consumer_group_name=None,
+            )
+            for index in range(5)
+        ]
+
+    async def asyncTearDown(self):
+        await self.apisix_client.async_session.close()
+
+    async def _iter_consumers(self, consumers: list[Consumer]):
+        for consumer in consumers:
+            yield consumer
+
+    @mock.patch.object(ApisixClient, "_get_request", new_callable=mock.AsyncMock)
+    async def test_iter_consumers_pages(self, mock_get_request):
+        consumers_data = [
+            {"value": {"username": consumer.name, "plugins": consumer.plugins}}
+            for consumer in self.consumers
+        ]
+        mock_get_request.return_value.json.side_effect = [
+            {"total": 5, "list": consumers_data[:2]},
+            {"total": 5, "list": consumers_data[2:4]},
+            {"total": 5, "list": consumers_data[4:]},
+        ]
+
+        consumers = [
+            consumer async for consumer in self.apisix_client.iter_consumers(2)
+        ]
+        self.assertEqual(consumers, self.consumers)
+        mock_get_request.assert_has_awaits(
+            [
+                mock.call("/apisix/admin/consumers/?page=1&page_size=2"),
+                mock.call("/apisix/admin/consumers/?page=2&page_size=2"),
+                mock.call("/apisix/admin/consumers/?page=3&page_size=2"),
+            ]
+        )
+
+    def _get_updated_consumer_names(self, mock_do_single_request) -> list[str]:
+        return sorted(
+            call.args[2]["username"] for call in mock_do_single_request.await_args_list
+        )
+
+    @mock.patch.object(settings, "JWT_PUBLIC_KEY", "new key")
+    @mock.patch.object(ApisixClient, "_do_single_request", new_callable=mock.AsyncMock)
+    @mock.patch.object(ApisixClient, "iter_consumers")
+    async def test_update_consumers_jwt_config(
+        self, mock_iter_consumers, mock_do_single_request
+    ):
+        self.consumers[1].plugins = {
+            "jwt-auth": {
+                "key": "consumer_1",
+                "algorithm": "ES256",
+                "public_key": "new key",
+            }
+        }
+        mock_iter_consumers.side_effect = lambda: self._iter_consumers(self.consumers)
+
+        summary = await self.apisix_client.update_consumers_jwt_config(dry_run=True)
+        self.assertEqual(
+            summary,
+            ConsumersJwtConfigUpdateSummary(
+                dry_run=True,
+                total=5,
+                up_to_date=1,
+                updated=4,
+                last_consumer_name="consumer_4",
+            ),
+        )
+        mock_do_single_request.assert_not_awaited()
+
+        progress_callback = mock.MagicMock()
+        summary = await self.apisix_client.update_consumers_jwt_config(
+            max_concurrency=2, progress_callback=progress_callback
+        )
+        self.assertEqual(
+            summary,
+            ConsumersJwtConfigUpdateSummary(
+                dry_run=False,
+                total=5,
+                up_to_date=1,
+                updated=4,
+                last_consumer_name="consumer_4",
+            ),
+        )
+        self.assertEqual(
+            self._get_updated_consumer_names(mock_do_single_request),
+            ["consumer_0", "consumer_2", "consumer_3", "consumer_4"],
+        )
+        self.assertEqual(progress_callback.call_count, 5)
+        url, method, payload = mock_do_single_request.await_args_list[0].args
+        self.assertEqual((url, method), ("/apisix/admin/consumers/", "PUT"))
+        self.assertEqual(payload["plugins"]["jwt-auth"]["public_key"], "new key")
+
+        mock_do_single_request.reset_mock()
+        summary = await self.apisix_client.update_consumers_jwt_config(
+            resume_after="consumer_2"
+        )
+        self.assertEqual(summary.total, 2)
+        self.assertEqual(summary.last_consumer_name, "consumer_4")
+        self.assertEqual(
+            self._get_updated_consumer_names(mock_do_single_request),
+            ["consumer_3", "consumer_4"],
+        )
+
+        # Resume point was deleted, following consumers are updated
+        mock_do_single_request.reset_mock()
+        summary = await self.apisix_client.update_consumers_jwt_config(
+            resume_after="consumer_2_deleted"
+        )
+        self.assertEqual(summary.total, 2)
+        self.assertEqual(mock_do_single_request.await_count, 2)
+
+    @mock.patch.object(settings, "APISIX_JWT_CONFIG_UPDATE_BACKOFF_SECONDS", 0.001)
+    @mock.patch.object(settings, "APISIX_JWT_CONFIG_UPDATE_MAX_RETRIES", 2)
+    @mock.patch.object(ApisixClient, "_do_single_request", new_callable=mock.AsyncMock)
+    @mock.patch.object(ApisixClient, "iter_consumers")
+    async def test_update_consumers_jwt_config_errors(
+        self, mock_iter_consumers, mock_do_single_request
+    ):
+        mock_iter_consumers.side_effect = lambda: self._iter_consumers(
+            self.consumers[:3]
+        )
+
+        async def do_single_request(url: str, method: str, payload: dict):
+            consumer_name = payload["username"]
+            if (
+                consumer_name == "consumer_0"
+                and mock_do_single_request.await_count == 1
+            ):
+                raise ApiGatewayRequestError("Too many requests", status_code=429)
+            if consumer_name == "consumer_1":
+                raise ApiGatewayRequestError("Bad request", status_code=400)
+            return mock.MagicMock(ok=True)
+
+        mock_do_single_request.side_effect = do_single_request
+        summary = await self.apisix_client.update_consumers_jwt_config(
+            max_concurrency=1
+        )
+        # consumer_0 is retried, consumer_1 is not retried for a client error
+        self.assertEqual(mock_do_single_request.await_count, 4)
+        self.assertEqual(summary.updated, 2)
+        self.assertEqual(summary.failed, ["consumer_1"])
+        self.assertEqual(summary.last_consumer_name, "consumer_0")
+
+        # Unexpected errors are raised, without leaving the other workers waiting
+        mock_iter_consumers.side_effect = lambda: self._iter_consumers(self.consumers)
+        mock_do_single_request.side_effect = ValueError("Unexpected")
+        with self.assertRaisesRegex(ValueError, "Unexpected"):
+            await asyncio.wait_for(
+                self.apisix_client.update_consumers_jwt_config(max_concurrency=1), 1
+            )
+        self.assertEqual(asyncio.all_tasks(), {asyncio.current_task()})
+
+
+class TestApisixClientRetries(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.requests: list[str] = []
+        # Statuses returned by the next requests, then 200
+        self.statuses: list[int] = []
+
+        async def handler(request: web.Request) -> web.Response:
+            self.requests.append(request.method)
+            status = self.statuses.pop(0) if self.statuses else 200
+            if status == 0:
+                await asyncio.sleep(1)
+            return web.json_response(
+                {"value": {"username": "consumer"}}, status=status or 200
+            )
+
+        app = web.Application()
+        app.router.add_route("*", "/apisix/admin/{path:.*}", handler)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.circuit_breaker = CircuitBreaker(
+            "test_apisix", failure_threshold=3, recovery_seconds=60
+        )
+        self.apisix_client = ApisixClient(
+            str(self.server.make_url("/")),
+            request_timeout=0.2,
+            max_retries=2,
+            retry_backoff_seconds=0.001,
+            circuit_breaker=self.circuit_breaker,
+        )
+
+    async def asyncTearDown(self):
+        await self.apisix_client.close()
+        await self.server.close()
+
+    async def test_idempotent_requests_retried(self):
+        self.statuses = [503, 429]
+        self.assertTrue(await self.apisix_client.upsert_consumer("consumer"))
+        self.assertEqual(self.requests, ["PUT", "PUT", "PUT"])
+
+        self.requests.clear()
+        self.statuses = [502, 502, 502]
+        with self.assertRaises(ApiGatewayRequestError) as context:
+            await self.apisix_client.delete_consumer("consumer")
+        self.assertEqual(context.exception.status_code, 502)
+        self.assertEqual(self.requests, ["DELETE", "DELETE", "DELETE"])
+
+    async def test_not_retried(self):
+        # Client errors
+        self.statuses = [404]
+        with self.assertRaises(ApiGatewayRequestError):
+            await self.apisix_client.get_consumer("consumer")
+        self.assertEqual(self.requests, ["GET"])
+
+        # Not idempotent requests
+        self.requests.clear()
+        self.statuses = [503]
+        with self.assertRaises(ApiGatewayRequestError):
+            await self.apisix_client.update_consumer_group("group", "", {})
+        self.assertEqual(self.requests, ["PATCH"])
+
+        # Timeouts
+        self.requests.clear()
+        self.statuses = [0]
+        with self.assertRaises(ApiGatewayRequestError) as context:
+            await self.apisix_client.get_consumer("consumer")
+        self.assertIsNone(context.exception.status_code)
+        self.assertEqual(self.requests, ["GET"])
+
+    @mock.patch.object(settings, "APISIX_JWT_CONFIG_UPDATE_BACKOFF_SECONDS", 0.001)
+    @mock.patch.object(settings, "APISIX_JWT_CONFIG_UPDATE_MAX_RETRIES", 1)
+    async def test_jwt_config_update_not_retried_by_client(self):
+        consumer = Consumer(
+            name="consumer",
+            description=None,
+            labels=None,
+            plugins=None,
+            consumer_group_name=None,
+        )
+
+        async def iter_consumers(page_size=None):
+            yield consumer
+
+        # Only the adaptive backoff of the update retries, not the client retries
+        self.statuses = [503, 503]
+        with mock.patch.object(self.apisix_client, "iter_consumers", iter_consumers):
+            summary = await self.apisix_client.update_consumers_jwt_config()
+        self.assertEqual(summary.failed, ["consumer"])
+        self.assertEqual(self.requests, ["PUT", "PUT"])
+
+    async def test_circuit_breaker_open(self):
+        self.statuses = [500, 500, 500]
+        with self.assertRaises(ApiGatewayRequestError) as context:
+            await self.apisix_client.upsert_consumer("consumer")
+        self.assertNotIsInstance(context.exception, ApiGatewayUnavailable)
+
+        # Requests fail fast without being sent, and are not retried
+        with self.assertRaises(ApiGatewayUnavailable) as unavailable_context:
+            await self.apisix_client.upsert_consumer("consumer")
+        self.assertGreater(unavailable_context.exception.retry_after_seconds, 59)
+        self.assertEqual(len(self.requests), 3)
@@ -0,0 +1,46 @@
+import unittest
+from unittest import mock
+
+from ....datasources.cache.memory import TTLLRUCache
+
+
+class TestTTLLRUCache(unittest.TestCase):
+
+    def test_get_and_set(self):
+        cache: TTLLRUCache[str, int] = TTLLRUCache("test", max_size=10)
+        self.assertIsNone(cache.get("a"))
+        cache.set("a", 1, ttl_seconds=60)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(len(cache), 1)
+
+        cache.delete("a")
+        self.assertIsNone(cache.get("a"))
+
+        cache.set("b", 2, ttl_seconds=0)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(len(cache), 0)
+
+    def test_expiration(self):
+        cache: TTLLRUCache[str, int] = TTLLRUCache("test", max_size=10)
+        with mock.patch("time.monotonic", return_value=100.0):
+            cache.set("a", 1, ttl_seconds=10)
+            self.assertEqual(cache.get("a"), 1)
+        with mock.patch("time.monotonic", return_value=110.0):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_lru_eviction(self):
+        cache: TTLLRUCache[str, int] = TTLLRUCache("test", max_size=2)
+        cache.set("a", 1, ttl_seconds=60)
+        cache.set("b", 2, ttl_seconds=60)
+        self.assertEqual(cache.get("a"), 1)  # `b` is now the least recently used
+        cache.set("c", 3, ttl_seconds=60)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_disabled(self):
+        cache: TTLLRUCache[str, int] = TTLLRUCache("test", max_size=0)
+        cache.set("a", 1, ttl_seconds=60)
+        self.assertIsNone(cache.get("a"))
@@ -0,0 +1,201 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from pydantic import BaseModel
+
+from redis.exceptions import ConnectionError
+
+from ....datasources.cache.redis import get_redis
+from ....datasources.cache.two_tier_cache import INVALIDATED_PREFIX, TwoTierCache
+
+
+class ExampleModel(BaseModel):
+    name: str
+
+
+class TestTwoTierCache(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        get_redis.cache_clear()
+        await get_redis().flushall()
+        self.cache = TwoTierCache(
+            "test",
+            ExampleModel,
+            local_max_size=10,
+            local_ttl_seconds=60,
+            ttl_seconds=60,
+            negative_ttl_seconds=60,
+        )
+
+    async def asyncTearDown(self):
+        await get_redis().flushall()
+        await get_redis().aclose()
+        get_redis.cache_clear()
+
+    async def test_get_and_set(self):
+        self.assertEqual(await self.cache.get("a"), (False, None))
+
+        value = ExampleModel(name="a")
+        await self.cache.set(["a", "b"], value)
+        for key in ("a", "b"):
+            cached, cached_value = await self.cache.get(key)
+            self.assertTrue(cached)
+            self.assertEqual(cached_value, value)
+            self.assertIsNot(cached_value, value)
+
+        # Value is read from Redis when not present in the in-process tier
+        self.cache.local_cache.clear()
+        self.assertEqual(await self.cache.get("a"), (True, value))
+        self.assertEqual(len(self.cache.local_cache), 1)
+
+        await self.cache.delete(["a", "b"])
+        self.assertEqual(await self.cache.get("a"), (False, None))
+        self.assertEqual(await self.cache.get("b"), (False, None))
+
+    async def test_set_missing(self):
+        await self.cache.set_missing("a")
+        self.assertEqual(await self.cache.get("a"), (True, None))
+        self.assertEqual(len(self.cache.local_cache), 0)
+
+        await self.cache.delete(["a"])
+        self.assertEqual(await self.cache.get("a"), (False, None))
+
+        # Key found missing before it was created and invalidated is not stored
+        await self.cache.set_missing("a")
+        self.assertEqual(await self.cache.get("a"), (False, None))
+
+        # Created keys are stored over the tombstone
+        await self.cache.set(["a"], ExampleModel(name="a"))
+        self.cache.local_cache.clear()
+        self.assertEqual(await self.cache.get("a"), (True, ExampleModel(name="a")))
+
+    async def test_get_or_load(self):
+        loader = mock.AsyncMock(return_value=ExampleModel(name="a"))
+        self.assertEqual(
+            await self.cache.get_or_load("a", loader), ExampleModel(name="a")
+        )
+        self.assertEqual(
+            await self.cache.get_or_load("a", loader), ExampleModel(name="a")
+        )
+        loader.assert_awaited_once()
+
+    async def test_get_or_load_several_keys_and_missing(self):
+        loader = mock.AsyncMock(return_value=ExampleModel(name="a"))
+        self.assertEqual(
+            await self.cache.get_or_load("a", loader, lambda value: ["a", "b"]),
+            ExampleModel(name="a"),
+        )
+        self.cache.local_cache.clear()
+        self.assertEqual(await self.cache.get("b"), (True, ExampleModel(name="a")))
+
+        missing_loader = mock.AsyncMock(return_value=None)
+        self.assertIsNone(await self.cache.get_or_load("c", missing_loader))
+        self.assertIsNone(await self.cache.get_or_load("c", missing_loader))
+        missing_loader.assert_awaited_once()
+
+    async def test_get_or_load_invalidated_while_loading(self):
+        async def load_and_update() -> ExampleModel:
+            # Value is updated and invalidated after it was read
+            await self.cache.delete(["a", "b"])
+            return ExampleModel(name="old")
+
+        self.assertEqual(
+            await self.cache.get_or_load(
+                "a", load_and_update, lambda value: ["a", "b"]
+            ),
+            ExampleModel(name="old"),
+        )
+        self.assertEqual(await self.cache.get("a"), (False, None))
+        self.assertEqual(await self.cache.get("b"), (False, None))
+
+        # Loaded after the invalidation, so it's stored over the tombstone
+        loader = mock.AsyncMock(return_value=ExampleModel(name="new"))
+        await self.cache.get_or_load("a", loader, lambda value: ["a", "b"])
+        self.cache.local_cache.clear()
+        self.assertEqual(await self.cache.get("b"), (True, ExampleModel(name="new")))
+
+    async def test_get_or_load_stale(self):
+        self.cache.stale_ttl_seconds = 60
+        await self.cache.set(["a"], ExampleModel(name="a"))
+        self.cache.local_cache.clear()
+
+        # Fresh for `ttl_seconds`
+        loader = mock.AsyncMock(return_value=ExampleModel(name="b"))
+        self.assertEqual(
+            await self.cache.get_or_load("a", loader), ExampleModel(name="a")
+        )
+        loader.assert_not_awaited()
+        self.cache.local_cache.clear()
+
+        # Stale value is served and refreshed in the background
+        await get_redis().expire(self.cache._get_redis_key("a"), 30)
+        self.assertEqual(
+            await self.cache.get_or_load("a", loader), ExampleModel(name="a")
+        )
+        await asyncio.gather(*self.cache._refresh_tasks.values())
+        loader.assert_awaited_once()
+        self.assertEqual(await self.cache.get("a"), (True, ExampleModel(name="b")))
+
+    async def test_get_or_load_stale_invalidated_while_refreshing(self):
+        def build_cache() -> TwoTierCache:
+            return TwoTierCache(
+                "test",
+                ExampleModel,
+                local_max_size=10,
+                local_ttl_seconds=60,
+                ttl_seconds=60,
+                negative_ttl_seconds=0,
+                stale_ttl_seconds=60,
+            )
+
+        cache = build_cache()
+        await cache.set(["a"], ExampleModel(name="old"))
+        cache.local_cache.clear()
+        await get_redis().expire(cache._get_redis_key("a"), 30)
+
+        refreshing = asyncio.Event()
+        invalidated = asyncio.Event()
+
+        async def load_before_update() -> ExampleModel:
+            value = ExampleModel(name="old")
+            refreshing.set()
+            await invalidated.wait()
+            return value
+
+        self.assertEqual(
+            await cache.get_or_load("a", load_before_update), ExampleModel(name="old")
+        )
+        await refreshing.wait()
+        # Value is updated and invalidated by another process while it's refreshed
+        await build_cache().delete(["a"])
+        invalidated.set()
+        await asyncio.gather(*cache._refresh_tasks.values())
+
+        # Value refreshed before the update is not stored
+        self.assertEqual(await cache.get("a"), (False, None))
+        loader = mock.AsyncMock(return_value=ExampleModel(name="new"))
+        self.assertEqual(await cache.get_or_load("a", loader), ExampleModel(name="new"))
+        cache.local_cache.clear()
+        self.assertEqual(await cache.get("a"), (True, ExampleModel(name="new")))
+
+    async def test_get_or_load_without_negative_caching_invalidated(self):
+        self.cache.negative_ttl_seconds = 0
+
+        async def load_and_update() -> ExampleModel:
+            # Value is updated and invalidated after it was read
+            await self.cache.delete(["a"])
+            return ExampleModel(name="old")
+
+        await self.cache.get_or_load("a", load_and_update)
+        self.assertEqual(await self.cache.get("a"), (False, None))
+        self.assertTrue(
+            (await get_redis().get(self.cache._get_redis_key("a"))).startswith(
+                INVALIDATED_PREFIX
+            )
+        )
+
+    async def test_redis_errors(self):
+        with mock.patch.object(
+            get_redis(), "get", side_effect=ConnectionError("Redis is down")
+        ):
+            self.assertEqual(await self.cache.get("a"), (False, None))
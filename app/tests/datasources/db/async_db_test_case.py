@@ -2,7 +2,10 @@ import unittest
 
 from sqlmodel import SQLModel
 
+from app.datasources.cache.redis import get_redis
 from app.datasources.db.connector import get_engine
+from app.datasources.db.models import get_user_cache
+from app.services.webhook_service import get_webhook_cache
 
 
 class AsyncDbTestCase(unittest.IsolatedAsyncioTestCase):
@@ -12,3 +15,13 @@ class AsyncDbTestCase(unittest.IsolatedAsyncioTestCase):
         async with self.engine.begin() as conn:
             await conn.run_sync(SQLModel.metadata.drop_all)
             await conn.run_sync(SQLModel.metadata.create_all)
+        # Redis connections are bound to the event loop of every test
+        get_redis.cache_clear()
+        await get_redis().flushall()
+        get_user_cache.cache_clear()
+        get_webhook_cache.cache_clear()
+
+    async def asyncTearDown(self):
+        await get_redis().flushall()
+        await get_redis().aclose()
+        get_redis.cache_clear()
@@ -19,7 +19,7 @@ async def generate_random_user() -> Tuple[User, passwordType]:
     password = passwordType(fake.password(length=8))
     user_service = UserService()
     user = await User(
-        email=fake.email(), hashed_password=user_service.hash_password(password)
+        email=fake.email(), hashed_password=await user_service.hash_password(password)
     ).create()
     return user, password
 
@@ -0,0 +1,45 @@
+import asyncio
+import unittest
+
+from app.datasources.db.connector import (
+    DatabaseSessionNotAllowed,
+    _get_database_session_context,
+    disable_database_session,
+    get_database_session_id,
+    set_database_session_context,
+)
+
+
+class TestConnector(unittest.IsolatedAsyncioTestCase):
+    async def test_set_database_session_context(self):
+        self.assertIsNone(get_database_session_id())
+        with self.assertRaises(LookupError):
+            _get_database_session_context()
+
+        with set_database_session_context() as scope:
+            # Session id is only generated on the first use
+            self.assertIsNone(get_database_session_id())
+            session_id = _get_database_session_context()
+            self.assertEqual(get_database_session_id(), session_id)
+            self.assertEqual(scope.session_id, session_id)
+            self.assertEqual(_get_database_session_context(), session_id)
+
+        self.assertIsNone(get_database_session_id())
+
+        with set_database_session_context("custom-session-id"):
+            self.assertEqual(get_database_session_id(), "custom-session-id")
+
+    async def test_session_id_shared_with_child_tasks(self):
+        async def get_session_id() -> str:
+            return _get_database_session_context()
+
+        with set_database_session_context():
+            session_id = await asyncio.create_task(get_session_id())
+            self.assertEqual(get_database_session_id(), session_id)
+
+    async def test_disable_database_session(self):
+        with set_database_session_context() as scope:
+            await disable_database_session()
+            with self.assertRaises(DatabaseSessionNotAllowed):
+                _get_database_session_context()
+            self.assertIsNone(scope.session_id)
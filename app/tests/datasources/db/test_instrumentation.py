@@ -0,0 +1,89 @@
+import unittest
+from unittest import mock
+
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+from sqlalchemy.util import greenlet_spawn
+
+from app.datasources.db.instrumentation import (
+    InstrumentedAsyncAdaptedQueuePool,
+    get_statement_fingerprint,
+    instrument_engine,
+)
+
+
+class TestInstrumentation(unittest.IsolatedAsyncioTestCase):
+    def test_get_statement_fingerprint(self):
+        self.assertEqual(
+            get_statement_fingerprint(
+                'SELECT "user".id \nFROM "user" \nWHERE "user".id = $1::UUID'
+            ),
+            'SELECT "user".id FROM "user" WHERE "user".id = $?::UUID',
+        )
+        self.assertEqual(
+            get_statement_fingerprint(
+                "SELECT apikey.id FROM apikey WHERE apikey.id IN ($1::UUID, $2::UUID, $3::UUID) LIMIT 10"
+            ),
+            "SELECT apikey.id FROM apikey WHERE apikey.id IN (...) LIMIT ?",
+        )
+        self.assertEqual(
+            get_statement_fingerprint("SELECT * FROM anon_1 WHERE name = 'it''s'"),
+            "SELECT * FROM anon_1 WHERE name = ?",
+        )
+
+    def test_instrument_engine(self):
+        engine = create_engine("sqlite://")
+        instrument_engine(engine, slow_query_seconds=1e-9)
+        labels = {"fingerprint": "SELECT ?"}
+        count = (
+            REGISTRY.get_sample_value("db_statement_duration_seconds_count", labels)
+            or 0
+        )
+
+        with self.assertLogs(
+            "app.datasources.db.instrumentation", level="WARNING"
+        ) as logs:
+            with engine.connect() as connection:
+                self.assertEqual(connection.execute(text("SELECT 1")).scalar(), 1)
+                with self.assertRaises(Exception):
+                    connection.execute(text("SELECT * FROM not_existing"))
+                self.assertEqual(connection.info["query_start_time"], [])
+
+        self.assertEqual(
+            REGISTRY.get_sample_value("db_statement_duration_seconds_count", labels),
+            count + 1,
+        )
+        self.assertIn("Slow query took", logs.output[0])
+        self.assertIn("SELECT ?", logs.output[0])
+
+    async def test_instrumented_pool(self):
+        pool = InstrumentedAsyncAdaptedQueuePool(
+            mock.MagicMock, pool_size=1, max_overflow=1
+        )
+        count = REGISTRY.get_sample_value("db_pool_checkout_wait_seconds_count") or 0
+
+        first_connection = await greenlet_spawn(pool.connect)
+        second_connection = await greenlet_spawn(pool.connect)
+        self.assertEqual(
+            REGISTRY.get_sample_value("db_pool_connections", {"state": "checked_out"}),
+            2,
+        )
+        self.assertEqual(
+            REGISTRY.get_sample_value("db_pool_connections", {"state": "overflow"}),
+            1,
+        )
+
+        await greenlet_spawn(second_connection.close)
+        await greenlet_spawn(first_connection.close)
+        self.assertEqual(
+            REGISTRY.get_sample_value("db_pool_connections", {"state": "checked_out"}),
+            0,
+        )
+        self.assertEqual(
+            REGISTRY.get_sample_value("db_pool_connections", {"state": "idle"}), 1
+        )
+        self.assertEqual(
+            REGISTRY.get_sample_value("db_pool_checkout_wait_seconds_count"),
+            count + 2,
+        )
+        await greenlet_spawn(pool.dispose)
@@ -1,9 +1,10 @@
 import uuid
+from unittest import mock
 
 import faker
 
-from app.datasources.db.connector import db_session_context
-from app.datasources.db.models import ApiKey, User, Webhook
+from app.datasources.db.connector import db_session, db_session_context
+from app.datasources.db.models import ApiKey, User, Webhook, get_user_cache
 
 from .async_db_test_case import AsyncDbTestCase
 from .factory import (
@@ -40,6 +41,60 @@ class TestModel(AsyncDbTestCase):
         user = await User.get_by_user_id(user.id)
         self.assertEqual(user.hashed_password, new_password)
 
+    @db_session_context
+    async def test_user_cache(self):
+        email = fake.email()
+        self.assertIsNone(await User.get_by_email(email))
+        self.assertEqual(
+            await get_user_cache().get(User._get_email_cache_key(email)), (True, None)
+        )
+
+        # Creating the user removes the negative cache entry
+        user = await User(email=email, hashed_password=fake.password()).create()
+        self.assertEqual(
+            await get_user_cache().get(User._get_email_cache_key(email)),
+            (False, None),
+        )
+
+        # Both keys are cached when the user is found
+        self.assertEqual(await User.get_by_email(email), user)
+        for cache_key in user._get_cache_keys():
+            cached, cached_user = await get_user_cache().get(cache_key)
+            self.assertTrue(cached)
+            self.assertEqual(cached_user, user)
+            self.assertIsNot(cached_user, user)
+
+        # Database is not queried for cached users
+        with mock.patch.object(db_session, "execute") as execute_mock:
+            self.assertEqual(await User.get_by_user_id(user.id), user)
+            self.assertEqual(await User.get_by_email(email), user)
+            execute_mock.assert_not_called()
+
+    @db_session_context
+    async def test_user_cache_update_password_while_reading(self):
+        user, _ = await generate_random_user()
+        new_password = fake.password()
+        execute = db_session.execute
+
+        async def execute_and_update_password(*args, **kwargs):
+            # Password is updated after the user was read, before caching it
+            result = await execute(*args, **kwargs)
+            with mock.patch.object(db_session, "execute", execute):
+                await User.update_password(user.id, new_password)
+            return result
+
+        with mock.patch.object(
+            db_session, "execute", side_effect=execute_and_update_password
+        ):
+            self.assertIsNotNone(await User.get_by_user_id(user.id))
+
+        # User read before the update is not cached
+        for cache_key in user._get_cache_keys():
+            self.assertEqual(await get_user_cache().get(cache_key), (False, None))
+        read_user = await User.get_by_email(user.email)
+        assert read_user is not None
+        self.assertEqual(read_user.hashed_password, new_password)
+
     @db_session_context
     async def test_api_key(self):
         user, _ = await generate_random_user()
@@ -95,6 +150,19 @@ class TestModel(AsyncDbTestCase):
         self.assertEqual(len(result), len(api_keys))
         self.assertEqual(result, api_keys)
 
+    @db_session_context
+    async def test_count_api_keys_by_user(self):
+        user, _ = await generate_random_user()
+        other_user, _ = await generate_random_user()
+        self.assertEqual(await ApiKey.count_by_user(user.id), 0)
+
+        for _ in range(3):
+            await generate_random_api_key(user.id)
+        await generate_random_api_key(other_user.id)
+
+        self.assertEqual(await ApiKey.count_by_user(user.id), 3)
+        self.assertEqual(await ApiKey.count_by_user(other_user.id), 1)
+
     @db_session_context
     async def test_webhook(self):
         user, _ = await generate_random_user()
@@ -149,3 +217,22 @@ class TestModel(AsyncDbTestCase):
         result = await Webhook.get_webhooks_by_user(user.id)
         self.assertEqual(len(result), len(webhooks))
         self.assertEqual(result, webhooks)
+
+    @db_session_context
+    async def test_count_webhooks_by_user(self):
+        user, _ = await generate_random_user()
+        other_user, _ = await generate_random_user()
+        self.assertEqual(await Webhook.count_by_user(user.id), 0)
+
+        for _ in range(3):
+            await generate_random_webhook(user.id)
+        await generate_random_webhook(other_user.id)
+
+        self.assertEqual(await Webhook.count_by_user(user.id), 3)
+        self.assertEqual(await Webhook.count_by_user(other_user.id), 1)
+
+    @db_session_context
+    async def test_lock_by_user_id(self):
+        user, _ = await generate_random_user()
+        self.assertTrue(await User.lock_by_user_id(user.id))
+        self.assertFalse(await User.lock_by_user_id(uuid.uuid4()))
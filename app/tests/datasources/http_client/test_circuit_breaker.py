@@ -0,0 +1,88 @@
+from unittest import TestCase, mock
+
+from prometheus_client import REGISTRY
+
+from ....datasources.http_client.circuit_breaker import (
+    CircuitBreaker,
+    CircuitBreakerOpen,
+    CircuitBreakerState,
+)
+
+
+@mock.patch("app.datasources.http_client.circuit_breaker.time.monotonic")
+class TestCircuitBreaker(TestCase):
+    def setUp(self):
+        self.circuit_breaker = CircuitBreaker(
+            "test_breaker", failure_threshold=3, recovery_seconds=10
+        )
+
+    def record_failures(self, times: int = 1) -> None:
+        for _ in range(times):
+            is_probe = self.circuit_breaker.before_request()
+            self.circuit_breaker.after_request(is_probe, False)
+
+    def test_open_after_consecutive_failures(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        rejected = (
+            REGISTRY.get_sample_value(
+                "circuit_breaker_rejected_requests_total",
+                {"upstream": "test_breaker"},
+            )
+            or 0
+        )
+        self.record_failures(2)
+        # A success resets the consecutive failures
+        self.circuit_breaker.after_request(self.circuit_breaker.before_request(), True)
+        self.record_failures(2)
+        self.assertEqual(self.circuit_breaker.state, CircuitBreakerState.CLOSED)
+
+        self.record_failures()
+        self.assertEqual(self.circuit_breaker.state, CircuitBreakerState.OPEN)
+        self.assertEqual(
+            REGISTRY.get_sample_value(
+                "circuit_breaker_state", {"upstream": "test_breaker"}
+            ),
+            CircuitBreakerState.OPEN,
+        )
+        mock_monotonic.return_value = 104
+        with self.assertRaisesRegex(CircuitBreakerOpen, "retry after 6.0 seconds"):
+            self.circuit_breaker.before_request()
+        self.assertEqual(
+            REGISTRY.get_sample_value(
+                "circuit_breaker_rejected_requests_total",
+                {"upstream": "test_breaker"},
+            ),
+            rejected + 1,
+        )
+
+    def test_half_open(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        self.record_failures(3)
+
+        mock_monotonic.return_value = 110
+        self.assertTrue(self.circuit_breaker.before_request())
+        self.assertEqual(self.circuit_breaker.state, CircuitBreakerState.HALF_OPEN)
+        # Only one probe at once
+        with self.assertRaises(CircuitBreakerOpen):
+            self.circuit_breaker.before_request()
+        # A failed probe opens the breaker again
+        self.circuit_breaker.after_request(True, False)
+        self.assertEqual(self.circuit_breaker.state, CircuitBreakerState.OPEN)
+        with self.assertRaises(CircuitBreakerOpen):
+            self.circuit_breaker.before_request()
+
+        mock_monotonic.return_value = 120
+        self.assertTrue(self.circuit_breaker.before_request())
+        # A cancelled probe lets another probe be sent
+        self.circuit_breaker.after_request(True, None)
+        self.assertTrue(self.circuit_breaker.before_request())
+        self.circuit_breaker.after_request(True, True)
+        self.assertEqual(self.circuit_breaker.state, CircuitBreakerState.CLOSED)
+        self.assertFalse(self.circuit_breaker.before_request())
+
+    def test_requests_sent_before_opening(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        is_probe = self.circuit_breaker.before_request()
+        self.record_failures(3)
+        self.circuit_breaker.after_request(is_probe, True)
+        self.assertEqual(self.circuit_breaker.state, CircuitBreakerState.OPEN)
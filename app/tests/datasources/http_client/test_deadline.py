@@ -0,0 +1,29 @@
+from unittest import TestCase, mock
+
+from ....datasources.http_client.deadline import (
+    get_remaining_seconds,
+    set_request_deadline,
+)
+
+
+@mock.patch("app.datasources.http_client.deadline.time.monotonic", return_value=100)
+class TestDeadline(TestCase):
+    def test_set_request_deadline(self, mock_monotonic):
+        self.assertIsNone(get_remaining_seconds())
+        with set_request_deadline(10):
+            self.assertEqual(get_remaining_seconds(), 10)
+            mock_monotonic.return_value = 104
+            self.assertEqual(get_remaining_seconds(), 6)
+            # Earlier deadline of the outer context is kept
+            with set_request_deadline(20):
+                self.assertEqual(get_remaining_seconds(), 6)
+            with set_request_deadline(2):
+                self.assertEqual(get_remaining_seconds(), 2)
+            with set_request_deadline(0):
+                self.assertEqual(get_remaining_seconds(), 6)
+            self.assertEqual(get_remaining_seconds(), 6)
+        self.assertIsNone(get_remaining_seconds())
+
+    def test_set_request_deadline_disabled(self, mock_monotonic):
+        with set_request_deadline(0):
+            self.assertIsNone(get_remaining_seconds())
@@ -0,0 +1,130 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from prometheus_client import REGISTRY
+
+from ....datasources.http_client.hedging import HedgingPolicy
+
+
+class TestHedgingPolicy(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.hedging_policy = HedgingPolicy(
+            "test_hedging", min_delay_seconds=0.01, min_samples=20
+        )
+        self.requests = 0
+
+    def get_hedged_requests(self, winner: str) -> float:
+        return (
+            REGISTRY.get_sample_value(
+                "http_client_hedged_requests_total",
+                {"upstream": "test_hedging", "winner": winner},
+            )
+            or 0
+        )
+
+    def observe_latencies(self, latency_seconds: float = 0.02) -> None:
+        for _ in range(20):
+            self.hedging_policy.observe(latency_seconds)
+
+    async def request(self, delays: list[float], error: Exception | None = None):
+        """
+        Every call waits the next delay, and raises `error` if provided.
+        """
+        delay = delays[self.requests]
+        self.requests += 1
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return delay
+
+    def test_get_delay(self):
+        self.assertIsNone(self.hedging_policy.get_delay())
+        for latency_ms in range(1, 101):
+            self.hedging_policy.observe(latency_ms / 1000)
+        delay = self.hedging_policy.get_delay()
+        assert delay is not None
+        self.assertAlmostEqual(delay, 0.096, places=3)
+
+        hedging_policy = HedgingPolicy("test_hedging", min_delay_seconds=0.05)
+        for _ in range(20):
+            hedging_policy.observe(0.001)
+        self.assertEqual(hedging_policy.get_delay(), 0.05)
+
+    async def test_run_without_samples(self):
+        self.assertEqual(
+            await self.hedging_policy.run(lambda: self.request([0.1])), 0.1
+        )
+        self.assertEqual(self.requests, 1)
+        self.assertEqual(len(self.hedging_policy.latencies), 1)
+
+    async def test_run_hedged(self):
+        self.observe_latencies()
+        hedge_wins = self.get_hedged_requests("hedge")
+        primary_wins = self.get_hedged_requests("primary")
+
+        # Fast request is not hedged
+        self.assertEqual(
+            await self.hedging_policy.run(lambda: self.request([0.001])), 0.001
+        )
+        self.assertEqual(self.requests, 1)
+
+        # Slow request is hedged, and the hedge answers first
+        self.requests = 0
+        self.assertEqual(
+            await self.hedging_policy.run(lambda: self.request([1, 0.001])), 0.001
+        )
+        self.assertEqual(self.requests, 2)
+        self.assertEqual(self.get_hedged_requests("hedge"), hedge_wins + 1)
+
+        # Slow request is hedged, but it answers first
+        self.requests = 0
+        self.assertEqual(
+            await self.hedging_policy.run(lambda: self.request([0.05, 1])), 0.05
+        )
+        self.assertEqual(self.requests, 2)
+        self.assertEqual(self.get_hedged_requests("primary"), primary_wins + 1)
+
+    async def test_run_slow_tail_keeps_delay(self):
+        hedging_policy = HedgingPolicy(
+            "test_hedging", min_delay_seconds=0.001, min_samples=20, max_samples=20
+        )
+        for _ in range(20):
+            hedging_policy.observe(0.02)
+
+        # Hedges answering first don't drift the delay down, the cancelled requests
+        # are measured until they are cancelled
+        for _ in range(20):
+            self.requests = 0
+            self.assertEqual(
+                await hedging_policy.run(lambda: self.request([1, 0.001])), 0.001
+            )
+        delay = hedging_policy.get_delay()
+        assert delay is not None
+        self.assertGreaterEqual(delay, 0.02)
+
+    async def test_run_errors(self):
+        self.observe_latencies()
+
+        # Failing before the hedge delay is not hedged
+        with self.assertRaisesRegex(ValueError, "Failed"):
+            await self.hedging_policy.run(
+                lambda: self.request([0.001], error=ValueError("Failed"))
+            )
+        self.assertEqual(self.requests, 1)
+
+        # Failing after the hedge is sent waits for the hedge
+        self.requests = 0
+        attempts = iter([ValueError("Failed"), None])
+        result = await self.hedging_policy.run(
+            lambda: self.request([0.05, 0.1], error=next(attempts))
+        )
+        self.assertEqual(result, 0.1)
+
+        # Every request failing
+        self.requests = 0
+        none_wins = self.get_hedged_requests("none")
+        with self.assertRaisesRegex(ValueError, "Failed"):
+            await self.hedging_policy.run(
+                lambda: self.request([0.05, 0.06], error=ValueError("Failed"))
+            )
+        self.assertEqual(self.get_hedged_requests("none"), none_wins + 1)
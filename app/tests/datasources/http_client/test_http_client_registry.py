@@ -0,0 +1,88 @@
+import asyncio
+import time
+from unittest import IsolatedAsyncioTestCase, mock
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from ....config import settings
+from ....datasources.api_gateway.apisix.apisix_client import get_apisix_client
+from ....datasources.http_client.http_client_registry import (
+    close_http_clients,
+    start_http_clients,
+)
+from ....datasources.metrics.prometheus.prometheus_client import (
+    get_prometheus_client,
+)
+
+
+class TestHttpClientRegistry(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.requests = 0
+        self.delay_seconds = 0.0
+
+        async def root(request: web.Request) -> web.Response:
+            self.requests += 1
+            await asyncio.sleep(self.delay_seconds)
+            return web.Response()
+
+        app = web.Application()
+        app.router.add_route("*", "/", root)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        get_apisix_client.cache_clear()
+        get_prometheus_client.cache_clear()
+
+    async def asyncTearDown(self):
+        await close_http_clients()
+        await self.server.close()
+
+    async def test_start_and_close_http_clients(self):
+        with (
+            mock.patch.object(
+                settings, "APISIX_BASE_URL", str(self.server.make_url("/"))
+            ),
+            mock.patch.object(settings, "PROMETHEUS_BASE_URL", ""),
+        ):
+            await start_http_clients(warmup_connections=2)
+
+            self.assertEqual(self.requests, 2)
+            # Clients of services not configured are not created
+            self.assertEqual(get_prometheus_client.cache_info().currsize, 0)
+            apisix_client = get_apisix_client()
+            session = apisix_client.async_session
+            self.assertFalse(session.closed)
+
+            await close_http_clients()
+
+            self.assertTrue(session.closed)
+            self.assertEqual(get_apisix_client.cache_info().currsize, 0)
+            self.assertIsNot(get_apisix_client(), apisix_client)
+
+    async def test_start_http_clients_without_warmup(self):
+        with mock.patch.object(
+            settings, "APISIX_BASE_URL", str(self.server.make_url("/"))
+        ):
+            await start_http_clients(warmup_connections=0)
+
+        self.assertEqual(self.requests, 0)
+        self.assertEqual(get_apisix_client.cache_info().currsize, 1)
+
+    async def test_start_http_clients_slow_service(self):
+        self.delay_seconds = 1
+        with (
+            mock.patch.object(
+                settings, "APISIX_BASE_URL", str(self.server.make_url("/"))
+            ),
+            mock.patch.object(settings, "PROMETHEUS_BASE_URL", ""),
+        ):
+            start = time.monotonic()
+            with self.assertLogs(level="WARNING") as logs:
+                await start_http_clients(
+                    warmup_connections=2, warmup_timeout_seconds=0.1
+                )
+
+        # Startup is not delayed by the request timeout of the service
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(self.requests, 2)
+        self.assertIn("Cannot warm up 2 connections to apisix", logs.output[0])
@@ -0,0 +1,210 @@
+import asyncio
+import time
+from unittest import IsolatedAsyncioTestCase
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from prometheus_client import REGISTRY
+
+from ....datasources.http_client.circuit_breaker import CircuitBreaker
+from ....datasources.http_client.deadline import set_request_deadline
+from ....datasources.http_client.instrumented_http_client import (
+    InstrumentedHttpClient,
+    get_status_class,
+)
+
+
+class ResourcesClient(InstrumentedHttpClient):
+    resource_collections = frozenset({"resources"})
+
+
+class TestInstrumentedHttpClient(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        async def get_resource(request: web.Request) -> web.Response:
+            if request.match_info["resource_id"] == "slow":
+                await asyncio.sleep(1)
+            if request.match_info["resource_id"] == "missing":
+                raise web.HTTPNotFound()
+            return web.json_response({"id": request.match_info["resource_id"]})
+
+        app = web.Application()
+        app.router.add_get("/resources/{resource_id}", get_resource)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.client = ResourcesClient(
+            "test_upstream", str(self.server.make_url("/")), request_timeout=0.2
+        )
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.server.close()
+
+    def get_sample_value(self, name: str, **labels: str) -> float:
+        return REGISTRY.get_sample_value(name, labels) or 0.0
+
+    def test_get_status_class(self):
+        self.assertEqual(get_status_class(200), "2xx")
+        self.assertEqual(get_status_class(404), "4xx")
+        self.assertEqual(get_status_class(503), "5xx")
+
+    def test_get_endpoint_template(self):
+        self.assertEqual(
+            self.client.get_endpoint_template("/resources/abc?page=2"),
+            "/resources/{id}",
+        )
+        self.assertEqual(
+            self.client.get_endpoint_template("/resources/"), "/resources/"
+        )
+        self.assertEqual(
+            self.client.get_endpoint_template("api/v1/query?query=up"), "api/v1/query"
+        )
+
+    async def test_send_request(self):
+        request_labels = {
+            "upstream": "test_upstream",
+            "method": "GET",
+            "endpoint": "/resources/{id}",
+        }
+        ok_count = self.get_sample_value(
+            "http_client_request_duration_seconds_count",
+            status_class="2xx",
+            **request_labels,
+        )
+        not_found_count = self.get_sample_value(
+            "http_client_request_duration_seconds_count",
+            status_class="4xx",
+            **request_labels,
+        )
+        timeout_count = self.get_sample_value(
+            "http_client_request_duration_seconds_count",
+            status_class="timeout",
+            **request_labels,
+        )
+        new_connections = self.get_sample_value(
+            "http_client_connections_total", upstream="test_upstream", reused="false"
+        )
+        reused_connections = self.get_sample_value(
+            "http_client_connections_total", upstream="test_upstream", reused="true"
+        )
+        connect_count = self.get_sample_value(
+            "http_client_connection_phase_duration_seconds_count",
+            upstream="test_upstream",
+            phase="connect",
+        )
+
+        for resource_id in ("first", "second"):
+            response = await self.client._send_request(
+                "GET", f"/resources/{resource_id}"
+            )
+            self.assertEqual(await response.json(), {"id": resource_id})
+        response = await self.client._send_request("GET", "/resources/missing")
+        self.assertEqual(response.status, 404)
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.client._send_request("GET", "/resources/slow")
+
+        self.assertEqual(
+            self.get_sample_value(
+                "http_client_request_duration_seconds_count",
+                status_class="2xx",
+                **request_labels,
+            ),
+            ok_count + 2,
+        )
+        self.assertEqual(
+            self.get_sample_value(
+                "http_client_request_duration_seconds_count",
+                status_class="4xx",
+                **request_labels,
+            ),
+            not_found_count + 1,
+        )
+        self.assertEqual(
+            self.get_sample_value(
+                "http_client_request_duration_seconds_count",
+                status_class="timeout",
+                **request_labels,
+            ),
+            timeout_count + 1,
+        )
+        # Keep-alive connection is reused after the first request
+        self.assertGreater(
+            self.get_sample_value(
+                "http_client_connections_total",
+                upstream="test_upstream",
+                reused="false",
+            ),
+            new_connections,
+        )
+        self.assertGreater(
+            self.get_sample_value(
+                "http_client_connections_total",
+                upstream="test_upstream",
+                reused="true",
+            ),
+            reused_connections,
+        )
+        self.assertGreater(
+            self.get_sample_value(
+                "http_client_connection_phase_duration_seconds_count",
+                upstream="test_upstream",
+                phase="connect",
+            ),
+            connect_count,
+        )
+
+    async def test_send_request_deadline(self):
+        circuit_breaker = CircuitBreaker("test_upstream", failure_threshold=1)
+        self.client.circuit_breaker = circuit_breaker
+        with set_request_deadline(0.05):
+            start = time.monotonic()
+            with self.assertRaises(asyncio.TimeoutError):
+                await self.client._send_request("GET", "/resources/slow")
+            # Timeout is shortened to the time left to answer the incoming request
+            self.assertLess(time.monotonic() - start, 0.2)
+            # Timeouts caused by the deadline don't open the breaker
+            self.assertEqual(circuit_breaker.consecutive_failures, 0)
+
+            await asyncio.sleep(0.05)
+            with self.assertRaisesRegex(asyncio.TimeoutError, "deadline passed"):
+                await self.client._send_request("GET", "/resources/first")
+
+    async def test_warmup(self):
+        new_connections = self.get_sample_value(
+            "http_client_connections_total", upstream="test_upstream", reused="false"
+        )
+        self.assertEqual(await self.client.warmup(2), 2)
+        self.assertEqual(
+            self.get_sample_value(
+                "http_client_connections_total",
+                upstream="test_upstream",
+                reused="false",
+            ),
+            new_connections + 2,
+        )
+
+        # Warmed up connections are reused
+        response = await self.client._send_request("GET", "/resources/first")
+        await response.release()
+        self.assertEqual(
+            self.get_sample_value(
+                "http_client_connections_total",
+                upstream="test_upstream",
+                reused="false",
+            ),
+            new_connections + 2,
+        )
+
+    async def test_warmup_unreachable(self):
+        client = InstrumentedHttpClient("unreachable", "http://127.0.0.1:1")
+        with self.assertLogs(level="WARNING") as logs:
+            self.assertEqual(await client.warmup(2), 0)
+        self.assertIn("Cannot warm up 2 connections to unreachable", logs.output[0])
+        await client.close()
+
+    async def test_close(self):
+        session = self.client.async_session
+        self.assertIs(self.client.async_session, session)
+        await self.client.close()
+        self.assertTrue(session.closed)
+        # A new session is created if the client is used again
+        self.assertIsNot(self.client.async_session, session)
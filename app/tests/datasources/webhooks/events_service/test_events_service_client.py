@@ -4,10 +4,15 @@ from unittest.mock import AsyncMock
 
 import aiohttp
 
+from app.datasources.http_client.circuit_breaker import CircuitBreaker
 from app.datasources.webhooks.events_service.events_service_client import (
+    EventsServiceClient,
     get_events_service_client,
 )
-from app.datasources.webhooks.events_service.exceptions import EventsServiceRequestError
+from app.datasources.webhooks.events_service.exceptions import (
+    EventsServiceRequestError,
+    EventsServiceUnavailable,
+)
 from app.models.webhook import WebhookEventsService, WebhookEventType
 from app.tests.mocks.events_service_api import events_service_api_response
 
@@ -64,6 +69,7 @@ class TestPrometheusClient(IsolatedAsyncioTestCase):
         mock_response.ok = False
         mock_response.status = 500
         mock_response.reason = "Internal Server Error"
+        mock_response.release = mock.Mock()
         mock_post.return_value = mock_response
 
         with self.assertRaises(EventsServiceRequestError):
@@ -102,6 +108,32 @@ class TestPrometheusClient(IsolatedAsyncioTestCase):
         )
         self.assertTrue(result.is_active)
 
+    @mock.patch.object(aiohttp.ClientSession, "get", new_callable=AsyncMock)
+    async def test_get_webhook_circuit_breaker_open(self, mock_get):
+        mock_response = AsyncMock()
+        mock_response.ok = False
+        mock_response.status = 503
+        mock_response.reason = "Service Unavailable"
+        mock_response.release = mock.Mock()
+        mock_get.return_value = mock_response
+        events_service_client = EventsServiceClient(
+            "http://",
+            circuit_breaker=CircuitBreaker("events_service", failure_threshold=2),
+        )
+        try:
+            for _ in range(2):
+                with self.assertRaises(EventsServiceRequestError):
+                    await events_service_client.get_webhook(uuid.uuid4())
+            self.assertEqual(mock_get.call_count, 2)
+
+            # Requests fail fast without being sent
+            with self.assertRaises(EventsServiceUnavailable) as context:
+                await events_service_client.get_webhook(uuid.uuid4())
+            self.assertGreater(context.exception.retry_after_seconds, 0)
+            self.assertEqual(mock_get.call_count, 2)
+        finally:
+            await events_service_client.close()
+
     @mock.patch.object(aiohttp.ClientSession, "delete", new_callable=AsyncMock)
     async def test_delete_webhook(self, mock_delete):
         mock_response = AsyncMock()
@@ -125,12 +157,15 @@ class TestPrometheusClient(IsolatedAsyncioTestCase):
         mock_response.ok = False
         mock_response.status = 500
         mock_response.reason = "Internal Server Error"
+        mock_response.release = mock.Mock()
         mock_delete.return_value = mock_response
 
         webhook_id = uuid.uuid4()
 
         with self.assertRaises(EventsServiceRequestError):
             await self.events_service_client.delete_webhook(webhook_id)
+        # Connection is returned to the pool
+        mock_response.release.assert_called_once_with()
 
     @mock.patch.object(aiohttp.ClientSession, "put", new_callable=AsyncMock)
     async def test_update_webhook(self, mock_put):
@@ -167,6 +202,7 @@ class TestPrometheusClient(IsolatedAsyncioTestCase):
         mock_response.ok = False
         mock_response.status = 500
         mock_response.reason = "Internal Server Error"
+        mock_response.release = mock.Mock()
         mock_put.return_value = mock_response
 
         with self.assertRaises(EventsServiceRequestError):
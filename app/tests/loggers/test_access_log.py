@@ -0,0 +1,94 @@
+import logging
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from prometheus_client import REGISTRY
+
+from ...loggers.access_log import AccessLogSampler, get_access_log_sampler
+from ...main import app
+
+
+class TestAccessLogSampler(unittest.TestCase):
+    def setUp(self):
+        self.sampler = AccessLogSampler(
+            sample_rate=0.1,
+            route_sample_rates={"/api/v1/users/me": 0.5},
+            slow_request_seconds=1,
+            excluded_routes=["/health"],
+        )
+
+    def test_get_sample_rate(self):
+        self.assertEqual(self.sampler.get_sample_rate("/api/v1/about", 200, 0.1), 0.1)
+        self.assertEqual(
+            self.sampler.get_sample_rate("/api/v1/users/me", 200, 0.1), 0.5
+        )
+        self.assertEqual(self.sampler.get_sample_rate("/api/v1/about", 404, 0.1), 0.1)
+        self.assertEqual(self.sampler.get_sample_rate("/api/v1/about", 503, 0.1), 1)
+        self.assertEqual(self.sampler.get_sample_rate("/api/v1/about", 200, 1.5), 1)
+        self.assertEqual(
+            self.sampler.get_sample_rate(
+                "/api/v1/about", 500, 0.1, exception=ValueError()
+            ),
+            1,
+        )
+        self.assertEqual(self.sampler.get_sample_rate("/health", 200, 0.1), 0)
+        self.assertEqual(self.sampler.get_sample_rate("/health", 500, 5), 0)
+
+    def test_sample(self):
+        def get_count(decision: str) -> float:
+            return (
+                REGISTRY.get_sample_value("access_logs_total", {"decision": decision})
+                or 0
+            )
+
+        logged, sampled_out, excluded = (
+            get_count("logged"),
+            get_count("sampled_out"),
+            get_count("excluded"),
+        )
+        with mock.patch("random.random", return_value=0.05):
+            self.assertEqual(self.sampler.sample("/api/v1/about", 200, 0.1), 0.1)
+        with mock.patch("random.random", return_value=0.5):
+            self.assertIsNone(self.sampler.sample("/api/v1/about", 200, 0.1))
+            self.assertEqual(self.sampler.sample("/api/v1/about", 503, 0.1), 1)
+        self.assertIsNone(self.sampler.sample("/health", 200, 0.1))
+
+        self.assertEqual(get_count("logged"), logged + 2)
+        self.assertEqual(get_count("sampled_out"), sampled_out + 1)
+        self.assertEqual(get_count("excluded"), excluded + 1)
+
+
+class TestAccessLog(unittest.TestCase):
+    client: TestClient
+
+    @classmethod
+    def setUpClass(cls):
+        cls.client = TestClient(app)
+
+    def tearDown(self):
+        get_access_log_sampler.cache_clear()
+
+    def get_access_logs(self, path: str) -> list[logging.LogRecord]:
+        with self.assertLogs(level="DEBUG") as logs:
+            # At least one record is required by `assertLogs`
+            logging.getLogger().debug("Request %s", path)
+            self.client.get(path)
+        return [record for record in logs.records if record.msg == "Http request"]
+
+    def test_access_log(self):
+        records = self.get_access_logs("/api/v1/about")
+        self.assertEqual(len(records), 1)
+        self.assertNotIn("sampleRate", getattr(records[0], "http_request"))
+
+        self.assertEqual(self.get_access_logs("/health"), [])
+
+    @mock.patch("random.random", return_value=0.05)
+    def test_sampled_access_log(self, random_mock: mock.MagicMock):
+        with mock.patch.object(get_access_log_sampler(), "sample_rate", 0.1):
+            records = self.get_access_logs("/api/v1/about")
+            self.assertEqual(getattr(records[0], "http_request")["sampleRate"], 0.1)
+
+            random_mock.return_value = 0.5
+            self.assertEqual(self.get_access_logs("/api/v1/about"), [])
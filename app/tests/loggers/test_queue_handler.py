@@ -0,0 +1,104 @@
+import io
+import json
+import logging
+import queue
+import unittest
+from unittest import mock
+
+from prometheus_client import REGISTRY
+
+from ...loggers.queue_handler import (
+    BatchQueueListener,
+    BatchStreamHandler,
+    BoundedQueueHandler,
+)
+from ...loggers.safe_logger import SafeJsonFormatter
+
+
+class TestQueueHandler(unittest.TestCase):
+    def setUp(self):
+        self.stream = io.StringIO()
+        self.stream_handler = BatchStreamHandler(self.stream)
+        self.stream_handler.setFormatter(SafeJsonFormatter())
+        self.logger = logging.getLogger(f"{__name__}.{self._testMethodName}")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+
+    def tearDown(self):
+        self.logger.handlers.clear()
+
+    def get_messages(self) -> list[str]:
+        return [
+            json.loads(line)["message"] for line in self.stream.getvalue().splitlines()
+        ]
+
+    def test_queue_handler(self):
+        log_queue: queue.Queue = queue.Queue(maxsize=100)
+        self.logger.addHandler(BoundedQueueHandler(log_queue))
+        listener = BatchQueueListener(log_queue, self.stream_handler, batch_size=3)
+
+        arguments = ["first"]
+        self.logger.info("Message %s", arguments)
+        # Message is built when logging, not when writing
+        arguments[0] = "changed"
+        for position in range(2, 6):
+            self.logger.info("Message %d", position)
+
+        with mock.patch.object(
+            self.stream_handler, "flush", wraps=self.stream_handler.flush
+        ) as flush_mock:
+            listener.start()
+            listener.stop()
+            # 5 records in batches of 3
+            self.assertEqual(flush_mock.call_count, 2)
+
+        self.assertEqual(
+            self.get_messages(),
+            [
+                "Message ['first']",
+                "Message 2",
+                "Message 3",
+                "Message 4",
+                "Message 5",
+            ],
+        )
+
+    def test_queue_handler_full(self):
+        dropped = REGISTRY.get_sample_value("log_records_dropped_total") or 0
+        log_queue: queue.Queue = queue.Queue(maxsize=2)
+        self.logger.addHandler(BoundedQueueHandler(log_queue))
+        for position in range(1, 5):
+            self.logger.info("Message %d", position)
+
+        self.assertEqual(
+            REGISTRY.get_sample_value("log_records_dropped_total"), dropped + 2
+        )
+        listener = BatchQueueListener(log_queue, self.stream_handler)
+        listener.start()
+        listener.stop()
+        self.assertEqual(self.get_messages(), ["Message 1", "Message 2"])
+
+    def test_queue_handler_full_block(self):
+        log_queue: queue.Queue = queue.Queue(maxsize=2)
+        self.logger.addHandler(BoundedQueueHandler(log_queue, block=True))
+        listener = BatchQueueListener(log_queue, self.stream_handler, batch_size=1)
+        listener.start()
+        for position in range(1, 11):
+            self.logger.info("Message %d", position)
+        listener.stop()
+
+        self.assertEqual(
+            self.get_messages(), [f"Message {position}" for position in range(1, 11)]
+        )
+
+    def test_listener_handler_level(self):
+        log_queue: queue.Queue = queue.Queue()
+        self.logger.addHandler(BoundedQueueHandler(log_queue))
+        self.stream_handler.setLevel(logging.WARNING)
+        listener = BatchQueueListener(log_queue, self.stream_handler)
+        self.logger.info("Info message")
+        self.logger.warning("Warning message")
+        listener.start()
+        listener.stop()
+
+        self.assertEqual(self.get_messages(), ["Warning message"])
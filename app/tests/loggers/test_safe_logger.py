@@ -0,0 +1,98 @@
+import datetime
+import json
+import logging
+import sys
+import unittest
+
+from ...loggers.safe_logger import (
+    HttpRequestLog,
+    HttpResponseLog,
+    JsonLog,
+    SafeJsonFormatter,
+)
+
+
+class TestSafeJsonFormatter(unittest.TestCase):
+    def setUp(self):
+        self.formatter = SafeJsonFormatter()
+
+    def make_record(self, level: int, message: str, **extra) -> logging.LogRecord:
+        record = logging.LogRecord(
+            "test", level, __file__, 10, message, (), None, func="test_function"
+        )
+        record.__dict__.update(extra)
+        return record
+
+    def assert_valid_log(self, log: str) -> dict:
+        # Pydantic model defines the schema, encoding it again must produce the same log
+        self.assertEqual(
+            JsonLog.model_validate_json(log).model_dump_json(exclude_none=True), log
+        )
+        return json.loads(log)
+
+    def test_format(self):
+        record = self.make_record(logging.INFO, "Some message")
+        log = self.assert_valid_log(self.formatter.format(record))
+        self.assertEqual(
+            log,
+            {
+                "level": "INFO",
+                "timestamp": datetime.datetime.fromtimestamp(
+                    record.created, datetime.timezone.utc
+                )
+                .isoformat()
+                .replace("+00:00", "Z"),
+                "context": "test_safe_logger.test_function",
+                "message": "Some message",
+            },
+        )
+
+    def test_format_http_request(self):
+        start_time = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+        end_time = start_time + datetime.timedelta(milliseconds=15)
+        record = self.make_record(
+            logging.INFO,
+            "Http request",
+            db_session="session-id",
+            http_request=HttpRequestLog(
+                url="http://test/api/v1/about",
+                method="GET",
+                startTime=start_time,
+            ).model_dump(),
+            http_response={"status": 200, "endTime": end_time, "totalTime": 15},
+        )
+        log = self.assert_valid_log(self.formatter.format(record))
+        self.assertEqual(
+            log["contextMessage"],
+            {
+                "dbSession": "session-id",
+                "httpRequest": {
+                    "url": "http://test/api/v1/about",
+                    "method": "GET",
+                    "startTime": "2025-01-01T00:00:00Z",
+                },
+                "httpResponse": HttpResponseLog(
+                    status=200, endTime=end_time, totalTime=15
+                ).model_dump(mode="json"),
+            },
+        )
+
+    def test_format_error(self):
+        try:
+            raise ValueError("Some error")
+        except ValueError:
+            exc_info = sys.exc_info()
+        record = self.make_record(logging.ERROR, "Some error")
+        record.exc_info = exc_info
+        log = self.assert_valid_log(self.formatter.format(record))
+        error_info = log["contextMessage"]["errorInfo"]
+        self.assertEqual(error_info["function"], "test_function")
+        self.assertEqual(error_info["line"], 10)
+        self.assertIn("ValueError: Some error", error_info["exceptionInfo"])
+
+        record = self.make_record(logging.ERROR, "Some error")
+        log = self.assert_valid_log(self.formatter.format(record))
+        self.assertEqual(
+            log["contextMessage"],
+            {"errorInfo": {"function": "test_function", "line": 10}},
+        )
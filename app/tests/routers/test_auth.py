@@ -1,12 +1,16 @@
 import datetime
 import uuid
+from unittest import mock
 
 from fastapi import HTTPException
 
+import jwt
+
 from app.config import settings
 from app.datasources.db.connector import db_session_context
 from app.routers.auth import (
     UserFromJWTDoesNotExist,
+    get_jwt_cache,
     get_jwt_info_from_auth_token,
     get_user_from_jwt,
 )
@@ -17,6 +21,9 @@ from app.tests.datasources.db.factory import generate_random_user
 
 class TestAuth(AsyncDbTestCase):
 
+    def setUp(self):
+        get_jwt_cache().clear()
+
     async def test_valid_token(self):
         token = JwtService().create_access_token(
             "user123", datetime.timedelta(minutes=5), settings.JWT_AUDIENCE, {}
@@ -26,6 +33,28 @@ class TestAuth(AsyncDbTestCase):
         self.assertEqual(user["sub"], "user123")
         self.assertEqual(user["key"], "user123")
 
+    async def test_valid_token_is_cached(self):
+        token = JwtService().create_access_token(
+            "user123", datetime.timedelta(minutes=5), settings.JWT_AUDIENCE, {}
+        )
+
+        with mock.patch.object(jwt, "decode", wraps=jwt.decode) as decode_mock:
+            jwt_info = await get_jwt_info_from_auth_token(token)
+            self.assertEqual(jwt_info["sub"], "user123")
+            # Returned claims can be modified without affecting the cache
+            jwt_info["sub"] = "modified"
+            self.assertEqual(
+                (await get_jwt_info_from_auth_token(token))["sub"], "user123"
+            )
+            decode_mock.assert_called_once()
+
+        with mock.patch.object(settings, "JWT_CACHE_MAX_TTL_SECONDS", 0):
+            get_jwt_cache().clear()
+            with mock.patch.object(jwt, "decode", wraps=jwt.decode) as decode_mock:
+                await get_jwt_info_from_auth_token(token)
+                await get_jwt_info_from_auth_token(token)
+                self.assertEqual(decode_mock.call_count, 2)
+
     async def test_invalid_token(self):
         invalid_token = "invalid.token.value"
 
@@ -1,7 +1,9 @@
 import unittest
+from unittest import mock
 
 from fastapi.testclient import TestClient
 
+from ...datasources.db.connector import db_session
 from ...main import app
 
 
@@ -27,6 +29,9 @@ class TestRouterDefault(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
 
     def test_view_health(self):
-        response = self.client.get("/health")
-        self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json(), "OK")
+        with mock.patch.object(db_session, "remove") as remove_mock:
+            response = self.client.get("/health")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), "OK")
+            # Database session is not created for routes not using it
+            remove_mock.assert_not_called()
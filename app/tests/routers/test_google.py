@@ -1,6 +1,6 @@
 from unittest import mock
 
-from fastapi.testclient import TestClient
+from httpx import ASGITransport, AsyncClient
 
 from app.main import app
 
@@ -12,25 +12,27 @@ from ..mocks.google import google_user
 
 
 class TestGoogleRouter(AsyncDbTestCase):
-    client: TestClient
+    client: AsyncClient
 
     @classmethod
     def setUpClass(cls):
-        cls.client = TestClient(app)
+        cls.client = AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        )
 
-    def test_start_google_login(self):
-        response = self.client.get("/api/v1/google/login")
+    async def test_start_google_login(self):
+        response = await self.client.get("/api/v1/google/login")
         self.assertEqual(response.status_code, 422)
         self.assertEqual(response.json(), {"detail": "Google Auth is not configured"})
 
         with mock.patch.object(GoogleService, "is_configured", return_value=True):
-            response = self.client.get("/api/v1/google/login")
+            response = await self.client.get("/api/v1/google/login")
             self.assertEqual(response.status_code, 200)
             self.assertTrue(response.json()["url"])
 
     @db_session_context
     async def test_callback_google_login(self):
-        response = self.client.get("/api/v1/google/callback?code=1234")
+        response = await self.client.get("/api/v1/google/callback?code=1234")
         self.assertEqual(response.status_code, 422)
         self.assertEqual(response.json(), {"detail": "Google Auth is not configured"})
 
@@ -39,12 +41,12 @@ class TestGoogleRouter(AsyncDbTestCase):
                 GoogleService, "get_user_info", return_value=google_user
             ):
                 self.assertEqual(await User.count(), 0)
-                response = self.client.get("/api/v1/google/callback?code=1234")
+                response = await self.client.get("/api/v1/google/callback?code=1234")
                 self.assertEqual(response.status_code, 200)
                 self.assertTrue(response.json()["access_token"])
                 self.assertEqual(await User.count(), 1)
 
-                response = self.client.get("/api/v1/google/callback?code=1234")
+                response = await self.client.get("/api/v1/google/callback?code=1234")
                 self.assertEqual(response.status_code, 200)
                 self.assertTrue(response.json()["access_token"])
                 self.assertEqual(await User.count(), 1)
@@ -0,0 +1,34 @@
+import unittest
+
+from fastapi.testclient import TestClient
+
+from ...main import app
+
+
+class TestRouterMetrics(unittest.TestCase):
+    client: TestClient
+
+    @classmethod
+    def setUpClass(cls):
+        cls.client = TestClient(app)
+
+    def test_view_metrics(self):
+        self.client.get("/api/v1/about")
+        self.client.get("/not-existing-url")
+
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("text/plain", response.headers["content-type"])
+        self.assertIn(
+            'http_requests_total{method="GET",route="/api/v1/about",status="200"}',
+            response.text,
+        )
+        self.assertIn(
+            'http_request_duration_seconds_count{method="GET",route="/api/v1/about",status="200"}',
+            response.text,
+        )
+        self.assertIn(
+            'http_requests_total{method="GET",route="<unmatched>",status="404"}',
+            response.text,
+        )
+        self.assertIn('http_requests_in_progress{method="GET"} 1.0', response.text)
@@ -7,7 +7,6 @@ import faker
 from httpx import ASGITransport, AsyncClient
 
 from app.datasources.api_gateway.apisix.apisix_client import get_apisix_client
-from app.datasources.cache.redis import get_redis
 from app.datasources.db.connector import db_session_context
 from app.datasources.db.models import User
 from app.main import app
@@ -31,11 +30,9 @@ class TestUsers(AsyncDbTestCase):
         cls.client = AsyncClient(
             transport=ASGITransport(app=app), base_url="http://test"
         )
-        get_redis().flushall()
         get_apisix_client.cache_clear()
 
     def tearDown(self):
-        get_redis().flushall()
         get_apisix_client.cache_clear()
 
     def get_example_registration_user(self) -> ExampleRegistrationUser:
@@ -3,7 +3,10 @@ from unittest import mock
 
 import faker
 
-from app.datasources.api_gateway.apisix.apisix_client import get_apisix_client
+from app.datasources.api_gateway.apisix.apisix_client import (
+    ApisixClient,
+    get_apisix_client,
+)
 from app.datasources.db.connector import db_session_context
 from app.routers.auth import get_jwt_info_from_auth_token
 
@@ -66,6 +69,30 @@ class TestApiKeyService(AsyncDbTestCase):
             with self.assertRaises(ApiKeyCreationLimitReached):
                 await generate_api_key(user.id, description="Api key for testing")
 
+    @db_session_context
+    @mock.patch.object(
+        settings, "APISIX_FREEMIUM_CONSUMER_GROUP_API_KEY_CREATION_LIMIT", 1
+    )
+    async def test_generate_api_key_limit_reached_concurrently(self):
+        user, _ = await self._generate_random_user_with_apisix_consumer_group()
+        await generate_api_key(user.id, description="Api key for testing")
+
+        # Limit is reached by another request after the quota was checked
+        with mock.patch(
+            "app.services.api_key_service.is_user_quota_available", return_value=True
+        ), mock.patch.object(
+            ApisixClient, "delete_consumer", wraps=get_apisix_client().delete_consumer
+        ) as mock_delete_consumer:
+            with self.assertRaises(ApiKeyCreationLimitReached):
+                await generate_api_key(user.id, description="Api key for testing")
+
+        # Consumer created for the rejected api key is removed
+        mock_delete_consumer.assert_awaited_once()
+        consumer_name = mock_delete_consumer.await_args_list[0].args[0]
+        with self.assertRaises(ApiGatewayRequestError):
+            await get_apisix_client().get_consumer(consumer_name)
+        self.assertEqual(await ApiKey.count_by_user(user.id), 1)
+
     @db_session_context
     async def test_delete_api_key_by_id(self):
         user, _ = await self._generate_random_user_with_apisix_consumer_group()
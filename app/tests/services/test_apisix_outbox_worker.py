@@ -0,0 +1,266 @@
+import datetime
+import uuid
+from unittest import IsolatedAsyncioTestCase, mock
+
+import faker
+
+from ...config import settings
+from ...datasources.api_gateway.apisix.apisix_client import (
+    ApisixClient,
+    get_apisix_client,
+)
+from ...datasources.api_gateway.exceptions import ApiGatewayRequestError
+from ...datasources.db.connector import db_session, db_session_context
+from ...datasources.db.models import ApiKey, ApisixOutboxEvent, User
+from ...models.types import passwordType
+from ...services.api_key_service import delete_api_key_by_id, generate_api_key
+from ...services.apisix_outbox_worker import ApisixOutboxWorker
+from ...services.user_service import UserService
+from ..datasources.db.async_db_test_case import AsyncDbTestCase
+
+fake = faker.Faker()
+
+
+class TestApisixOutboxWorkerUnit(IsolatedAsyncioTestCase):
+    def test_get_retry_delay(self):
+        worker = ApisixOutboxWorker(
+            retry_backoff_seconds=1, retry_max_backoff_seconds=10
+        )
+        self.assertEqual(
+            [worker.get_retry_delay(attempts) for attempts in range(1, 7)],
+            [1, 2, 4, 8, 10, 10],
+        )
+
+    def test_is_retryable(self):
+        worker = ApisixOutboxWorker(max_attempts=3)
+        event = ApisixOutboxEvent.delete_consumer(uuid.uuid4(), "consumer")
+        event.attempts = 1
+        for status_code in (None, 429, 500, 503):
+            self.assertTrue(
+                worker.is_retryable(
+                    event, ApiGatewayRequestError("Error", status_code=status_code)
+                )
+            )
+        for status_code in (400, 401, 404):
+            self.assertFalse(
+                worker.is_retryable(
+                    event, ApiGatewayRequestError("Error", status_code=status_code)
+                )
+            )
+        self.assertFalse(worker.is_retryable(event, ValueError("Unknown operation")))
+
+        event.attempts = 3
+        self.assertFalse(
+            worker.is_retryable(event, ApiGatewayRequestError("APISIX is down"))
+        )
+
+    @mock.patch.object(ApisixClient, "delete_consumer")
+    async def test_send_event_delete_missing_consumer(self, mock_delete_consumer):
+        worker = ApisixOutboxWorker()
+        event = ApisixOutboxEvent.delete_consumer(uuid.uuid4(), "consumer")
+
+        # Consumer already deleted
+        mock_delete_consumer.side_effect = ApiGatewayRequestError(
+            "Not found", status_code=404
+        )
+        await worker.send_event(event)
+
+        mock_delete_consumer.side_effect = ApiGatewayRequestError(
+            "Server error", status_code=500
+        )
+        with self.assertRaises(ApiGatewayRequestError):
+            await worker.send_event(event)
+
+
+@mock.patch.object(settings, "APISIX_OUTBOX_ENABLED", True)
+class TestApisixOutboxWorker(AsyncDbTestCase):
+    def setUp(self):
+        self.user_service = UserService()
+        self.worker = ApisixOutboxWorker(batch_size=10)
+        get_apisix_client.cache_clear()
+
+    def tearDown(self):
+        get_apisix_client.cache_clear()
+
+    async def get_outbox_events(self) -> list[ApisixOutboxEvent]:
+        # Events are updated by the worker in its own database session
+        db_session.expire_all()
+        return list(await ApisixOutboxEvent.get_all())
+
+    @db_session_context
+    async def test_drain(self):
+        user = await self.user_service.create_user(
+            uuid.uuid4(), fake.email(), passwordType(fake.password())
+        )
+        api_key = await generate_api_key(user.id, description="Api key for testing")
+        api_key_subject = f"{user.id.hex}_{api_key.id.hex}"
+
+        # Request returns before provisioning APISIX
+        self.assertEqual(await User.count(), 1)
+        self.assertIsNotNone(await ApiKey.get_by_ids(api_key.id, user.id))
+        self.assertEqual(
+            [event.idempotency_key for event in await self.get_outbox_events()],
+            [f"add_consumer_group:{user.id.hex}", f"upsert_consumer:{api_key_subject}"],
+        )
+        with self.assertRaises(ApiGatewayRequestError):
+            await get_apisix_client().get_consumer_group(user.id.hex)
+
+        self.assertEqual(await self.worker.drain(), 2)
+        self.assertEqual(await self.get_outbox_events(), [])
+        consumer_group = await get_apisix_client().get_consumer_group(user.id.hex)
+        self.assertIn("limit-count", consumer_group.plugins or {})
+        consumer = await get_apisix_client().get_consumer(api_key_subject)
+        self.assertEqual(consumer.consumer_group_name, user.id.hex)
+
+        # Consumer of a revoked api key is deleted before answering
+        self.assertTrue(await delete_api_key_by_id(api_key.id, user.id))
+        with self.assertRaises(ApiGatewayRequestError):
+            await get_apisix_client().get_consumer(api_key_subject)
+        self.assertEqual(await self.worker.drain(), 1)
+        with self.assertRaises(ApiGatewayRequestError):
+            await get_apisix_client().get_consumer(api_key_subject)
+
+        # Nothing left to send
+        self.assertEqual(await self.worker.drain(), 0)
+
+    @db_session_context
+    async def test_delete_api_key_apisix_failing(self):
+        user = await self.user_service.create_user(
+            uuid.uuid4(), fake.email(), passwordType(fake.password())
+        )
+        api_key = await generate_api_key(user.id, description="Api key for testing")
+        api_key_subject = f"{user.id.hex}_{api_key.id.hex}"
+        self.assertEqual(await self.worker.drain(), 2)
+
+        with mock.patch.object(
+            ApisixClient,
+            "delete_consumer",
+            side_effect=ApiGatewayRequestError("APISIX is down", status_code=503),
+        ):
+            self.assertTrue(await delete_api_key_by_id(api_key.id, user.id))
+        self.assertIsNone(await ApiKey.get_by_ids(api_key.id, user.id))
+        await get_apisix_client().get_consumer(api_key_subject)
+
+        # Outbox deletes the consumer when APISIX recovers
+        self.assertEqual(await self.worker.drain(), 1)
+        with self.assertRaises(ApiGatewayRequestError):
+            await get_apisix_client().get_consumer(api_key_subject)
+
+    @db_session_context
+    async def test_delete_api_key_not_provisioned(self):
+        user = await self.user_service.create_user(
+            uuid.uuid4(), fake.email(), passwordType(fake.password())
+        )
+        api_key = await generate_api_key(user.id, description="Api key for testing")
+        api_key_subject = f"{user.id.hex}_{api_key.id.hex}"
+
+        # Consumer is deleted after the pending events creating it
+        self.assertTrue(await delete_api_key_by_id(api_key.id, user.id))
+        self.assertEqual(await self.worker.drain(), 3)
+        with self.assertRaises(ApiGatewayRequestError):
+            await get_apisix_client().get_consumer(api_key_subject)
+
+    @db_session_context
+    async def test_process_batch_locked(self):
+        await self.user_service.create_user(
+            uuid.uuid4(), fake.email(), passwordType(fake.password())
+        )
+        async with ApisixOutboxEvent.lock_outbox() as locked:
+            self.assertTrue(locked)
+            async with ApisixOutboxEvent.lock_outbox() as other_locked:
+                self.assertFalse(other_locked)
+            # Outbox is being sent by another process
+            self.assertEqual(await self.worker.process_batch(), 0)
+
+        self.assertEqual(await self.worker.process_batch(), 1)
+
+    @db_session_context
+    async def test_process_batch_retry_keeps_order(self):
+        user = await self.user_service.create_user(
+            uuid.uuid4(), fake.email(), passwordType(fake.password())
+        )
+        api_key = await generate_api_key(user.id, description="Api key for testing")
+        other_user = await self.user_service.create_user(
+            uuid.uuid4(), fake.email(), passwordType(fake.password())
+        )
+
+        with mock.patch.object(
+            ApisixClient,
+            "add_consumer_group_with_rate_limit",
+            side_effect=[ApiGatewayRequestError("APISIX is down"), True],
+        ):
+            # Api key of the user is not sent after its consumer group failed
+            self.assertEqual(await self.worker.process_batch(), 2)
+
+        failed_event, pending_event = await self.get_outbox_events()
+        self.assertEqual(failed_event.user_id, user.id)
+        self.assertEqual(failed_event.attempts, 1)
+        self.assertEqual(failed_event.last_error, "APISIX is down")
+        self.assertGreater(
+            failed_event.next_attempt_at, datetime.datetime.now(datetime.timezone.utc)
+        )
+        self.assertEqual(pending_event.resource_name, f"{user.id.hex}_{api_key.id.hex}")
+        self.assertEqual(pending_event.attempts, 0)
+
+        # Events of the user wait for the retry
+        self.assertEqual(await self.worker.process_batch(), 0)
+
+        failed_event.next_attempt_at = datetime.datetime.now(datetime.timezone.utc)
+        await failed_event.update()
+        self.assertEqual(await self.worker.drain(), 2)
+        self.assertEqual(await self.get_outbox_events(), [])
+        await get_apisix_client().get_consumer_group(other_user.id.hex)
+
+    @db_session_context
+    async def test_process_batch_failed_event_does_not_block(self):
+        user = await self.user_service.create_user(
+            uuid.uuid4(), fake.email(), passwordType(fake.password())
+        )
+        self.assertEqual(await self.worker.drain(), 1)
+        api_key = await generate_api_key(user.id, description="Api key for testing")
+        await generate_api_key(user.id, description="Other api key for testing")
+
+        with mock.patch.object(
+            ApisixClient,
+            "upsert_consumer",
+            side_effect=[
+                ApiGatewayRequestError("Invalid plugin", status_code=400),
+                True,
+            ],
+        ) as mock_upsert_consumer:
+            # Rejected event is not retried and the next api key is sent anyway
+            self.assertEqual(await self.worker.process_batch(), 2)
+            self.assertEqual(mock_upsert_consumer.call_count, 2)
+
+        (failed_event,) = await self.get_outbox_events()
+        self.assertEqual(failed_event.resource_name, f"{user.id.hex}_{api_key.id.hex}")
+        self.assertTrue(failed_event.failed)
+        self.assertEqual(failed_event.attempts, 1)
+        self.assertEqual(failed_event.last_error, "Invalid plugin")
+        self.assertEqual(await self.worker.process_batch(), 0)
+
+    @db_session_context
+    async def test_process_batch_max_attempts(self):
+        worker = ApisixOutboxWorker(batch_size=10, max_attempts=2)
+        user = await self.user_service.create_user(
+            uuid.uuid4(), fake.email(), passwordType(fake.password())
+        )
+
+        with mock.patch.object(
+            ApisixClient,
+            "add_consumer_group_with_rate_limit",
+            side_effect=ApiGatewayRequestError("APISIX is down"),
+        ):
+            self.assertEqual(await worker.process_batch(), 1)
+            (event,) = await self.get_outbox_events()
+            self.assertFalse(event.failed)
+
+            event.next_attempt_at = datetime.datetime.now(datetime.timezone.utc)
+            await event.update()
+            self.assertEqual(await worker.process_batch(), 1)
+
+        (event,) = await self.get_outbox_events()
+        self.assertEqual(event.user_id, user.id)
+        self.assertEqual(event.attempts, 2)
+        self.assertTrue(event.failed)
+        self.assertEqual(await worker.process_batch(), 0)
@@ -0,0 +1,295 @@
+import uuid
+from typing import AsyncIterator
+from unittest import IsolatedAsyncioTestCase, TestCase, mock
+
+from ...datasources.api_gateway.apisix.apisix_client import get_apisix_client
+from ...datasources.api_gateway.exceptions import ApiGatewayRequestError
+from ...datasources.db.connector import db_session_context
+from ...datasources.db.models import ApiKey, User
+from ...models.api_gateway import Consumer, ConsumerGroup
+from ...services import apisix_reconciliation_service
+from ...services.apisix_reconciliation_service import (
+    ApisixReconciler,
+    get_consumer_ids,
+    get_consumer_name,
+    parse_consumer_name,
+    parse_uuid_hex,
+)
+from ..datasources.db.async_db_test_case import AsyncDbTestCase
+from ..datasources.db.factory import generate_random_api_key, generate_random_user
+
+
+class TestApisixReconciliationParsing(TestCase):
+    def test_parse_uuid_hex(self):
+        user_id = uuid.uuid4()
+        self.assertEqual(parse_uuid_hex(user_id.hex), user_id.int)
+        self.assertIsNone(parse_uuid_hex(str(user_id)))
+        self.assertIsNone(parse_uuid_hex("freemium"))
+        self.assertIsNone(parse_uuid_hex("z" * 32))
+
+    def test_parse_consumer_name(self):
+        user_id = uuid.uuid4()
+        api_key_id = uuid.uuid4()
+        consumer_name = f"{user_id.hex}_{api_key_id.hex}"
+
+        consumer = parse_consumer_name(consumer_name)
+        assert consumer is not None
+        self.assertEqual(get_consumer_ids(consumer), (user_id, api_key_id))
+        self.assertEqual(get_consumer_name(consumer), consumer_name)
+
+        self.assertIsNone(parse_consumer_name(user_id.hex))
+        self.assertIsNone(parse_consumer_name(f"{user_id.hex}_admin"))
+        self.assertIsNone(parse_consumer_name(f"{consumer_name}_{api_key_id.hex}"))
+
+
+class TestApisixReconcilerRepair(IsolatedAsyncioTestCase):
+    async def test_run_skips_deleted_api_keys(self):
+        user_id = uuid.uuid4()
+        api_key_id = uuid.uuid4()
+        deleted_api_key_id = uuid.uuid4()
+
+        async def iter_consumer_groups(page_size=None):
+            yield ConsumerGroup(
+                name=user_id.hex, description=None, labels=None, plugins={}
+            )
+
+        async def iter_consumers(page_size=None) -> AsyncIterator[Consumer]:
+            consumers: list[Consumer] = []
+            for consumer in consumers:
+                yield consumer
+
+        async def iter_user_ids(page_size=1000):
+            yield user_id
+
+        async def iter_api_key_ids(page_size=1000):
+            yield api_key_id, user_id
+            yield deleted_api_key_id, user_id
+
+        apisix_client = mock.AsyncMock()
+        apisix_client.iter_consumer_groups = iter_consumer_groups
+        apisix_client.iter_consumers = iter_consumers
+        with (
+            mock.patch.object(
+                apisix_reconciliation_service,
+                "get_apisix_client",
+                return_value=apisix_client,
+            ),
+            mock.patch.object(User, "iter_ids", iter_user_ids),
+            mock.patch.object(ApiKey, "iter_ids", iter_api_key_ids),
+            # Api key is deleted after the diff, before the repair
+            mock.patch.object(
+                ApiKey,
+                "get_descriptions",
+                mock.AsyncMock(return_value={api_key_id: "Api key for testing"}),
+            ),
+        ):
+            summary = await ApisixReconciler().run()
+
+        self.assertEqual(len(summary.missing_consumers), 2)
+        self.assertEqual(summary.repaired, 1)
+        apisix_client.upsert_consumer.assert_awaited_once_with(
+            f"{user_id.hex}_{api_key_id.hex}",
+            description="Api key for testing",
+            consumer_group_name=user_id.hex,
+        )
+
+    async def test_run_keeps_orphans_created_after_reading_database(self):
+        user_id = uuid.uuid4()
+        api_key_id = uuid.uuid4()
+        orphan_user_id = uuid.uuid4()
+
+        async def iter_consumer_groups(page_size=None):
+            for consumer_group_user_id in (user_id, orphan_user_id):
+                yield ConsumerGroup(
+                    name=consumer_group_user_id.hex,
+                    description=None,
+                    labels=None,
+                    plugins={},
+                )
+
+        async def iter_consumers(page_size=None):
+            yield Consumer(
+                name=f"{user_id.hex}_{api_key_id.hex}",
+                description=None,
+                labels=None,
+                plugins=None,
+                consumer_group_name=user_id.hex,
+            )
+
+        async def iter_ids(page_size=1000) -> AsyncIterator:
+            ids: list = []
+            for id_ in ids:
+                yield id_
+
+        apisix_client = mock.AsyncMock()
+        apisix_client.iter_consumer_groups = iter_consumer_groups
+        apisix_client.iter_consumers = iter_consumers
+        with (
+            mock.patch.object(
+                apisix_reconciliation_service,
+                "get_apisix_client",
+                return_value=apisix_client,
+            ),
+            mock.patch.object(User, "iter_ids", iter_ids),
+            mock.patch.object(ApiKey, "iter_ids", iter_ids),
+            # User and api key are committed after reading the database
+            mock.patch.object(
+                User, "get_existing_ids", mock.AsyncMock(return_value={user_id})
+            ),
+            mock.patch.object(
+                ApiKey,
+                "get_descriptions",
+                mock.AsyncMock(return_value={api_key_id: "Api key for testing"}),
+            ),
+        ):
+            summary = await ApisixReconciler(delete_orphans=True).run()
+
+        self.assertEqual(len(summary.orphan_consumer_groups), 2)
+        self.assertEqual(len(summary.orphan_consumers), 1)
+        self.assertEqual(summary.repaired, 1)
+        apisix_client.delete_consumer.assert_not_awaited()
+        apisix_client.delete_consumer_group.assert_awaited_once_with(orphan_user_id.hex)
+
+
+class TestApisixReconciler(AsyncDbTestCase):
+    def setUp(self):
+        get_apisix_client.cache_clear()
+
+    def tearDown(self):
+        get_apisix_client.cache_clear()
+
+    async def delete_apisix_resources(self):
+        apisix_client = get_apisix_client()
+        for consumer in await apisix_client.get_consumers():
+            await apisix_client.delete_consumer(consumer.name)
+        for consumer_group in await apisix_client.get_consumer_groups():
+            await apisix_client.delete_consumer_group(consumer_group.name)
+
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        # Apisix resources left by other tests would be reported as orphans
+        await self.delete_apisix_resources()
+
+    async def asyncTearDown(self):
+        await self.delete_apisix_resources()
+        await super().asyncTearDown()
+
+    @db_session_context
+    async def test_run(self):
+        apisix_client = get_apisix_client()
+        # User and api key in sync
+        user, _ = await generate_random_user()
+        api_key = await generate_random_api_key(user.id)
+        await apisix_client.add_consumer_group(user.id.hex)
+        await apisix_client.upsert_consumer(
+            f"{user.id.hex}_{api_key.id.hex}", consumer_group_name=user.id.hex
+        )
+        # User and api key missing in Apisix
+        missing_user, _ = await generate_random_user()
+        missing_api_key = await generate_random_api_key(missing_user.id)
+        missing_consumer_name = f"{missing_user.id.hex}_{missing_api_key.id.hex}"
+        # Consumer group and consumer missing in the database
+        orphan_user_id = uuid.uuid4()
+        orphan_consumer_name = f"{orphan_user_id.hex}_{uuid.uuid4().hex}"
+        await apisix_client.add_consumer_group(orphan_user_id.hex)
+        await apisix_client.upsert_consumer(
+            orphan_consumer_name, consumer_group_name=orphan_user_id.hex
+        )
+        # Not created by the service
+        await apisix_client.add_consumer_group("unmanaged_consumer_group")
+
+        summary = await ApisixReconciler(dry_run=True).run()
+        self.assertEqual(summary.users, 2)
+        self.assertEqual(summary.api_keys, 2)
+        self.assertEqual(summary.unmanaged, 1)
+        self.assertEqual(summary.missing_consumer_groups, [missing_user.id.hex])
+        self.assertEqual(summary.missing_consumers, [missing_consumer_name])
+        self.assertEqual(summary.orphan_consumer_groups, [orphan_user_id.hex])
+        self.assertEqual(summary.orphan_consumers, [orphan_consumer_name])
+        self.assertEqual(summary.repaired, 0)
+        with self.assertRaises(ApiGatewayRequestError):
+            await apisix_client.get_consumer(missing_consumer_name)
+
+        # Orphans are only reported
+        summary = await ApisixReconciler().run()
+        self.assertEqual(summary.repaired, 2)
+        self.assertEqual(summary.failed, [])
+        consumer = await apisix_client.get_consumer(missing_consumer_name)
+        self.assertEqual(consumer.consumer_group_name, missing_user.id.hex)
+        consumer_group = await apisix_client.get_consumer_group(missing_user.id.hex)
+        self.assertIn("limit-count", consumer_group.plugins)
+        await apisix_client.get_consumer(orphan_consumer_name)
+
+        summary = await ApisixReconciler(delete_orphans=True).run()
+        self.assertEqual(summary.missing_consumers, [])
+        self.assertEqual(summary.repaired, 2)
+        with self.assertRaises(ApiGatewayRequestError):
+            await apisix_client.get_consumer(orphan_consumer_name)
+        with self.assertRaises(ApiGatewayRequestError):
+            await apisix_client.get_consumer_group(orphan_user_id.hex)
+        await apisix_client.get_consumer_group("unmanaged_consumer_group")
+
+    @db_session_context
+    async def test_run_api_key_deleted_before_repair(self):
+        apisix_client = get_apisix_client()
+        user, _ = await generate_random_user()
+        await apisix_client.add_consumer_group(user.id.hex)
+        api_key = await generate_random_api_key(user.id)
+        consumer_name = f"{user.id.hex}_{api_key.id.hex}"
+
+        get_database_ids = ApisixReconciler._get_database_ids
+
+        async def get_database_ids_and_delete_api_key(reconciler):
+            database_ids = await get_database_ids(reconciler)
+            await ApiKey.delete_by_ids(api_key.id, user.id)
+            return database_ids
+
+        with mock.patch.object(
+            ApisixReconciler, "_get_database_ids", get_database_ids_and_delete_api_key
+        ):
+            summary = await ApisixReconciler().run()
+
+        self.assertEqual(summary.missing_consumers, [consumer_name])
+        self.assertEqual(summary.repaired, 0)
+        # Consumer of the revoked api key is not created again
+        with self.assertRaises(ApiGatewayRequestError):
+            await apisix_client.get_consumer(consumer_name)
+
+    @db_session_context
+    async def test_run_delete_orphans_created_after_reading_database(self):
+        apisix_client = get_apisix_client()
+        user_id = uuid.uuid4()
+        api_key_id = uuid.uuid4()
+        consumer_name = f"{user_id.hex}_{api_key_id.hex}"
+        # Apisix resources are created before the rows are committed
+        await apisix_client.add_consumer_group(user_id.hex)
+        await apisix_client.upsert_consumer(
+            consumer_name, consumer_group_name=user_id.hex
+        )
+
+        get_database_ids = ApisixReconciler._get_database_ids
+
+        async def get_database_ids_and_create_api_key(reconciler):
+            database_ids = await get_database_ids(reconciler)
+            await User(
+                id=user_id, email=f"{user_id.hex}@example.com", hashed_password="hash"
+            ).create()
+            await ApiKey(
+                id=api_key_id,
+                user_id=user_id,
+                key="key",
+                description="Api key for testing",
+            ).create()
+            return database_ids
+
+        with mock.patch.object(
+            ApisixReconciler, "_get_database_ids", get_database_ids_and_create_api_key
+        ):
+            summary = await ApisixReconciler(delete_orphans=True).run()
+
+        self.assertEqual(summary.orphan_consumer_groups, [user_id.hex])
+        self.assertEqual(summary.orphan_consumers, [consumer_name])
+        self.assertEqual(summary.repaired, 0)
+        # Resources of the user and api key created during the run are kept
+        await apisix_client.get_consumer_group(user_id.hex)
+        await apisix_client.get_consumer(consumer_name)
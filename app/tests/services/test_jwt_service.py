@@ -0,0 +1,72 @@
+import datetime
+import unittest
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from ...config import settings
+from ...services.jwt_service import (
+    JwtKeyManager,
+    JwtKeyNotConfigured,
+    JwtService,
+    get_jwt_key_manager,
+)
+
+
+class TestJwtService(unittest.TestCase):
+
+    def test_jwt_key_manager(self):
+        private_key = ec.generate_private_key(ec.SECP256R1())
+        private_key_pem = private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.TraditionalOpenSSL,
+            serialization.NoEncryption(),
+        ).decode()
+        public_key_pem = (
+            private_key.public_key()
+            .public_bytes(
+                serialization.Encoding.PEM,
+                serialization.PublicFormat.SubjectPublicKeyInfo,
+            )
+            .decode()
+        )
+
+        jwt_key_manager = JwtKeyManager(private_key_pem, public_key_pem)
+        token = jwt.encode({"sub": "test"}, jwt_key_manager.signing_key, "ES256")
+        self.assertEqual(
+            jwt.decode(token, public_key_pem, algorithms=["ES256"]), {"sub": "test"}
+        )
+        self.assertEqual(
+            jwt.decode(token, jwt_key_manager.verification_key, algorithms=["ES256"]),
+            {"sub": "test"},
+        )
+
+        # Public key is derived from the private key if not provided
+        jwt_key_manager = JwtKeyManager(private_key_pem, "")
+        self.assertEqual(
+            jwt.decode(token, jwt_key_manager.verification_key, algorithms=["ES256"]),
+            {"sub": "test"},
+        )
+
+        jwt_key_manager = JwtKeyManager("", "")
+        with self.assertRaises(JwtKeyNotConfigured):
+            jwt_key_manager.signing_key
+        with self.assertRaises(JwtKeyNotConfigured):
+            jwt_key_manager.verification_key
+
+    def test_create_access_token(self):
+        token = JwtService.create_access_token(
+            "user123", datetime.timedelta(minutes=5), settings.JWT_AUDIENCE, {"a": 1}
+        )
+        decoded_token = jwt.decode(
+            token,
+            settings.JWT_PUBLIC_KEY,
+            algorithms=[settings.JWT_ALGORITHM],
+            audience=settings.JWT_AUDIENCE,
+        )
+        self.assertEqual(decoded_token["sub"], "user123")
+        self.assertEqual(decoded_token["key"], "user123")
+        self.assertEqual(decoded_token["iss"], settings.JWT_ISSUER)
+        self.assertEqual(decoded_token["data"], {"a": 1})
+        self.assertIs(get_jwt_key_manager(), get_jwt_key_manager())
@@ -0,0 +1,66 @@
+import asyncio
+import threading
+import unittest
+from unittest import mock
+
+import bcrypt
+import faker
+
+from ...models.types import passwordType
+from ...services.password_hasher import PasswordHasher, PasswordHasherBusy
+
+fake = faker.Faker()
+
+
+class TestPasswordHasher(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        # Use the lowest bcrypt cost to keep tests fast
+        self.password_hasher = PasswordHasher(
+            pool_size=2, max_queue_size=1, bcrypt_rounds=4
+        )
+
+    def tearDown(self):
+        self.password_hasher.executor.shutdown(wait=True)
+
+    async def test_hash_and_verify_password(self):
+        password = passwordType(fake.password())
+        hashed_password = await self.password_hasher.hash_password(password)
+        self.assertTrue(hashed_password.startswith("$2b$04$"))
+        self.assertTrue(
+            await self.password_hasher.verify_password(password, hashed_password)
+        )
+        self.assertFalse(
+            await self.password_hasher.verify_password(
+                passwordType(fake.password()), hashed_password
+            )
+        )
+        await asyncio.sleep(0.01)  # Let release callbacks run
+        self.assertEqual(self.password_hasher.pending_jobs, 0)
+
+    async def test_queue_full(self):
+        release = threading.Event()
+
+        def blocking_checkpw(password: bytes, hashed_password: bytes) -> bool:
+            release.wait(timeout=5)
+            return True
+
+        password = passwordType(fake.password())
+        with mock.patch.object(bcrypt, "checkpw", side_effect=blocking_checkpw):
+            # 2 running jobs + 1 queued job fill the hasher
+            tasks = [
+                asyncio.create_task(
+                    self.password_hasher.verify_password(password, "hash")
+                )
+                for _ in range(3)
+            ]
+            await asyncio.sleep(0.05)
+            self.assertEqual(self.password_hasher.pending_jobs, 3)
+            with self.assertRaises(PasswordHasherBusy):
+                await self.password_hasher.verify_password(password, "hash")
+
+            release.set()
+            self.assertEqual(await asyncio.gather(*tasks), [True, True, True])
+
+        await asyncio.sleep(0.01)  # Let release callbacks run
+        self.assertEqual(self.password_hasher.pending_jobs, 0)
@@ -1,8 +1,10 @@
 import uuid
+from unittest import mock
 
 import faker
 
 from ...datasources.api_gateway.apisix.apisix_client import get_apisix_client
+from ...datasources.api_gateway.exceptions import ApiGatewayRequestError
 from ...datasources.cache.redis import get_redis
 from ...datasources.db.connector import db_session_context
 from ...datasources.db.models import User
@@ -24,17 +26,15 @@ class TestApiKeyService(AsyncDbTestCase):
     def setUp(self):
         self.user_service = UserService()
         get_apisix_client.cache_clear()
-        get_redis().flushall()
 
     def tearDown(self):
         get_apisix_client.cache_clear()
-        get_redis().flushall()
 
     @db_session_context
     async def test_change_password(self):
         user, old_password = await generate_random_user()
         self.assertTrue(
-            self.user_service.verify_password(old_password, user.hashed_password)
+            await self.user_service.verify_password(old_password, user.hashed_password)
         )
 
         new_password = passwordType(fake.password())
@@ -51,12 +51,12 @@ class TestApiKeyService(AsyncDbTestCase):
         updated_user = await User.get_by_user_id(user.id)
         assert updated_user is not None
         self.assertFalse(
-            self.user_service.verify_password(
+            await self.user_service.verify_password(
                 old_password, updated_user.hashed_password
             )
         )
         self.assertTrue(
-            self.user_service.verify_password(
+            await self.user_service.verify_password(
                 new_password, updated_user.hashed_password
             )
         )
@@ -86,13 +86,43 @@ class TestApiKeyService(AsyncDbTestCase):
             await user_service.reset_password(wrong_token, new_password)
 
         self.assertFalse(
-            user_service.verify_password(new_password, user.hashed_password)
+            await user_service.verify_password(new_password, user.hashed_password)
         )
         self.assertTrue(await user_service.reset_password(right_token, new_password))
         updated_user = await User.get_by_user_id(user.id)
         assert updated_user is not None
         self.assertTrue(
-            user_service.verify_password(new_password, updated_user.hashed_password)
+            await user_service.verify_password(
+                new_password, updated_user.hashed_password
+            )
+        )
+
+    async def test_pre_register_user(self):
+        email = fake.email()
+        token = await self.user_service.pre_register_user(email)
+        self.assertEqual(
+            await self.user_service.temporary_token_get_email(
+                UserService.TEMPORARY_TOKEN_REGISTRATION_PREFIX, token
+            ),
+            email,
+        )
+        self.assertTrue(
+            await self.user_service.temporary_token_exists_for_email(
+                UserService.TEMPORARY_TOKEN_REGISTRATION_PREFIX, email
+            )
+        )
+
+        with self.assertRaises(TemporaryTokenExists):
+            await self.user_service.pre_register_user(email)
+
+        # Only the first token is valid
+        self.assertEqual(
+            len(
+                await get_redis().keys(
+                    UserService.TEMPORARY_TOKEN_REGISTRATION_PREFIX + "*"
+                )
+            ),
+            2,
         )
 
     @db_session_context
@@ -100,13 +130,13 @@ class TestApiKeyService(AsyncDbTestCase):
         self.assertEqual(await User.count(), 0)
         random_email_a = "random.1@safe.global"
         random_password_a = passwordType(fake.password())
-        pre_register_token = self.user_service.pre_register_user(random_email_a)
+        pre_register_token = await self.user_service.pre_register_user(random_email_a)
         registered_user_a = await self.user_service.register_user(
             random_password_a, pre_register_token
         )
         self.assertEqual(await User.count(), 1)
         self.assertTrue(
-            self.user_service.verify_password(
+            await self.user_service.verify_password(
                 random_password_a, registered_user_a.hashed_password
             )
         )
@@ -127,13 +157,13 @@ class TestApiKeyService(AsyncDbTestCase):
 
         random_email_b = "random.2@safe.global"
         random_password_b = passwordType(fake.password())
-        pre_register_token = self.user_service.pre_register_user(random_email_b)
+        pre_register_token = await self.user_service.pre_register_user(random_email_b)
         registered_user_b = await self.user_service.register_user(
             random_password_b, pre_register_token
         )
         self.assertEqual(await User.count(), 2)
         self.assertTrue(
-            self.user_service.verify_password(
+            await self.user_service.verify_password(
                 random_password_b, registered_user_b.hashed_password
             )
         )
@@ -152,6 +182,36 @@ class TestApiKeyService(AsyncDbTestCase):
         self.assertIsNotNone(apisix_consumer_group_b)
         self.assertNotEqual(apisix_consumer_group_b.plugins, {})
 
+    @db_session_context
+    async def test_create_user_compensation(self):
+        # User is removed from the database if it cannot be registered in APISIX
+        user_id = uuid.uuid4()
+        with mock.patch.object(
+            UserService,
+            "register_user_in_apisix",
+            side_effect=ApiGatewayRequestError("APISIX is down"),
+        ):
+            with self.assertRaises(ApiGatewayRequestError):
+                await self.user_service.create_user(
+                    user_id, "random.1@safe.global", passwordType(fake.password())
+                )
+        self.assertEqual(await User.count(), 0)
+        self.assertIsNone(await User.get_by_user_id(user_id))
+
+        # Consumer group is removed from APISIX if the user cannot be stored
+        user_id = uuid.uuid4()
+        with mock.patch.object(
+            UserService,
+            "create_user_in_db",
+            side_effect=ValueError("Database is down"),
+        ):
+            with self.assertRaises(ValueError):
+                await self.user_service.create_user(
+                    user_id, "random.2@safe.global", passwordType(fake.password())
+                )
+        with self.assertRaises(ApiGatewayRequestError):
+            await get_apisix_client().get_consumer_group(user_id.hex)
+
     @db_session_context
     async def test_login_or_register(self):
         self.assertEqual(await User.count(), 0)
@@ -17,6 +17,7 @@ from ...services.webhook_service import (
     delete_webhook_by_id,
     generate_webhook,
     get_webhook_by_ids,
+    get_webhook_cache,
     get_webhooks_by_user,
     update_webhook_by_ids,
 )
@@ -96,6 +97,46 @@ class TestWebhookService(AsyncDbTestCase):
             with self.assertRaises(WebhookCreationLimitReached):
                 await generate_webhook(user.id, create_webhook_request)
 
+    @db_session_context
+    @mock.patch.object(settings, "EVENTS_SERVICE_WEBHOOKS_CREATION_LIMIT", 1)
+    @mock.patch.object(
+        EventsServiceClient, "delete_webhook", new_callable=mock.AsyncMock
+    )
+    @mock.patch.object(EventsServiceClient, "add_webhook", new_callable=mock.AsyncMock)
+    async def test_generate_webhook_limit_reached_concurrently(
+        self, mock_add_webhook, mock_delete_webhook
+    ):
+        user, _ = await generate_random_user()
+        await generate_random_webhook(user.id)
+        external_webhook_id = uuid.uuid4()
+        mock_add_webhook.return_value = WebhookEventsService(
+            url="http://example.com",
+            authorization=None,
+            chains=[1],
+            events=[WebhookEventType.SEND_CONFIRMATIONS],
+            is_active=True,
+            id=external_webhook_id,
+        )
+        create_webhook_request = WebhookRequest(
+            description="Test webhook",
+            url=HttpUrl("http://example.com"),
+            authorization=None,
+            chains=[1],
+            events=[WebhookEventType.SEND_CONFIRMATIONS],
+            is_active=True,
+        )
+
+        # Limit is reached by another request after the quota was checked
+        with mock.patch(
+            "app.services.webhook_service.is_user_quota_available", return_value=True
+        ):
+            with self.assertRaises(WebhookCreationLimitReached):
+                await generate_webhook(user.id, create_webhook_request)
+
+        # Webhook added to the events service for the rejected one is removed
+        mock_delete_webhook.assert_awaited_once_with(external_webhook_id)
+        self.assertEqual(await Webhook.count_by_user(user.id), 1)
+
     @db_session_context
     @mock.patch.object(
         EventsServiceClient, "delete_webhook", new_callable=mock.AsyncMock
@@ -237,3 +278,46 @@ class TestWebhookService(AsyncDbTestCase):
         self.assertTrue(retrieved_webhook.is_active)
 
         mock_get_webhook.assert_called_once_with(generated_webhook.external_webhook_id)
+
+    @db_session_context
+    @mock.patch.object(EventsServiceClient, "get_webhook", new_callable=mock.AsyncMock)
+    @mock.patch.object(
+        EventsServiceClient, "update_webhook", new_callable=mock.AsyncMock
+    )
+    async def test_webhook_cache(self, mock_update_webhook, mock_get_webhook):
+        user, _ = await generate_random_user()
+        generated_webhook = await generate_random_webhook(user.id)
+        events_service_webhook = WebhookEventsService(
+            url="http://example.com",
+            authorization=None,
+            chains=[1],
+            events=[WebhookEventType.SEND_CONFIRMATIONS],
+            is_active=True,
+            id=generated_webhook.external_webhook_id,
+        )
+        mock_get_webhook.return_value = events_service_webhook
+
+        await get_webhook_by_ids(generated_webhook.id, user.id)
+        await get_webhooks_by_user(user.id)
+        mock_get_webhook.assert_called_once_with(generated_webhook.external_webhook_id)
+        self.assertEqual(
+            await get_webhook_cache().get(str(generated_webhook.external_webhook_id)),
+            (True, events_service_webhook),
+        )
+
+        # Updating the webhook invalidates the cache
+        await update_webhook_by_ids(
+            generated_webhook.id,
+            user.id,
+            WebhookRequest(
+                url=HttpUrl("http://new-url.com"),
+                chains=[1],
+                events=[WebhookEventType.SEND_CONFIRMATIONS],
+            ),
+        )
+        self.assertEqual(
+            await get_webhook_cache().get(str(generated_webhook.external_webhook_id)),
+            (False, None),
+        )
+        await get_webhook_by_ids(generated_webhook.id, user.id)
+        self.assertEqual(mock_get_webhook.call_count, 2)
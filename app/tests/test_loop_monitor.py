@@ -0,0 +1,56 @@
+import asyncio
+import sys
+import time
+import unittest
+
+from prometheus_client import REGISTRY
+
+from ..datasources.db.connector import (
+    _get_database_session_context,
+    set_database_session_context,
+)
+from ..loop_monitor import LoopMonitor
+
+
+class TestLoopMonitor(unittest.IsolatedAsyncioTestCase):
+    def blocking_call(self) -> None:
+        time.sleep(0.3)
+
+    async def test_loop_lag(self):
+        count = REGISTRY.get_sample_value("event_loop_lag_seconds_count") or 0
+        lag_sum = REGISTRY.get_sample_value("event_loop_lag_seconds_sum") or 0
+        loop_monitor = LoopMonitor(0.01, 0.1)
+        loop_monitor.start()
+        try:
+            await asyncio.sleep(0.05)
+            self.blocking_call()
+            await asyncio.sleep(0.05)
+        finally:
+            await loop_monitor.stop()
+
+        self.assertGreater(
+            REGISTRY.get_sample_value("event_loop_lag_seconds_count") or 0, count
+        )
+        self.assertGreaterEqual(
+            (REGISTRY.get_sample_value("event_loop_lag_seconds_sum") or 0) - lag_sum,
+            0.2,
+        )
+
+    async def test_log_blocking_stack(self):
+        loop_monitor = LoopMonitor(0.01, 0.1, debug=True)
+        loop_monitor.start()
+        try:
+            with self.assertLogs("app.loop_monitor", level="WARNING") as logs:
+                with set_database_session_context():
+                    session_id = _get_database_session_context()
+                    await asyncio.sleep(0.05)
+                    self.blocking_call()
+                    await asyncio.sleep(0.05)
+        finally:
+            await loop_monitor.stop()
+
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn("Event loop blocked for more than", logs.output[0])
+        self.assertIn("in blocking_call", logs.output[0])
+        if sys.version_info >= (3, 12):
+            self.assertEqual(getattr(logs.records[0], "db_session"), session_id)
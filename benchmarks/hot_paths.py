@@ -0,0 +1,223 @@
+"""
+Measures the CPU bound code run on every request: signing and verifying JWT tokens,
+bcrypt at the configured cost, formatting logs and building and serializing the
+public API keys and webhooks models.
+
+Results can be saved as JSON and compared against a stored baseline, failing if any
+benchmark is slower than the baseline by more than `--max-regression`. Baselines are
+only comparable when measured on the same machine and Python version.
+
+Usage:
+    python -m benchmarks.hot_paths
+    python -m benchmarks.hot_paths --output benchmarks/baselines/hot_paths.json
+    python -m benchmarks.hot_paths --baseline benchmarks/baselines/hot_paths.json
+"""
+
+import argparse
+import datetime
+import logging
+import platform
+import sys
+import uuid
+from typing import Callable
+
+from pydantic import TypeAdapter
+
+import bcrypt
+import jwt
+
+from app.config import settings
+from app.datasources.db.models import ApiKey, Webhook
+from app.loggers.safe_logger import SafeJsonFormatter
+from app.models.api_key import ApiKeyPublic
+from app.models.webhook import WebhookEventsService, WebhookEventType, WebhookPublic
+from app.services.jwt_service import JwtService, get_jwt_key_manager
+from app.services.webhook_service import _parse_webhook_public
+
+from .log_formatter import build_http_request_extra_dicts, make_record
+from .utils import compare_with_baseline, load_results, measure, save_results
+
+
+def get_benchmarks() -> dict[str, tuple[Callable[[], object], int]]:
+    """
+    Returns:
+        Function to measure and executions per round, by benchmark name
+    """
+    access_token = JwtService.create_access_token(
+        str(uuid.uuid4()),
+        datetime.timedelta(days=settings.JWT_AUTH_SERVICE_EXPIRE_DAYS),
+        settings.JWT_AUDIENCE,
+        {},
+    )
+    password = b"benchmark-Password-1"
+    password_hash = bcrypt.hashpw(
+        password, bcrypt.gensalt(settings.PASSWORD_HASHER_BCRYPT_ROUNDS)
+    )
+
+    formatter = SafeJsonFormatter()
+    message_record = make_record(logging.INFO, "Some message")
+    http_request_record = make_record(
+        logging.INFO,
+        "Http request",
+        db_session=str(uuid.uuid4()),
+        **build_http_request_extra_dicts(),
+    )
+
+    user_id = uuid.uuid4()
+    api_keys = [
+        ApiKey(
+            id=uuid.uuid4(),
+            user_id=user_id,
+            key=access_token,
+            description=f"Benchmark {i}",
+        )
+        for i in range(10)
+    ]
+    api_keys_adapter = TypeAdapter(list[ApiKeyPublic])
+    webhooks = [
+        (
+            Webhook(
+                id=uuid.uuid4(),
+                user_id=user_id,
+                description=f"Benchmark {i}",
+                external_webhook_id=uuid.uuid4(),
+            ),
+            WebhookEventsService(
+                id=uuid.uuid4(),
+                url=f"https://example.com/webhooks/{i}",
+                authorization="Basic benchmark",
+                chains=[1, 10, 137, 8453],
+                events=list(WebhookEventType),
+                is_active=True,
+            ),
+        )
+        for i in range(5)
+    ]
+    webhooks_adapter = TypeAdapter(list[WebhookPublic])
+    webhooks_public = [
+        _parse_webhook_public(webhook, events_service_webhook)
+        for webhook, events_service_webhook in webhooks
+    ]
+
+    return {
+        "jwt create access token": (
+            lambda: JwtService.create_access_token(
+                str(user_id),
+                datetime.timedelta(days=settings.JWT_AUTH_SERVICE_EXPIRE_DAYS),
+                settings.JWT_AUDIENCE,
+                {},
+            ),
+            1000,
+        ),
+        # As `get_jwt_info_from_auth_token` does on a cache miss
+        "jwt decode": (
+            lambda: jwt.decode(
+                access_token,
+                get_jwt_key_manager().verification_key,
+                algorithms=[settings.JWT_ALGORITHM],
+                audience=settings.JWT_AUDIENCE,
+            ),
+            1000,
+        ),
+        "bcrypt hash": (
+            lambda: bcrypt.hashpw(
+                password, bcrypt.gensalt(settings.PASSWORD_HASHER_BCRYPT_ROUNDS)
+            ),
+            1,
+        ),
+        "bcrypt check": (lambda: bcrypt.checkpw(password, password_hash), 1),
+        "log format message": (lambda: formatter.format(message_record), 10_000),
+        "log format http request": (
+            lambda: formatter.format(http_request_record),
+            10_000,
+        ),
+        "api key public validate": (
+            lambda: ApiKeyPublic.model_validate(api_keys[0]),
+            10_000,
+        ),
+        "api key public serialize": (
+            lambda: ApiKeyPublic.model_validate(api_keys[0]).model_dump_json(),
+            10_000,
+        ),
+        # As `get_api_keys_by_user` does for the maximum number of API keys
+        "api keys public list serialize": (
+            lambda: api_keys_adapter.dump_json(
+                api_keys_adapter.validate_python(api_keys)
+            ),
+            1000,
+        ),
+        "webhook public validate": (
+            lambda: WebhookPublic.model_validate(webhooks_public[0].model_dump()),
+            10_000,
+        ),
+        "parse webhook public": (
+            lambda: _parse_webhook_public(*webhooks[0]),
+            10_000,
+        ),
+        "webhooks public list serialize": (
+            lambda: webhooks_adapter.dump_json(
+                [
+                    _parse_webhook_public(webhook, events_service_webhook)
+                    for webhook, events_service_webhook in webhooks
+                ]
+            ),
+            1000,
+        ),
+    }
+
+
+def get_metadata() -> dict:
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "processor": platform.processor(),
+        "bcrypt_rounds": settings.PASSWORD_HASHER_BCRYPT_ROUNDS,
+        "jwt_algorithm": settings.JWT_ALGORITHM,
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--output", help="Save the results as JSON")
+    parser.add_argument("--baseline", help="Compare with the results of a JSON file")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.2,
+        help="Ratio slower than the baseline reported as a regression",
+    )
+    parser.add_argument(
+        "--filter", default="", help="Run only benchmarks containing this text"
+    )
+    args = parser.parse_args()
+
+    results: dict[str, float] = {}
+    for name, (func, number) in get_benchmarks().items():
+        if args.filter in name:
+            results[name] = measure(func, number=number)
+            if not args.baseline:
+                print(
+                    f"{name:<40} {results[name] * 1e6:>11.1f}us "
+                    f"{1 / results[name]:>11.0f}/s"
+                )
+
+    if args.output:
+        save_results(args.output, results, get_metadata())
+
+    if args.baseline:
+        regressions = compare_with_baseline(
+            results, load_results(args.baseline), args.max_regression
+        )
+        if regressions:
+            print(f"{len(regressions)} regressions: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
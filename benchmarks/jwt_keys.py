@@ -0,0 +1,94 @@
+"""
+Compares signing and verifying JWT tokens with PEM strings, parsed by PyJWT on every
+call, against the key objects prepared once by `JwtKeyManager`.
+
+Usage:
+    python -m benchmarks.jwt_keys
+"""
+
+import datetime
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from app.services.jwt_service import JwtKeyManager
+
+from .utils import measure, print_comparison
+
+ALGORITHM = "ES256"
+AUDIENCE = ["safe-auth-service"]
+
+
+def main() -> None:
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    private_key_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.TraditionalOpenSSL,
+        serialization.NoEncryption(),
+    ).decode()
+    public_key_pem = (
+        private_key.public_key()
+        .public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+        .decode()
+    )
+    jwt_key_manager = JwtKeyManager(private_key_pem, public_key_pem)
+
+    payload = {
+        "iss": "safe-auth-service",
+        "sub": "benchmark",
+        "key": "benchmark",
+        "aud": AUDIENCE,
+        "exp": datetime.datetime.now(datetime.timezone.utc)
+        + datetime.timedelta(days=1),
+        "data": {},
+    }
+    token = jwt.encode(payload, private_key_pem, algorithm=ALGORITHM)
+
+    print_comparison(
+        "sign",
+        measure(lambda: jwt.encode(payload, private_key_pem, algorithm=ALGORITHM)),
+        measure(
+            lambda: jwt.encode(
+                payload, jwt_key_manager.signing_key, algorithm=ALGORITHM
+            )
+        ),
+    )
+    print_comparison(
+        "verify (private key PEM)",
+        measure(
+            lambda: jwt.decode(
+                token, private_key_pem, algorithms=[ALGORITHM], audience=AUDIENCE
+            )
+        ),
+        measure(
+            lambda: jwt.decode(
+                token,
+                jwt_key_manager.verification_key,
+                algorithms=[ALGORITHM],
+                audience=AUDIENCE,
+            )
+        ),
+    )
+    print_comparison(
+        "verify (public key PEM)",
+        measure(
+            lambda: jwt.decode(
+                token, public_key_pem, algorithms=[ALGORITHM], audience=AUDIENCE
+            )
+        ),
+        measure(
+            lambda: jwt.decode(
+                token,
+                jwt_key_manager.verification_key,
+                algorithms=[ALGORITHM],
+                audience=AUDIENCE,
+            )
+        ),
+    )
+
+
+if __name__ == "__main__":
+    main()
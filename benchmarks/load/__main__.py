@@ -0,0 +1,243 @@
+"""
+Load test of the application with fakes for Apisix, the events service, Google OAuth and
+SMTP. Database and Redis configured in the environment are used, so they must be running.
+
+Reports requests per second, latency percentiles and CPU time per request. CPU time is
+measured for the server process with `--server uvicorn` (Linux only), and for the whole
+harness process, including client and fakes, with `--server asgi`.
+
+Usage:
+    python -m benchmarks.load login --concurrency 20 --duration 30 --latency-ms 20
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import AsyncExitStack
+from typing import Callable
+
+import httpx
+
+from .fakes import FakeApisix, FakeEventsService, FakeGoogle, FakeSmtpServer
+from .scenarios import SCENARIOS, LoadClient
+
+
+def get_process_cpu_seconds(pid: int) -> float | None:
+    """
+    Args:
+        pid: Process id.
+
+    Returns:
+        User and system CPU time of the process, `None` if not available
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as stat_file:
+            # Process name could contain spaces, fields are counted after it
+            fields = stat_file.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    user_ticks, system_ticks = int(fields[11]), int(fields[12])
+    return (user_ticks + system_ticks) / os.sysconf("SC_CLK_TCK")
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(sorted_values: list[float], percent: int) -> float:
+    if len(sorted_values) < 2:
+        return sorted_values[0] if sorted_values else 0.0
+    return statistics.quantiles(sorted_values, n=100, method="inclusive")[percent - 1]
+
+
+def print_report(
+    client: LoadClient, elapsed: float, cpu_seconds: float | None, cpu_source: str
+) -> None:
+    total_requests = sum(len(latencies) for latencies in client.latencies.values())
+    print(
+        f"{'request':<20} {'count':>8} {'errors':>7} {'rps':>9} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    )
+    for name, latencies in client.latencies.items():
+        latencies = sorted(latencies)
+        print(
+            f"{name:<20} {len(latencies):>8} {client.errors[name]:>7} "
+            f"{len(latencies) / elapsed:>9.1f} "
+            f"{percentile(latencies, 50) * 1000:>9.1f} "
+            f"{percentile(latencies, 95) * 1000:>9.1f} "
+            f"{percentile(latencies, 99) * 1000:>9.1f}"
+        )
+    print(f"Total: {total_requests} requests in {elapsed:.1f}s")
+    print(f"RPS: {total_requests / elapsed:.1f}")
+    if cpu_seconds is not None and total_requests:
+        print(
+            f"CPU per request ({cpu_source}): "
+            f"{cpu_seconds / total_requests * 1000:.2f}ms"
+        )
+
+
+async def start_uvicorn(
+    stack: AsyncExitStack,
+) -> tuple[str, Callable[[], float | None]]:
+    """
+    Starts the application with uvicorn in a new process.
+
+    Returns:
+        Base URL of the application and function returning its CPU time
+    """
+    port = get_free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+            "--no-access-log",
+        ],
+        env=os.environ.copy(),
+    )
+
+    def stop() -> None:
+        process.terminate()
+        process.wait()
+
+    stack.callback(stop)
+    base_url = f"http://127.0.0.1:{port}"
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        for _ in range(100):
+            try:
+                if (await client.get("/health")).is_success:
+                    break
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+        else:
+            raise RuntimeError("Application did not start")
+    return base_url, lambda: get_process_cpu_seconds(process.pid)
+
+
+async def main(args: argparse.Namespace) -> None:
+    latency = args.latency_ms / 1000
+    async with AsyncExitStack() as stack:
+        apisix = FakeApisix(latency)
+        events_service = FakeEventsService(latency)
+        google = FakeGoogle(latency)
+        smtp_server = FakeSmtpServer(latency)
+        for fake in (apisix, events_service, google, smtp_server):
+            await fake.start()
+            stack.push_async_callback(fake.stop)
+
+        # Settings are read when the application is imported
+        os.environ.update(
+            {
+                "APISIX_BASE_URL": apisix.url,
+                "EVENTS_SERVICE_BASE_URL": events_service.url,
+                "GOOGLE_CLIENT_ID": "load-test",
+                "GOOGLE_CLIENT_SECRET": "load-test",
+                "GOOGLE_TOKEN_URL": f"{google.url}/token",
+                "GOOGLE_USERINFO_URL": f"{google.url}/userinfo",
+                "SMTP_SERVER": smtp_server.host,
+                "SMTP_PORT": str(smtp_server.port),
+                "SMTP_STARTTLS": "false",
+                "SMTP_USERNAME": "",
+            }
+        )
+
+        limits = httpx.Limits(max_connections=args.concurrency)
+        if args.server == "uvicorn":
+            base_url, get_cpu_seconds = await start_uvicorn(stack)
+            http_client = httpx.AsyncClient(
+                base_url=base_url, limits=limits, timeout=60
+            )
+            cpu_source = "server process"
+        else:
+            from app.main import app
+
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            http_client = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app),
+                base_url="http://load",
+                limits=limits,
+                timeout=60,
+            )
+            get_cpu_seconds = time.process_time
+            cpu_source = "harness process"
+        await stack.enter_async_context(http_client)
+
+        client = LoadClient(http_client)
+        scenario_class = SCENARIOS[args.scenario]
+        scenarios = [
+            scenario_class(client, smtp_server) for _ in range(args.concurrency)
+        ]
+        await asyncio.gather(*(scenario.setup() for scenario in scenarios))
+
+        client.recording = True
+        deadline = time.monotonic() + args.duration
+
+        async def worker(scenario) -> None:
+            while time.monotonic() < deadline:
+                try:
+                    await scenario.run()
+                except httpx.HTTPError:
+                    pass
+
+        start_cpu_seconds = get_cpu_seconds()
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(scenario) for scenario in scenarios))
+        elapsed = time.perf_counter() - start
+        end_cpu_seconds = get_cpu_seconds()
+        client.recording = False
+
+        print(
+            f"Scenario {args.scenario}: {args.concurrency} workers, "
+            f"{args.latency_ms}ms upstream latency, {args.server} server"
+        )
+        print_report(
+            client,
+            elapsed,
+            (
+                end_cpu_seconds - start_cpu_seconds
+                if start_cpu_seconds is not None and end_cpu_seconds is not None
+                else None
+            ),
+            cpu_source,
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("scenario", choices=sorted(SCENARIOS))
+    parser.add_argument(
+        "--concurrency", type=int, default=10, help="Concurrent workers"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=30, help="Seconds running the scenario"
+    )
+    parser.add_argument(
+        "--latency-ms",
+        type=float,
+        default=0,
+        help="Latency added to every response of the fakes",
+    )
+    parser.add_argument(
+        "--server",
+        choices=("asgi", "uvicorn"),
+        default="asgi",
+        help="Call the application in process or through a uvicorn socket",
+    )
+    asyncio.run(main(parser.parse_args()))
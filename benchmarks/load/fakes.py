@@ -0,0 +1,315 @@
+"""
+In-process fakes of the services the application depends on, with a configurable
+latency added to every response: Apisix admin API, events service, Google OAuth and SMTP.
+"""
+
+import asyncio
+import email
+import email.policy
+import re
+import socket
+import uuid
+from collections import defaultdict
+from email.message import EmailMessage
+from typing import Any, Awaitable, Callable
+
+from aiohttp import web
+
+Handler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+
+# Temporary token in the register and reset password emails
+EMAIL_TOKEN_PATTERN = re.compile(r"token=([\w-]+)")
+
+
+def _bind_local_socket() -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    return sock
+
+
+def _latency_middleware(latency: float) -> Callable:
+    @web.middleware
+    async def middleware(request: web.Request, handler: Handler) -> web.StreamResponse:
+        if latency:
+            await asyncio.sleep(latency)
+        return await handler(request)
+
+    return middleware
+
+
+class FakeHttpServer:
+    """
+    Base class of the fake HTTP services, listening on a random local port.
+    """
+
+    def __init__(self, latency: float = 0):
+        """
+
+        Args:
+            latency: Seconds to wait before every response.
+        """
+        self.app = web.Application(middlewares=[_latency_middleware(latency)])
+        self.add_routes(self.app.router)
+        self.runner = web.AppRunner(self.app, access_log=None)
+        self.socket = _bind_local_socket()
+
+    def add_routes(self, router: web.UrlDispatcher) -> None:
+        raise NotImplementedError
+
+    @property
+    def url(self) -> str:
+        host, port = self.socket.getsockname()
+        return f"http://{host}:{port}"
+
+    async def start(self) -> None:
+        await self.runner.setup()
+        await web.SockSite(self.runner, self.socket).start()
+
+    async def stop(self) -> None:
+        await self.runner.cleanup()
+
+
+class FakeApisix(FakeHttpServer):
+    """
+    Apisix admin API, storing consumers and consumer groups in memory.
+    """
+
+    def __init__(self, latency: float = 0):
+        self.resources: dict[str, dict[str, dict[str, Any]]] = defaultdict(dict)
+        super().__init__(latency)
+
+    def add_routes(self, router: web.UrlDispatcher) -> None:
+        router.add_get("/apisix/admin/{resource}/", self.list_resources)
+        router.add_put("/apisix/admin/consumers/", self.put_consumer)
+        router.add_get("/apisix/admin/{resource}/{name}", self.get_resource)
+        router.add_put("/apisix/admin/{resource}/{name}", self.put_resource)
+        router.add_patch("/apisix/admin/{resource}/{name}", self.patch_resource)
+        router.add_delete("/apisix/admin/{resource}/{name}", self.delete_resource)
+
+    def _get_response(self, resource: str, name: str) -> web.Response:
+        if (value := self.resources[resource].get(name)) is None:
+            raise web.HTTPNotFound()
+        return web.json_response({"key": f"/apisix/{resource}/{name}", "value": value})
+
+    async def list_resources(self, request: web.Request) -> web.Response:
+        resources = self.resources[request.match_info["resource"]]
+        page = int(request.query.get("page", 1))
+        page_size = int(request.query.get("page_size", len(resources) or 1))
+        names = sorted(resources)[(page - 1) * page_size : page * page_size]
+        return web.json_response(
+            {
+                "total": len(resources),
+                "list": [{"value": resources[name]} for name in names],
+            }
+        )
+
+    async def get_resource(self, request: web.Request) -> web.Response:
+        return self._get_response(
+            request.match_info["resource"], request.match_info["name"]
+        )
+
+    async def put_consumer(self, request: web.Request) -> web.Response:
+        value = await request.json()
+        self.resources["consumers"][value["username"]] = value
+        return self._get_response("consumers", value["username"])
+
+    async def put_resource(self, request: web.Request) -> web.Response:
+        resource, name = request.match_info["resource"], request.match_info["name"]
+        self.resources[resource][name] = {"id": name, **await request.json()}
+        return self._get_response(resource, name)
+
+    async def patch_resource(self, request: web.Request) -> web.Response:
+        resource, name = request.match_info["resource"], request.match_info["name"]
+        if (value := self.resources[resource].get(name)) is None:
+            raise web.HTTPNotFound()
+        for key, patch in (await request.json()).items():
+            if isinstance(patch, dict) and isinstance(value.get(key), dict):
+                value[key] = {**value[key], **patch}
+            else:
+                value[key] = patch
+        return self._get_response(resource, name)
+
+    async def delete_resource(self, request: web.Request) -> web.Response:
+        resource, name = request.match_info["resource"], request.match_info["name"]
+        if self.resources[resource].pop(name, None) is None:
+            raise web.HTTPNotFound()
+        return web.json_response({"deleted": "1", "key": f"/apisix/{resource}/{name}"})
+
+
+class FakeEventsService(FakeHttpServer):
+    """
+    Events service webhooks API, storing webhooks in memory.
+    """
+
+    def __init__(self, latency: float = 0):
+        self.webhooks: dict[str, dict[str, Any]] = {}
+        super().__init__(latency)
+
+    def add_routes(self, router: web.UrlDispatcher) -> None:
+        router.add_post("/webhooks", self.add_webhook)
+        router.add_get("/webhooks/{webhook_id}", self.get_webhook)
+        router.add_put("/webhooks/{webhook_id}", self.update_webhook)
+        router.add_delete("/webhooks/{webhook_id}", self.delete_webhook)
+
+    def _get_webhook_data(self, request: web.Request) -> dict[str, Any]:
+        if (webhook := self.webhooks.get(request.match_info["webhook_id"])) is None:
+            raise web.HTTPNotFound()
+        return webhook
+
+    async def add_webhook(self, request: web.Request) -> web.Response:
+        webhook = {"id": str(uuid.uuid4()), **await request.json()}
+        self.webhooks[webhook["id"]] = webhook
+        return web.json_response(webhook, status=201)
+
+    async def get_webhook(self, request: web.Request) -> web.Response:
+        return web.json_response(self._get_webhook_data(request))
+
+    async def update_webhook(self, request: web.Request) -> web.Response:
+        webhook = self._get_webhook_data(request)
+        webhook.update(await request.json())
+        return web.json_response(webhook)
+
+    async def delete_webhook(self, request: web.Request) -> web.Response:
+        self._get_webhook_data(request)
+        del self.webhooks[request.match_info["webhook_id"]]
+        return web.Response(status=204)
+
+
+class FakeGoogle(FakeHttpServer):
+    """
+    Google OAuth token and user info endpoints. The authorization code is the email of
+    the user, so every code logs in a different user.
+    """
+
+    def add_routes(self, router: web.UrlDispatcher) -> None:
+        router.add_post("/token", self.get_token)
+        router.add_get("/userinfo", self.get_user_info)
+
+    async def get_token(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {"access_token": (await request.json())["code"], "token_type": "Bearer"}
+        )
+
+    async def get_user_info(self, request: web.Request) -> web.Response:
+        email_address = request.headers["Authorization"].removeprefix("Bearer ")
+        name = email_address.split("@")[0]
+        return web.json_response(
+            {
+                "id": name,
+                "email": email_address,
+                "verified_email": True,
+                "name": name,
+                "given_name": name,
+                "family_name": name,
+                "picture": "http://localhost/picture.png",
+                "hd": email_address.split("@")[1],
+            }
+        )
+
+
+class FakeSmtpServer:
+    """
+    Minimal SMTP server keeping the received messages in memory.
+    """
+
+    def __init__(self, latency: float = 0):
+        """
+
+        Args:
+            latency: Seconds to wait before accepting every message.
+        """
+        self.latency = latency
+        self.socket = _bind_local_socket()
+        self.server: asyncio.Server | None = None
+        self.messages: dict[str, asyncio.Queue[EmailMessage]] = defaultdict(
+            asyncio.Queue
+        )
+
+    @property
+    def host(self) -> str:
+        return self.socket.getsockname()[0]
+
+    @property
+    def port(self) -> int:
+        return self.socket.getsockname()[1]
+
+    async def start(self) -> None:
+        self.server = await asyncio.start_server(self.handle_client, sock=self.socket)
+
+    async def stop(self) -> None:
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def get_message(self, to: str, timeout: float = 10) -> EmailMessage:
+        """
+        Args:
+            to: Recipient of the message.
+            timeout: Seconds to wait for the message.
+
+        Returns:
+            The first message received for the recipient not returned yet
+        """
+        return await asyncio.wait_for(self.messages[to].get(), timeout)
+
+    async def get_token(self, to: str, timeout: float = 10) -> str:
+        """
+        Args:
+            to: Recipient of the message.
+            timeout: Seconds to wait for the message.
+
+        Returns:
+            Temporary token sent to the recipient
+        """
+        message = await self.get_message(to, timeout)
+        body = message.get_body(preferencelist=("plain",))
+        match = EMAIL_TOKEN_PATTERN.search(body.get_content() if body else "")
+        if not match:
+            raise ValueError(f"No token in message for {to}")
+        return match.group(1)
+
+    async def handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        async def reply(line: str) -> None:
+            writer.write(f"{line}\r\n".encode())
+            await writer.drain()
+
+        recipients: list[str] = []
+        await reply("220 localhost fake SMTP")
+        try:
+            while line := await reader.readline():
+                command = line.decode().strip().upper()
+                if command.startswith(("EHLO", "HELO")):
+                    await reply("250 localhost")
+                elif command.startswith("MAIL FROM"):
+                    recipients = []
+                    await reply("250 OK")
+                elif command.startswith("RCPT TO"):
+                    recipients.append(
+                        line.decode().split(":", 1)[1].strip().strip("<>")
+                    )
+                    await reply("250 OK")
+                elif command == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    data = await reader.readuntil(b"\r\n.\r\n")
+                    # Remove the final dot and the dot stuffing
+                    data = data[: -len(b".\r\n")].replace(b"\r\n..", b"\r\n.")
+                    if self.latency:
+                        await asyncio.sleep(self.latency)
+                    message = email.message_from_bytes(
+                        data, policy=email.policy.default
+                    )
+                    for recipient in recipients:
+                        self.messages[recipient].put_nowait(message)
+                    await reply("250 OK")
+                elif command in ("RSET", "NOOP"):
+                    await reply("250 OK")
+                elif command == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 Command not implemented")
+        finally:
+            writer.close()
@@ -0,0 +1,215 @@
+"""
+Load scenarios. Every concurrent worker creates its own scenario instance, runs `setup`
+once and then `run` repeatedly, only requests sent by `run` are measured.
+"""
+
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import Counter, defaultdict
+from typing import Any
+
+import httpx
+
+from .fakes import FakeSmtpServer
+
+PASSWORD = "load-Test-password-1"
+
+
+def get_email() -> str:
+    return f"load-{uuid.uuid4().hex}@example.com"
+
+
+class LoadClient:
+    """
+    HTTP client recording the latency and errors of the requests by name.
+    """
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.recording = False
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: Counter[str] = Counter()
+
+    async def request(
+        self, name: str, method: str, url: str, **kwargs: Any
+    ) -> httpx.Response:
+        """
+        Args:
+            name: Name of the request in the report.
+            method: HTTP method.
+            url: URL relative to the application base URL.
+            **kwargs: Arguments of the `httpx` request.
+
+        Returns:
+            The response, raising if it is an error while not recording
+        """
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            if not self.recording:
+                raise
+            self.errors[name] += 1
+            self.latencies[name].append(time.perf_counter() - start)
+            raise
+
+        if self.recording:
+            self.latencies[name].append(time.perf_counter() - start)
+            if response.is_error:
+                self.errors[name] += 1
+        else:
+            response.raise_for_status()
+        return response
+
+
+class Scenario(ABC):
+    def __init__(self, client: LoadClient, smtp_server: FakeSmtpServer):
+        """
+
+        Args:
+            client: Client of the application.
+            smtp_server: Fake SMTP server receiving the emails sent by the application.
+        """
+        self.client = client
+        self.smtp_server = smtp_server
+
+    async def setup(self) -> None:
+        pass
+
+    @abstractmethod
+    async def run(self) -> None:
+        pass
+
+    async def register(self, email: str) -> None:
+        await self.client.request(
+            "pre-registration",
+            "POST",
+            "/api/v1/users/pre-registrations",
+            json={"email": email},
+        )
+        token = await self.smtp_server.get_token(email)
+        await self.client.request(
+            "registration",
+            "POST",
+            "/api/v1/users/registrations",
+            json={"token": token, "password": PASSWORD},
+        )
+
+    async def login(self, email: str) -> str:
+        response = await self.client.request(
+            "login",
+            "POST",
+            "/api/v1/users/login",
+            data={"username": email, "password": PASSWORD},
+        )
+        return response.json()["access_token"]
+
+
+class AuthenticatedScenario(Scenario, ABC):
+    """
+    Scenario of a registered user, sending the access token on every request.
+    """
+
+    async def setup(self) -> None:
+        email = get_email()
+        await self.register(email)
+        access_token = await self.login(email)
+        self.headers = {"Authorization": f"Bearer {access_token}"}
+
+
+class RegisterScenario(Scenario):
+    async def run(self) -> None:
+        await self.register(get_email())
+
+
+class LoginScenario(Scenario):
+    async def setup(self) -> None:
+        self.email = get_email()
+        await self.register(self.email)
+
+    async def run(self) -> None:
+        await self.login(self.email)
+
+
+class GoogleLoginScenario(Scenario):
+    async def setup(self) -> None:
+        # Fake Google uses the authorization code as the email of the user
+        self.email = get_email()
+        await self.client.request(
+            "google callback",
+            "GET",
+            "/api/v1/google/callback",
+            params={"code": self.email},
+        )
+
+    async def run(self) -> None:
+        await self.client.request(
+            "google callback",
+            "GET",
+            "/api/v1/google/callback",
+            params={"code": self.email},
+        )
+
+
+class ApiKeysScenario(AuthenticatedScenario):
+    async def run(self) -> None:
+        response = await self.client.request(
+            "create api key",
+            "POST",
+            "/api/v1/api-keys",
+            json={"description": "Load test"},
+            headers=self.headers,
+        )
+        if response.is_error:
+            return
+        api_key_id = response.json()["id"]
+        await self.client.request(
+            "get api key",
+            "GET",
+            f"/api/v1/api-keys/{api_key_id}",
+            headers=self.headers,
+        )
+        await self.client.request(
+            "list api keys", "GET", "/api/v1/api-keys", headers=self.headers
+        )
+        await self.client.request(
+            "delete api key",
+            "DELETE",
+            f"/api/v1/api-keys/{api_key_id}",
+            headers=self.headers,
+        )
+
+
+class WebhooksScenario(AuthenticatedScenario):
+    webhooks_number = 5
+
+    async def setup(self) -> None:
+        await super().setup()
+        for _ in range(self.webhooks_number):
+            await self.client.request(
+                "create webhook",
+                "POST",
+                "/api/v1/webhooks",
+                json={
+                    "description": "Load test",
+                    "url": "https://example.com/webhook",
+                    "chains": [1],
+                    "events": ["SEND_CONFIRMATIONS"],
+                },
+                headers=self.headers,
+            )
+
+    async def run(self) -> None:
+        await self.client.request(
+            "list webhooks", "GET", "/api/v1/webhooks", headers=self.headers
+        )
+
+
+SCENARIOS: dict[str, type[Scenario]] = {
+    "register": RegisterScenario,
+    "login": LoginScenario,
+    "google-login": GoogleLoginScenario,
+    "api-keys": ApiKeysScenario,
+    "webhooks": WebhooksScenario,
+}
@@ -0,0 +1,161 @@
+"""
+Compares formatting log records with the former `SafeJsonFormatter`, building and
+dumping pydantic models for every record, against the current one encoding
+dictionaries with `orjson`.
+
+Usage:
+    python -m benchmarks.log_formatter
+"""
+
+import datetime
+import logging
+import traceback
+
+from app.loggers.safe_logger import (
+    ContextMessageLog,
+    ErrorInfo,
+    HttpRequestLog,
+    HttpResponseLog,
+    JsonLog,
+    SafeJsonFormatter,
+)
+
+from .utils import measure, print_comparison
+
+
+class PydanticJsonFormatter(logging.Formatter):
+    """
+    `SafeJsonFormatter` implementation before encoding the logs from dictionaries.
+    """
+
+    def format(self, record):
+        if record.levelname == "ERROR":
+            exception_info: str | None = None
+            if record.exc_info:
+                exc_type, exc_value, exc_tb = record.exc_info
+                exception_info = "".join(
+                    traceback.format_exception(exc_type, exc_value, exc_tb)
+                )
+            record.error_detail = ErrorInfo(
+                function=record.funcName,
+                line=record.lineno,
+                exceptionInfo=exception_info,
+            )
+
+        context_message = ContextMessageLog(
+            dbSession=getattr(record, "db_session", None),
+            httpRequest=getattr(record, "http_request", None),
+            httpResponse=getattr(record, "http_response", None),
+            errorInfo=getattr(record, "error_detail", None),
+        )
+
+        json_log = JsonLog(
+            level=record.levelname,
+            timestamp=datetime.datetime.fromtimestamp(
+                record.created, datetime.timezone.utc
+            ),
+            context=f"{record.module}.{record.funcName}",
+            message=record.getMessage(),
+            contextMessage=(
+                context_message
+                if len(context_message.model_dump(exclude_none=True))
+                else None
+            ),
+        )
+
+        return json_log.model_dump_json(exclude_none=True)
+
+
+def make_record(level: int, message: str, **extra) -> logging.LogRecord:
+    record = logging.LogRecord(
+        "benchmark", level, __file__, 1, message, (), None, func="main"
+    )
+    record.__dict__.update(extra)
+    return record
+
+
+def build_http_request_extra() -> dict:
+    """
+    Returns:
+        Extra of the `Http request` log, built with the models as the middleware did
+    """
+    start_time = datetime.datetime.now(datetime.timezone.utc)
+    end_time = start_time + datetime.timedelta(milliseconds=15)
+    return {
+        "http_request": HttpRequestLog(
+            url="http://localhost:8000/api/v1/about",
+            method="GET",
+            startTime=start_time,
+        ).model_dump(),
+        "http_response": HttpResponseLog(
+            status=200, endTime=end_time, totalTime=15
+        ).model_dump(),
+    }
+
+
+def build_http_request_extra_dicts() -> dict:
+    """
+    Returns:
+        Extra of the `Http request` log, built with dictionaries as the middleware does
+    """
+    start_time = datetime.datetime.now(datetime.timezone.utc)
+    end_time = start_time + datetime.timedelta(milliseconds=15)
+    return {
+        "http_request": {
+            "url": "http://localhost:8000/api/v1/about",
+            "method": "GET",
+            "startTime": start_time,
+        },
+        "http_response": {"status": 200, "endTime": end_time, "totalTime": 15},
+    }
+
+
+def print_records_per_second(name: str, before: float, after: float) -> None:
+    print(f"{name:<32} before={1 / before:>9.0f}/s after={1 / after:>9.0f}/s")
+
+
+def main() -> None:
+    pydantic_formatter = PydanticJsonFormatter()
+    formatter = SafeJsonFormatter()
+    try:
+        raise ValueError("Benchmark error")
+    except ValueError as e:
+        exc_info = (type(e), e, e.__traceback__)
+
+    records = {
+        "message": make_record(logging.INFO, "Some message"),
+        "http request": make_record(
+            logging.INFO,
+            "Http request",
+            db_session="6d6f1d8e-2c1a-4c5e-9b8e-1f0e5f9c8a7b",
+            **build_http_request_extra_dicts(),
+        ),
+        "error with exception": make_record(
+            logging.ERROR, "Some error", exc_info=exc_info
+        ),
+    }
+    for name, record in records.items():
+        before = measure(lambda: pydantic_formatter.format(record))
+        after = measure(lambda: formatter.format(record))
+        print_comparison(f"format {name}", before, after)
+        print_records_per_second(f"format {name}", before, after)
+
+    # Building the request extra on the middleware and formatting it
+    before = measure(
+        lambda: pydantic_formatter.format(
+            make_record(logging.INFO, "Http request", **build_http_request_extra())
+        )
+    )
+    after = measure(
+        lambda: formatter.format(
+            make_record(
+                logging.INFO, "Http request", **build_http_request_extra_dicts()
+            )
+        )
+    )
+    print_comparison("build and format http request", before, after)
+    print_records_per_second("build and format http request", before, after)
+
+
+if __name__ == "__main__":
+    main()
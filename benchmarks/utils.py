@@ -0,0 +1,110 @@
+"""
+Helpers shared by the benchmark scripts.
+"""
+
+import json
+import timeit
+from typing import Callable
+
+
+def measure(func: Callable[[], object], number: int = 1000, repeat: int = 5) -> float:
+    """
+    Runs `func` `number` times, `repeat` times, and keeps the fastest round
+    to reduce the noise of other processes.
+
+    Args:
+        func: Function to measure, without arguments.
+        number: Executions per round.
+        repeat: Number of rounds.
+
+    Returns:
+        Seconds per execution of the fastest round
+    """
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def print_comparison(name: str, before: float, after: float) -> None:
+    """
+    Prints the time per operation before and after an optimization.
+
+    Args:
+        name: Name of the measured operation.
+        before: Seconds per operation before.
+        after: Seconds per operation after.
+    """
+    print(
+        f"{name:<32} before={before * 1e6:>9.1f}us after={after * 1e6:>9.1f}us "
+        f"saved={(before - after) * 1e6:>9.1f}us ({before / after:.2f}x)"
+    )
+
+
+def save_results(path: str, results: dict[str, float], metadata: dict) -> None:
+    """
+    Saves benchmark results as JSON.
+
+    Args:
+        path: File to write.
+        results: Seconds per execution by benchmark name.
+        metadata: Environment the results were measured on, like the Python version.
+    """
+    with open(path, "w") as results_file:
+        json.dump(
+            {
+                "metadata": metadata,
+                "results": {
+                    name: {"seconds": seconds, "ops_per_second": 1 / seconds}
+                    for name, seconds in results.items()
+                },
+            },
+            results_file,
+            indent=2,
+            sort_keys=True,
+        )
+        results_file.write("\n")
+
+
+def load_results(path: str) -> dict[str, float]:
+    """
+    Args:
+        path: JSON file written by `save_results`.
+
+    Returns:
+        Seconds per execution by benchmark name
+    """
+    with open(path) as results_file:
+        return {
+            name: result["seconds"]
+            for name, result in json.load(results_file)["results"].items()
+        }
+
+
+def compare_with_baseline(
+    results: dict[str, float], baseline: dict[str, float], max_regression: float
+) -> list[str]:
+    """
+    Prints every result next to its baseline.
+
+    Args:
+        results: Seconds per execution by benchmark name.
+        baseline: Seconds per execution by benchmark name of the baseline.
+        max_regression: Ratio a benchmark can be slower than the baseline, like `0.2`
+            for 20%, before being reported as a regression.
+
+    Returns:
+        Names of the benchmarks slower than the baseline by more than `max_regression`
+    """
+    regressions = []
+    for name, seconds in results.items():
+        if (baseline_seconds := baseline.get(name)) is None:
+            print(f"{name:<40} {seconds * 1e6:>11.1f}us (not in baseline)")
+            continue
+        change = seconds / baseline_seconds - 1
+        regressed = change > max_regression
+        if regressed:
+            regressions.append(name)
+        print(
+            f"{name:<40} {seconds * 1e6:>11.1f}us "
+            f"baseline={baseline_seconds * 1e6:>11.1f}us {change:>+7.1%}"
+            f"{' REGRESSION' if regressed else ''}"
+        )
+    return regressions
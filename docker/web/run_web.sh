@@ -7,6 +7,12 @@ DOCKER_SHARED_DIR=/nginx
 rm -rf $DOCKER_SHARED_DIR/*
 cp -r static/ $DOCKER_SHARED_DIR/
 
+echo "==> $(date +%H:%M:%S) ==> Preparing Prometheus metrics directory... "
+# Metrics of every worker process are aggregated from this folder
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus_multiproc}
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
 echo "==> $(date +%H:%M:%S) ==> Running migrations..."
 alembic upgrade head
 
@@ -0,0 +1,56 @@
+"""
+Finds the drift between the users and api keys of the database and the Apisix consumer
+groups and consumers, and fixes it.
+
+Usage:
+    python -m scripts.reconcile_apisix [--dry-run] [--delete-orphans]
+"""
+
+import argparse
+import asyncio
+import logging
+
+from app.datasources.db.connector import (
+    remove_database_session,
+    set_database_session_context,
+)
+from app.services.apisix_reconciliation_service import reconcile_apisix
+
+logger = logging.getLogger(__name__)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only report the drift, without fixing it",
+    )
+    parser.add_argument(
+        "--delete-orphans",
+        action="store_true",
+        help="Delete Apisix consumers and consumer groups not in the database",
+    )
+    parser.add_argument(
+        "--max-concurrency", type=int, help="Drifted resources fixed at the same time"
+    )
+    args = parser.parse_args()
+
+    with set_database_session_context() as database_session_scope:
+        try:
+            summary = await reconcile_apisix(
+                dry_run=args.dry_run,
+                delete_orphans=args.delete_orphans,
+                max_concurrency=args.max_concurrency,
+            )
+        finally:
+            await remove_database_session(database_session_scope)
+    logger.info(
+        "Apisix reconciliation finished: %s",
+        summary.model_dump(include={"users", "api_keys", "repaired"}),
+    )
+    print(summary.model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
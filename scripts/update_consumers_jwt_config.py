@@ -0,0 +1,52 @@
+"""
+Updates the JWT configuration of every Apisix consumer with the configured public key.
+
+Usage:
+    python -m scripts.update_consumers_jwt_config [--dry-run] [--resume-after CONSUMER_NAME]
+"""
+
+import argparse
+import asyncio
+import logging
+
+from app.datasources.api_gateway.apisix.apisix_client import get_apisix_client
+from app.models.api_gateway import ConsumersJwtConfigUpdateSummary
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_LOG_INTERVAL = 100
+
+
+def log_progress(summary: ConsumersJwtConfigUpdateSummary) -> None:
+    if summary.total % PROGRESS_LOG_INTERVAL == 0:
+        logger.info("Consumers JWT config update progress: %s", summary.model_dump())
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only count the consumers that would be updated",
+    )
+    parser.add_argument(
+        "--resume-after",
+        help="Skip consumers up to this name, the `last_consumer_name` of a previous run",
+    )
+    parser.add_argument(
+        "--max-concurrency", type=int, help="Consumers updated at the same time"
+    )
+    args = parser.parse_args()
+
+    summary = await get_apisix_client().update_consumers_jwt_config(
+        dry_run=args.dry_run,
+        resume_after=args.resume_after,
+        max_concurrency=args.max_concurrency,
+        progress_callback=log_progress,
+    )
+    logger.info("Consumers JWT config update finished: %s", summary.model_dump())
+    print(summary.model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())